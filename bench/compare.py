@@ -0,0 +1,85 @@
+"""
+Compare a benchmark result with a baseline:
+    python bench/compare.py bench/results/latest.json bench/baselines/<machine>.json --threshold 0.15
+Exits with code 1 when any metric regressed, is missing from the current run or a task errored.
+"""
+
+import sys
+import json
+import argparse
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> list[dict]:
+    """
+    Per metric median ratio current / baseline, flagged when slower than `1 + threshold`.
+    A baseline metric missing from the current run (its benchmark was run) and every task error of the
+    current run are flagged as well. Baseline metrics without a recorded median only check presence.
+    """
+    rows = []
+    benchmarks = current["meta"].get("benchmarks")
+    for name, base in baseline["results"].items():
+        if benchmarks is not None and name.split("/")[0] not in benchmarks:
+            continue  # not part of this run (--only)
+        now = current["results"].get(name)
+        row = {"name": name, "baseline_s": base.get("median_s"), "current_s": None, "ratio": None}
+        if now is None:
+            row.update({"regressed": True, "reason": "missing"})
+        elif row["baseline_s"] is None:
+            row.update({"current_s": now["median_s"], "regressed": False})
+        else:
+            ratio = now["median_s"] / base["median_s"] if base["median_s"] > 0 else float("inf")
+            row.update({"current_s": now["median_s"], "ratio": ratio, "regressed": ratio > 1 + threshold})
+        rows.append(row)
+    for error in current["meta"].get("errors", []):
+        rows.append({
+            "name": f"error/{error['task']}/{error['seed']}",
+            "baseline_s": None,
+            "current_s": None,
+            "ratio": None,
+            "regressed": True,
+            "reason": error["error"],
+        })
+    return rows
+
+
+def format_time(seconds):
+    return f"{'-':>12}" if seconds is None else f"{seconds * 1000:>10.2f}ms"
+
+
+def print_comparison(rows: list[dict], threshold: float):
+    print(f"{'metric':<48}{'baseline':>12}{'current':>12}{'ratio':>9}")
+    for row in rows:
+        ratio = row["ratio"]
+        color = "\033[91m" if row["regressed"] else ("\033[92m" if ratio is not None and ratio < 1 - threshold else "")
+        ratio_text = f"{ratio:>9.2f}" if ratio is not None else f"{'-':>9}"
+        reason = f"  {row['reason']}" if "reason" in row else ""
+        print(f"{color}{row['name']:<48}{format_time(row['baseline_s'])}{format_time(row['current_s'])}"
+              f"{ratio_text}{reason}\033[0m")
+    regressed = [row["name"] for row in rows if row["regressed"]]
+    if len(regressed) > 0:
+        print(f"\033[91m{len(regressed)} metric(s) regressed by more than {threshold * 100:.0f}%, "
+              f"are missing or errored\033[0m")
+    else:
+        print(f"\033[92mNo regression (threshold {threshold * 100:.0f}%)\033[0m")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("current", type=str)
+    parser.add_argument("baseline", type=str)
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    rows = compare_results(load_results(args.current), load_results(args.baseline), args.threshold)
+    regressed = print_comparison(rows, args.threshold)
+    sys.exit(1 if len(regressed) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Benchmark suite for the simulation / data pipeline.
+
+    python bench/run.py                                   # full suite, writes bench/results/<time>.json
+    python bench/run.py --only get_obs take_action        # a subset
+    python bench/run.py --baseline bench/baselines/a100.json   # fail (exit 1) on regressions
+    python bench/run.py --save_baseline a100              # store the result as bench/baselines/a100.json
+
+Every metric is reported as {n, median_s, mean_s, min_s, max_s}, keyed `<benchmark>/<variant>`.
+"""
+
+import sys
+import os
+import json
+import time
+import socket
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import statistics
+import subprocess
+import importlib
+from copy import deepcopy
+
+sys.path.append("./")
+sys.path.append("./policy")
+sys.path.append("./description/utils")
+
+import yaml
+
+from bench.compare import compare_results, print_comparison, load_results
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = ["setup_demo", "play_once", "get_obs", "take_action", "merge", "model_server"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default=os.path.join(BENCH_DIR, "config.yml"))
+    parser.add_argument("--only", nargs="+", default=None, choices=BENCHMARKS, help="benchmarks to run")
+    parser.add_argument("--tasks", nargs="+", default=None, help="override the tasks of the config")
+    parser.add_argument("--seeds", nargs="+", type=int, default=None, help="override the seeds of the config")
+    parser.add_argument("--output", type=str, default=None, help="default bench/results/<time>.json")
+    parser.add_argument("--baseline", type=str, default=None, help="baseline json to check for regressions")
+    parser.add_argument("--threshold", type=float, default=None, help="override the regression threshold")
+    parser.add_argument("--save_baseline", type=str, default=None, help="store the result as a named baseline")
+    return parser.parse_args()
+
+
+# =========================================================== Helpers ===========================================================
+
+
+def summarize(times: list[float]) -> dict:
+    return {
+        "n": len(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.mean(times),
+        "min_s": min(times),
+        "max_s": max(times),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start_time = time.perf_counter()
+    ret = func(*args, **kwargs)
+    return time.perf_counter() - start_time, ret
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def get_task_args(task_name: str, task_config: str) -> dict:
+    """Task arguments as `script/collect_data.py` builds them."""
+    from envs import CONFIGS_PATH
+
+    with open(f"./task_config/{task_config}.yml", "r", encoding="utf-8") as f:
+        args = yaml.load(f.read(), Loader=yaml.FullLoader)
+    args["task_name"] = task_name
+    args["task_config"] = task_config
+
+    with open(os.path.join(CONFIGS_PATH, "_embodiment_config.yml"), "r", encoding="utf-8") as f:
+        embodiment_types = yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    def get_embodiment_config(robot_file):
+        with open(os.path.join(robot_file, "config.yml"), "r", encoding="utf-8") as f:
+            return yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    embodiment_type = args["embodiment"]
+    if len(embodiment_type) == 1:
+        args["left_robot_file"] = embodiment_types[embodiment_type[0]]["file_path"]
+        args["right_robot_file"] = embodiment_types[embodiment_type[0]]["file_path"]
+        args["dual_arm_embodied"] = True
+        args["embodiment_name"] = str(embodiment_type[0])
+    else:
+        args["left_robot_file"] = embodiment_types[embodiment_type[0]]["file_path"]
+        args["right_robot_file"] = embodiment_types[embodiment_type[1]]["file_path"]
+        args["embodiment_dis"] = embodiment_type[2]
+        args["dual_arm_embodied"] = False
+        args["embodiment_name"] = str(embodiment_type[0]) + "+" + str(embodiment_type[1])
+    args["left_embodiment_config"] = get_embodiment_config(args["left_robot_file"])
+    args["right_embodiment_config"] = get_embodiment_config(args["right_robot_file"])
+    args["render_freq"] = 0
+    return args
+
+
+def create_task(task_name: str):
+    envs_module = importlib.import_module(f"envs.{task_name}")
+    return getattr(envs_module, task_name)()
+
+
+# =========================================================== Benchmarks ===========================================================
+
+
+def bench_plan(task_name, seed, args, times):
+    """setup_demo + play_once with motion planning, no data saved (the seed search)."""
+    TASK_ENV = create_task(task_name)
+    args = deepcopy(args)
+    args.update({"need_plan": True, "save_data": False, "eval_mode": False})
+    elapsed, _ = timed(TASK_ENV.setup_demo, now_ep_num=0, seed=seed, **args)
+    times.setdefault(f"setup_demo/{task_name}", []).append(elapsed)
+    elapsed, _ = timed(TASK_ENV.play_once)
+    times.setdefault(f"play_once/{task_name}", []).append(elapsed)
+    plan_success = TASK_ENV.plan_success and TASK_ENV.check_success()
+    TASK_ENV.close_env()
+    return plan_success
+
+
+def bench_episode(task_name, seed, args, cfg, only, times, save_dir):
+    """get_obs per data_type, take_action per action_type and the pkl -> hdf5 merge in one scene."""
+    from bench.stand_in_policy import StandInPolicy
+
+    TASK_ENV = create_task(task_name)
+    args = deepcopy(args)
+    args.update({
+        "need_plan": False,
+        "save_data": True,
+        "eval_mode": True,
+        "save_path": save_dir,
+        "data_type": {key: True for key in ["rgb", "qpos", "endpose"]},
+    })
+    TASK_ENV.setup_demo(now_ep_num=0, seed=seed, **args)
+    last_obs = TASK_ENV.get_obs()
+
+    if "get_obs" in only:
+        data_type = TASK_ENV.data_type
+        for key in cfg["data_types"]:
+            TASK_ENV.data_type = {key: True}
+            for _ in range(cfg["obs_repeat"]):
+                elapsed, _ = timed(TASK_ENV.get_obs)
+                times.setdefault(f"get_obs/{key}", []).append(elapsed)
+        TASK_ENV.data_type = data_type
+
+    if "take_action" in only:
+        for action_type in cfg["action_types"]:
+            policy = StandInPolicy(action_type=action_type)
+            policy.update_obs(TASK_ENV.get_obs())
+            TASK_ENV.take_action_cnt = 0
+            for _ in range(cfg["action_steps"]):
+                action = policy.get_action()[0]
+                elapsed, _ = timed(TASK_ENV.take_action, action, action_type=action_type)
+                times.setdefault(f"take_action/{action_type}", []).append(elapsed)
+                policy.update_obs(TASK_ENV.get_obs())
+
+    if "merge" in only:
+        TASK_ENV.FRAME_IDX = 0
+        for _ in range(cfg["merge_frames"]):
+            TASK_ENV._take_picture()
+        elapsed, _ = timed(TASK_ENV.merge_pkl_to_hdf5_video)
+        times.setdefault(f"merge/{task_name}", []).append(elapsed)
+        TASK_ENV.remove_data_cache()
+
+    TASK_ENV.close_env()
+    return last_obs
+
+
+def bench_model_server(obs, cfg, times):
+    """Round trips through the socket model server, with a real observation as payload."""
+    from script.policy_model_server import ModelServer
+    from script.eval_policy_client import ModelClient
+    from bench.stand_in_policy import StandInPolicy
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+
+    server = ModelServer(StandInPolicy(), port=port)
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+    client = ModelClient(port=port)
+    try:
+        for _ in range(cfg["server_calls"]):
+            elapsed, _ = timed(client.call, "update_obs", obs)
+            times.setdefault("model_server/update_obs", []).append(elapsed)
+            elapsed, _ = timed(client.call, "get_action")
+            times.setdefault("model_server/get_action", []).append(elapsed)
+    finally:
+        client.close()
+        server.stop()
+
+
+def run_suite(cfg, only) -> dict:
+    times, errors, plan_success = {}, [], {}
+    last_obs = None
+    save_dir = tempfile.mkdtemp(prefix="robotwin_bench_")
+    try:
+        for task_name in cfg["tasks"]:
+            args = get_task_args(task_name, cfg["task_config"])
+            args["render_profile"] = cfg["render_profile"]
+            for seed in cfg["seeds"]:
+                print(f"\033[94m{task_name}\033[0m seed {seed}")
+                try:
+                    if "setup_demo" in only or "play_once" in only:
+                        plan_success[f"{task_name}/{seed}"] = bench_plan(task_name, seed, args, times)
+                    if len({"get_obs", "take_action", "merge"} & set(only)) > 0:
+                        last_obs = bench_episode(task_name, seed, args, cfg, only, times, save_dir)
+                except Exception as e:
+                    print(f"\033[91m{task_name} seed {seed} failed: {e}\033[0m")
+                    errors.append({"task": task_name, "seed": seed, "error": str(e)})
+
+        if "model_server" in only:
+            if last_obs is None:  # no scene was built, use a synthetic observation of similar size
+                last_obs = {"joint_action": {"vector": [0.0] * 14, "left_arm": [0.0] * 6}}
+            bench_model_server(last_obs, cfg, times)
+    finally:
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": get_git_commit(),
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "config": cfg,
+            "benchmarks": list(only),
+            "plan_success": plan_success,
+            "errors": errors,
+        },
+        "results": {name: summarize(values) for name, values in sorted(times.items())},
+    }
+
+
+def main():
+    args = parse_args()
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    if args.tasks is not None:
+        cfg["tasks"] = args.tasks
+    if args.seeds is not None:
+        cfg["seeds"] = args.seeds
+    threshold = args.threshold if args.threshold is not None else cfg["threshold"]
+    only = args.only if args.only is not None else BENCHMARKS
+
+    result = run_suite(cfg, only)
+
+    output = args.output or os.path.join(BENCH_DIR, "results", time.strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
+    print(f"Results saved to {output}")
+
+    if args.save_baseline is not None:
+        baseline_path = os.path.join(BENCH_DIR, "baselines", f"{args.save_baseline}.json")
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        shutil.copyfile(output, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+
+    if args.baseline is not None:
+        rows = compare_results(result, load_results(args.baseline), threshold)
+        regressed = print_comparison(rows, threshold)
+        sys.exit(1 if len(regressed) > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+CPU-only stand-in policy for benchmarks: holds the current joint / end-effector state with a small
+deterministic wobble, so `take_action` does real planning and physics work without a trained model.
+
+It follows the `deploy_policy.py` interface, so it can also be served by `script/policy_model_server.py`
+(`policy_name: bench.stand_in_policy`).
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+class StandInPolicy:
+
+    def __init__(self, action_type="qpos", chunk_size=1, amplitude=0.01, obs_window=2):
+        self.action_type = action_type
+        self.chunk_size = chunk_size
+        self.amplitude = amplitude
+        self.obs_cache = deque(maxlen=obs_window)
+        self.step = 0
+
+    def update_obs(self, obs):
+        self.obs_cache.append(obs)
+        return True
+
+    def get_state(self, obs, action_type):
+        if action_type == "qpos":
+            return np.array(obs["joint_action"]["vector"], dtype=np.float64)
+        endpose = obs["endpose"]
+        return np.concatenate([
+            np.array(endpose["left_endpose"], dtype=np.float64),
+            [endpose["left_gripper"]],
+            np.array(endpose["right_endpose"], dtype=np.float64),
+            [endpose["right_gripper"]],
+        ])
+
+    def get_action(self, obs=None):
+        if obs is not None:
+            self.update_obs(obs)
+        obs = self.obs_cache[-1]
+        state = self.get_state(obs, self.action_type)
+        if self.action_type == "qpos":
+            # wobble the arm joints only, grippers stay where they are
+            left_arm_dim = len(obs["joint_action"]["left_arm"])
+            wobble_mask = np.ones(len(state), dtype=bool)
+            wobble_mask[[left_arm_dim, len(state) - 1]] = False
+        else:
+            wobble_mask = np.zeros(len(state), dtype=bool)
+            wobble_mask[[0, 8]] = True  # x of both end effectors
+        actions = []
+        for _ in range(self.chunk_size):
+            action = state.copy()
+            action[wobble_mask] += self.amplitude * np.sin(0.5 * self.step)
+            actions.append(action)
+            self.step += 1
+        return np.array(actions)
+
+    def reset(self):
+        self.obs_cache.clear()
+        self.step = 0
+        return True
+
+
+def encode_obs(observation):
+    return observation
+
+
+def get_model(usr_args):
+    return StandInPolicy(
+        action_type=usr_args.get("action_type", "qpos"),
+        chunk_size=usr_args.get("chunk_size", 1),
+    )
+
+
+def eval(TASK_ENV, model, observation):
+    obs = encode_obs(observation)
+    if len(model.obs_cache) == 0:
+        model.update_obs(obs)
+    for action in model.get_action():
+        TASK_ENV.take_action(action, action_type=model.action_type)
+        model.update_obs(encode_obs(TASK_ENV.get_obs()))
+
+
+def reset_model(model):
+    model.reset()
@@ -1,5 +1,14 @@
 import os
 import argparse
+import importlib.util
+
+# envs/utils/manifest.py only needs the standard library, load it without importing the `envs` package (sapien)
+_spec = importlib.util.spec_from_file_location(
+    "manifest", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "envs", "utils", "manifest.py"))
+manifest_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(manifest_module)
+
+EpisodeManifest = manifest_module.EpisodeManifest
 
 ap = argparse.ArgumentParser()
 ap.add_argument("task_name")
@@ -8,22 +17,13 @@ ap.add_argument("index", type=int, help="Index of the episode to delete")
 args = ap.parse_args()
 
 target_path = os.path.join("data", args.task_name, args.task_config)
-txt_path = os.path.join(target_path, "seed.txt")
 dir_path = os.path.join(target_path, "data")
 replace_id = args.index
 
-with open(txt_path, "r") as f:
-    nums = list(map(int, f.read().split()))
-
-final_id = len(nums) - 1
-
-last_seed = nums[-1]
-
-nums[replace_id] = last_seed
-nums.pop()
-
-with open(txt_path, "w") as f:
-    f.write(" ".join(map(str, nums)))
+# the last episode takes the place of the deleted one (imports seed.txt / scene_info.json on first use)
+manifest = EpisodeManifest(target_path)
+final_id = manifest.replace_with_last(replace_id)
+manifest.export_legacy()
 
 target_file = os.path.join(dir_path, f"episode{replace_id}.pkl")
 if os.path.exists(target_file):
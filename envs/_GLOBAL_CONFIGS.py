@@ -12,6 +12,28 @@ CONFIGS_PATH = os.path.join(ROOT_PATH, "task_config/")
 SCRIPT_PATH = os.path.join(ROOT_PATH, "script/")
 DESCRIPTION_PATH = os.path.join(ROOT_PATH, "description/")
 
+# Render profiles, selected by `render_profile` in the task config
+# "none" is physics only: no cameras are created and nothing is rendered
+RENDER_PROFILES = {
+    "none": None,
+    "raster": {
+        "shader_dir": "default",
+    },
+    "rt-fast": {
+        "shader_dir": "rt",
+        "samples_per_pixel": 4,
+        "path_depth": 3,
+        "denoiser": "oidn",
+    },
+    "rt-quality": {
+        "shader_dir": "rt",
+        "samples_per_pixel": 32,
+        "path_depth": 8,
+        "denoiser": "oidn",
+    },
+}
+DEFAULT_RENDER_PROFILE = "rt-quality"
+
 # Euler angles in world coordinates
 # t3d.euler.quat2euler(quat) returns (theta_x, theta_y, theta_z)
 # theta_y controls the pitch, and theta_z controls rotation around the axis perpendicular to the tabletop plane
@@ -8,6 +8,7 @@ import gymnasium as gym
 import pdb
 import toppra as ta
 import json
+import time
 import transforms3d as t3d
 from collections import OrderedDict
 import torch, random
@@ -52,6 +53,7 @@ class Base_Task(gym.Env):
         - `self.left_arm_joint_id`: [6,14,18,22,26,30].
         - `self.right_arm_joint_id`: [7,15,19,23,27,31].
         - `self.render_fre`: Render frequency.
+        - `self.render_profile`: Render profile name, see `RENDER_PROFILES`.
         """
         super().__init__()
         ta.setup_logging("CRITICAL")  # hide logging
@@ -66,8 +68,13 @@ class Base_Task(gym.Env):
         self.render_freq = kwags.get("render_freq", 10)
         self.data_type = kwags.get("data_type", None)
         self.save_data = kwags.get("save_data", False)
+        self.data_encoding = kwags.get("data_encoding", None)
+        self.camera_params = kwags.get("camera_params", "frame")  # frame, episode (static cameras stored once)
+        self.collect_norm_stats = kwags.get("norm_stats", False)  # mergeable proprio statistics per episode
+        self.proprio_values = {}
         self.dual_arm = kwags.get("dual_arm", True)
         self.eval_mode = kwags.get("eval_mode", False)
+        self.render_profile = kwags.get("render_profile", DEFAULT_RENDER_PROFILE)
 
         self.need_topp = True  # TODO
 
@@ -110,16 +117,38 @@ class Base_Task(gym.Env):
         self.eval_success = False
         self.table_z_bias = (np.random.uniform(low=-self.random_table_height, high=0) + table_height_bias)  # TODO
         self.need_plan = kwags.get("need_plan", True)
+        self.record_state = kwags.get("record_state", False)
+        self.state_replay = kwags.get("state_replay", False)
+        self.state_frames = []
+        self.proprio_frames = []
+
+        # single-pass collection keeps the frames in a scratch buffer until the episode is known to succeed
+        self.single_pass = kwags.get("single_pass", False)
+        self.frame_buffer = None
+        if self.save_data and self.single_pass:
+            self.frame_buffer = FrameBuffer(
+                spill_dir=f"{self.save_dir}/.cache/episode{self.ep_num}/",
+                max_bytes=kwags.get("scratch_buffer_mb", 2048) * 1024 * 1024,
+            )
         self.left_joint_path = kwags.get("left_joint_path", [])
         self.right_joint_path = kwags.get("right_joint_path", [])
         self.left_cnt = 0
         self.right_cnt = 0
+        # stage-level retry of composite tasks, see `run_stage`
+        self.seed = kwags.get("seed", 0)
+        self.stage_retries = kwags.get("stage_retries", 0)
+        self.stage_attempts = kwags.get("stage_attempts", [])
+        self.stage_cnt = 0
+        self.stage_attempt = 0
 
         self.instruction = None  # for Eval
 
-        self.create_table_and_wall(table_xy_bias=table_xy_bias, table_height=0.74)
-        self.load_robot(**kwags)
-        self.load_camera(**kwags)
+        with profile_span("create_table_and_wall"):
+            self.create_table_and_wall(table_xy_bias=table_xy_bias, table_height=0.74)
+        with profile_span("load_robot"):
+            self.load_robot(**kwags)
+        with profile_span("load_camera"):
+            self.load_camera(**kwags)
         self.robot.move_to_homestate()
 
         render_freq = self.render_freq
@@ -128,12 +157,16 @@ class Base_Task(gym.Env):
         self.render_freq = render_freq
 
         self.robot.set_origin_endpose()
-        self.load_actors()
+        with profile_span("load_actors"):
+            self.load_actors()
 
         if self.cluttered_table:
-            self.get_cluttered_table()
+            with profile_span("get_cluttered_table"):
+                self.get_cluttered_table()
 
-        is_stable, unstable_list = self.check_stable()
+        # poses are set from the recorded states when replaying, no need to settle the scene
+        with profile_span("check_stable"):
+            is_stable, unstable_list = self.check_stable() if not self.state_replay else (True, [])
         if not is_stable:
             raise UnStableError(
                 f'Objects is unstable in seed({kwags.get("seed", 0)}), unstable objects: {", ".join(unstable_list)}')
@@ -171,7 +204,7 @@ class Base_Task(gym.Env):
         def check(times):
             nonlocal self, is_stable, actors_list, actors_pose_list
             for _ in range(times):
-                self.scene.step()
+                self.step_scene()
                 for idx, actor in enumerate(actors_list):
                     actors_pose_list[idx].append(actor.get_pose())
 
@@ -185,7 +218,7 @@ class Base_Task(gym.Env):
 
         is_stable = True
         for _ in range(2000):
-            self.scene.step()
+            self.step_scene()
         for idx, actor in enumerate(actors_list):
             actors_pose_list.append([actor.get_pose()])
         check(500)
@@ -197,28 +230,48 @@ class Base_Task(gym.Env):
     def check_success(self):
         pass
 
+    def is_headless(self):
+        """Whether the render profile is physics only (no renderer, no cameras)."""
+        return RENDER_PROFILES[self.render_profile] is None
+
     def setup_scene(self, **kwargs):
         """
         Set the scene
             - Set up the basic scene: light source, viewer.
+            - Configure the renderer according to `self.render_profile`.
         """
+        if self.render_profile not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile {self.render_profile}, "
+                             f"available: {', '.join(RENDER_PROFILES.keys())}")
+        if self.is_headless() and self.render_freq:
+            raise ValueError("render_profile 'none' cannot be used together with render_freq")
+
         self.engine = sapien.Engine()
         # declare sapien renderer
         from sapien.render import set_global_config
 
         set_global_config(max_num_materials=50000, max_num_textures=50000)
-        self.renderer = sapien.SapienRenderer()
-        # give renderer to sapien sim
-        self.engine.set_renderer(self.renderer)
 
-        sapien.render.set_camera_shader_dir("rt")
-        sapien.render.set_ray_tracing_samples_per_pixel(32)
-        sapien.render.set_ray_tracing_path_depth(8)
-        sapien.render.set_ray_tracing_denoiser("oidn")
+        render_profile = RENDER_PROFILES[self.render_profile]
+        if render_profile is not None:
+            self.renderer = sapien.SapienRenderer()
+            # give renderer to sapien sim
+            self.engine.set_renderer(self.renderer)
+
+            # shader settings are global, so every profile sets them explicitly
+            sapien.render.set_camera_shader_dir(render_profile["shader_dir"])
+            if render_profile["shader_dir"] == "rt":
+                sapien.render.set_ray_tracing_samples_per_pixel(render_profile["samples_per_pixel"])
+                sapien.render.set_ray_tracing_path_depth(render_profile["path_depth"])
+                sapien.render.set_ray_tracing_denoiser(render_profile["denoiser"])
+        else:
+            self.renderer = None
 
         # declare sapien scene
         scene_config = sapien.SceneConfig()
         self.scene = self.engine.create_scene(scene_config)
+        self.physics_step_count = 0
+        self.contact_index, self.contact_index_step = None, -1
         # set simulation timestep
         self.scene.set_timestep(kwargs.get("timestep", 1 / 250))
         # add ground to scene
@@ -410,16 +463,42 @@ class Base_Task(gym.Env):
             random_head_camera_dis=self.random_head_camera_dis,
             **kwags,
         )
+        if self.is_headless():
+            # no cameras, but keep the random stream identical to a rendered run
+            self.cameras.consume_random_state()
+            self.cameras = None
+            self.step_scene()  # run a physical step
+            return
+
         self.cameras.load_camera(self.scene)
-        self.scene.step()  # run a physical step
+        self.step_scene()  # run a physical step
         self.scene.update_render()  # sync pose from SAPIEN to renderer
 
     # =========================================================== Sapien ===========================================================
 
+    def step_scene(self):
+        """Run a physical step. Always step through here so per-step caches stay in sync."""
+        if profiler.enabled:
+            start_time = time.perf_counter_ns()
+            self.scene.step()
+            profiler.add_batched("scene.step", start_time, time.perf_counter_ns())
+        else:
+            self.scene.step()
+        self.physics_step_count += 1
+
+    def get_contact_index(self) -> ContactIndex:
+        """Contacts of the current physics step, indexed by entity pair (built at most once per step)."""
+        if self.contact_index_step != self.physics_step_count:
+            self.contact_index = ContactIndex(self.scene.get_contacts())
+            self.contact_index_step = self.physics_step_count
+        return self.contact_index
+
+    @profiled()
     def _update_render(self):
         """
         Update rendering to refresh the camera's RGBD information
         (rendering must be updated even when disabled, otherwise data cannot be collected).
+        In headless mode only the random light draws are kept, so the random stream matches a rendered run.
         """
         if self.crazy_random_light:
             for renderColor in self.point_light_lst:
@@ -429,14 +508,16 @@ class Base_Task(gym.Env):
             now_ambient_light = self.scene.ambient_light
             now_ambient_light = np.clip(np.array(now_ambient_light) + np.random.rand(3) * 0.2 - 0.1, 0, 1)
             self.scene.set_ambient_light(now_ambient_light)
+        if self.cameras is None:  # headless, nothing to sync
+            return
         self.cameras.update_wrist_camera(self.robot.left_camera.get_pose(), self.robot.right_camera.get_pose())
         self.scene.update_render()
 
     # =========================================================== Basic APIs ===========================================================
 
+    @profiled()
     def get_obs(self):
         self._update_render()
-        self.cameras.update_picture()
         pkl_dic = {
             "observation": {},
             "pointcloud": [],
@@ -444,31 +525,60 @@ class Base_Task(gym.Env):
             "endpose": {},
         }
 
-        pkl_dic["observation"] = self.cameras.get_config()
+        # camera data is only available when rendering
+        use_camera = self.cameras is not None
+        if use_camera:
+            with profile_span("take_picture"):
+                # depth, segmentation and point clouds need the full resolution cameras, plain rgb may not
+                full_picture = self.cameras.needs_full_picture() or any(
+                    self.data_type.get(key, False)
+                    for key in ["depth", "pointcloud", "mesh_segmentation", "actor_segmentation"])
+                self.cameras.update_picture(full=full_picture)
+            pkl_dic["observation"] = self.cameras.get_config()
         # rgb
-        if self.data_type.get("rgb", False):
-            rgb = self.cameras.get_rgb()
+        if use_camera and self.data_type.get("rgb", False):
+            with profile_span("rgb"):
+                rgb = self.cameras.get_rgb()
             for camera_name in rgb.keys():
                 pkl_dic["observation"][camera_name].update(rgb[camera_name])
 
-        if self.data_type.get("third_view", False):
-            third_view_rgb = self.cameras.get_observer_rgb()
+        if use_camera and self.data_type.get("third_view", False):
+            with profile_span("third_view"):
+                third_view_rgb = self.cameras.get_observer_rgb()
             pkl_dic["third_view_rgb"] = third_view_rgb
         # mesh_segmentation
-        if self.data_type.get("mesh_segmentation", False):
-            mesh_segmentation = self.cameras.get_segmentation(level="mesh")
+        if use_camera and self.data_type.get("mesh_segmentation", False):
+            with profile_span("mesh_segmentation"):
+                mesh_segmentation = self.cameras.get_segmentation(level="mesh")
             for camera_name in mesh_segmentation.keys():
                 pkl_dic["observation"][camera_name].update(mesh_segmentation[camera_name])
         # actor_segmentation
-        if self.data_type.get("actor_segmentation", False):
-            actor_segmentation = self.cameras.get_segmentation(level="actor")
+        if use_camera and self.data_type.get("actor_segmentation", False):
+            with profile_span("actor_segmentation"):
+                actor_segmentation = self.cameras.get_segmentation(level="actor")
             for camera_name in actor_segmentation.keys():
                 pkl_dic["observation"][camera_name].update(actor_segmentation[camera_name])
         # depth
-        if self.data_type.get("depth", False):
-            depth = self.cameras.get_depth()
+        if use_camera and self.data_type.get("depth", False):
+            with profile_span("depth"):
+                depth = self.cameras.get_depth()
             for camera_name in depth.keys():
                 pkl_dic["observation"][camera_name].update(depth[camera_name])
+        # endpose, qpos
+        with profile_span("proprio"):
+            pkl_dic.update(self.get_proprio_obs())
+        # pointcloud
+        if use_camera and self.data_type.get("pointcloud", False):
+            with profile_span("pointcloud"):
+                pkl_dic["pointcloud"] = self.cameras.get_pcd(self.data_type.get("conbine", False))
+
+        with profile_span("copy"):
+            self.now_obs = deepcopy(pkl_dic)
+        return pkl_dic
+
+    def get_proprio_obs(self):
+        """Robot state part of the observation: `endpose` and `joint_action`."""
+        res = {"joint_action": {}, "endpose": {}}
         # endpose
         if self.data_type.get("endpose", False):
             norm_gripper_val = [
@@ -477,35 +587,229 @@ class Base_Task(gym.Env):
             ]
             left_endpose = self.get_arm_pose("left")
             right_endpose = self.get_arm_pose("right")
-            pkl_dic["endpose"]["left_endpose"] = left_endpose
-            pkl_dic["endpose"]["left_gripper"] = norm_gripper_val[0]
-            pkl_dic["endpose"]["right_endpose"] = right_endpose
-            pkl_dic["endpose"]["right_gripper"] = norm_gripper_val[1]
+            res["endpose"]["left_endpose"] = left_endpose
+            res["endpose"]["left_gripper"] = norm_gripper_val[0]
+            res["endpose"]["right_endpose"] = right_endpose
+            res["endpose"]["right_gripper"] = norm_gripper_val[1]
         # qpos
         if self.data_type.get("qpos", False):
 
             left_jointstate = self.robot.get_left_arm_jointState()
             right_jointstate = self.robot.get_right_arm_jointState()
 
-            pkl_dic["joint_action"]["left_arm"] = left_jointstate[:-1]
-            pkl_dic["joint_action"]["left_gripper"] = left_jointstate[-1]
-            pkl_dic["joint_action"]["right_arm"] = right_jointstate[:-1]
-            pkl_dic["joint_action"]["right_gripper"] = right_jointstate[-1]
-            pkl_dic["joint_action"]["vector"] = np.array(left_jointstate + right_jointstate)
-        # pointcloud
-        if self.data_type.get("pointcloud", False):
-            pkl_dic["pointcloud"] = self.cameras.get_pcd(self.data_type.get("conbine", False))
+            res["joint_action"]["left_arm"] = left_jointstate[:-1]
+            res["joint_action"]["left_gripper"] = left_jointstate[-1]
+            res["joint_action"]["right_arm"] = right_jointstate[:-1]
+            res["joint_action"]["right_gripper"] = right_jointstate[-1]
+            res["joint_action"]["vector"] = np.array(left_jointstate + right_jointstate)
+        return res
 
-        self.now_obs = deepcopy(pkl_dic)
-        return pkl_dic
+    # =========================================================== Sim State ===========================================================
+
+    def get_sim_state_names(self) -> list[str]:
+        """Names of the entities stored by `get_sim_state`, in order."""
+        return ([actor.get_name() for actor in self.scene.get_all_actors()] +
+                [articulation.get_name() for articulation in self.scene.get_all_articulations()])
+
+    def get_sim_state(self) -> np.ndarray:
+        """
+        Kinematic state of the scene as a compact float32 array:
+        pose (p, q) of every actor, then root pose (p, q) and qpos of every articulation.
+        """
+        state = []
+        for actor in self.scene.get_all_actors():
+            pose = actor.get_pose()
+            state += [pose.p, pose.q]
+        for articulation in self.scene.get_all_articulations():
+            pose = articulation.get_root_pose()
+            state += [pose.p, pose.q, articulation.get_qpos()]
+        return np.concatenate(state).astype(np.float32)
+
+    def set_sim_state(self, state: np.ndarray):
+        """Set the state returned by `get_sim_state` kinematically, physics is not stepped."""
+        idx = 0
+        for actor in self.scene.get_all_actors():
+            actor.set_pose(sapien.Pose(state[idx:idx + 3], state[idx + 3:idx + 7]))
+            idx += 7
+        for articulation in self.scene.get_all_articulations():
+            articulation.set_root_pose(sapien.Pose(state[idx:idx + 3], state[idx + 3:idx + 7]))
+            idx += 7
+            articulation.set_qpos(state[idx:idx + articulation.dof])
+            idx += articulation.dof
+        if idx != len(state):
+            raise ValueError(f"Sim state size mismatch: expected {idx}, got {len(state)}")
+
+    def _record_state(self):
+        self.state_frames.append(self.get_sim_state())
+        self.proprio_frames.append(deepcopy(self.get_proprio_obs()))
+
+    def replay_state(self, sim_state: dict, frame_ids: list[int] = None):
+        """
+        Render the recorded frames of a planning pass without stepping physics.
+        - sim_state: the `sim_state` entry saved by `save_traj_data`.
+        - frame_ids: frames to render, default all. Frames are independent, so they can be split across workers;
+          the norm statistics then only cover the frames replayed by this instance.
+        Joint data is taken from the recording, so it is identical to the planning pass.
+        """
+        if sim_state["names"] != self.get_sim_state_names():
+            raise ValueError("Recorded sim state does not match the entities of the scene")
+
+        self.folder_path = {"cache": f"{self.save_dir}/.cache/episode{self.ep_num}/"}
+        if frame_ids is None:
+            frame_ids = range(len(sim_state["poses"]))
+            if os.path.exists(self.folder_path["cache"]):  # remove previous data
+                shutil.rmtree(self.folder_path["cache"])
+            self.proprio_values = {}
+
+        for frame_id in frame_ids:
+            print("saving: episode = ", self.ep_num, " index = ", frame_id, end="\r")
+            self.set_sim_state(sim_state["poses"][frame_id])
+            pkl_dic = self.get_obs()
+            pkl_dic.update(deepcopy(sim_state["proprio"][frame_id]))
+            self._save_frame(pkl_dic, frame_id)
+        self.FRAME_IDX = len(sim_state["poses"])
+        return sim_state["info"]
+
+    # =========================================================== Snapshot ===========================================================
+
+    def snapshot_state(self) -> dict:
+        """
+        Checkpoint of everything a stage of `play_once` changes: actor poses and velocities, articulation
+        root pose, qpos, qvel and drive targets, gripper values, RNG states, recorded joint paths and frames.
+        """
+        actors = []
+        for actor in self.scene.get_all_actors():
+            rigid = actor.find_component_by_type(sapien.physx.PhysxRigidDynamicComponent)
+            velocity = None
+            if rigid is not None and not rigid.kinematic:
+                velocity = (rigid.get_linear_velocity(), rigid.get_angular_velocity())
+            actors.append((actor.get_pose(), velocity))
+        articulations = []
+        for articulation in self.scene.get_all_articulations():
+            articulations.append({
+                "root_pose": articulation.get_root_pose(),
+                "root_velocity": (articulation.get_root_linear_velocity(), articulation.get_root_angular_velocity()),
+                "qpos": articulation.get_qpos(),
+                "qvel": articulation.get_qvel(),
+                "drive_targets": [(joint.get_drive_target(), joint.get_drive_velocity_target())
+                                  for joint in articulation.get_active_joints()],
+            })
+        return {
+            "names": self.get_sim_state_names(),
+            "actors": actors,
+            "articulations": articulations,
+            "gripper_val": (self.robot.left_gripper_val, self.robot.right_gripper_val),
+            "rng": (np.random.get_state(), random.getstate(), torch.get_rng_state()),
+            "joint_path_len": (len(self.left_joint_path), len(self.right_joint_path)),
+            "cnt": (self.left_cnt, self.right_cnt, self.take_action_cnt),
+            "frame_idx": self.FRAME_IDX,
+            "state_frames_len": len(self.state_frames),
+            "info": deepcopy(self.info),
+            "plan_success": self.plan_success,
+            "stage_success_tag": self.stage_success_tag,
+        }
+
+    def restore_state(self, snapshot: dict):
+        """
+        Restore a `snapshot_state` checkpoint. Frames recorded after the checkpoint are discarded.
+        PhysX solver caches are not part of the snapshot, so physics continues from the same state
+        but not bit-identically to a run that never went past the checkpoint.
+        """
+        if snapshot["names"] != self.get_sim_state_names():
+            raise ValueError("Snapshot does not match the entities of the scene")
+        for actor, (pose, velocity) in zip(self.scene.get_all_actors(), snapshot["actors"]):
+            actor.set_pose(pose)
+            if velocity is not None:
+                rigid = actor.find_component_by_type(sapien.physx.PhysxRigidDynamicComponent)
+                rigid.set_linear_velocity(velocity[0])
+                rigid.set_angular_velocity(velocity[1])
+        for articulation, state in zip(self.scene.get_all_articulations(), snapshot["articulations"]):
+            articulation.set_root_pose(state["root_pose"])
+            articulation.set_root_linear_velocity(state["root_velocity"][0])
+            articulation.set_root_angular_velocity(state["root_velocity"][1])
+            articulation.set_qpos(state["qpos"])
+            articulation.set_qvel(state["qvel"])
+            for joint, (target, velocity_target) in zip(articulation.get_active_joints(), state["drive_targets"]):
+                joint.set_drive_target(target)
+                joint.set_drive_velocity_target(velocity_target)
+        self.robot.left_gripper_val, self.robot.right_gripper_val = snapshot["gripper_val"]
+
+        np_state, py_state, torch_state = snapshot["rng"]
+        np.random.set_state(np_state)
+        random.setstate(py_state)
+        torch.set_rng_state(torch_state)
+
+        left_len, right_len = snapshot["joint_path_len"]
+        del self.left_joint_path[left_len:]
+        del self.right_joint_path[right_len:]
+        self.left_cnt, self.right_cnt, self.take_action_cnt = snapshot["cnt"]
+        del self.state_frames[snapshot["state_frames_len"]:]
+        del self.proprio_frames[snapshot["state_frames_len"]:]
+        self._discard_frames_after(snapshot["frame_idx"])
+        self.info = deepcopy(snapshot["info"])
+        self.plan_success = snapshot["plan_success"]
+        self.stage_success_tag = snapshot["stage_success_tag"]
+
+    def _discard_frames_after(self, frame_idx: int):
+        if self.FRAME_IDX <= frame_idx:
+            return
+        if self.frame_buffer is not None:
+            self.frame_buffer.truncate(frame_idx)
+        elif self.save_data:
+            for idx in range(frame_idx, self.FRAME_IDX):
+                file_path = self.folder_path["cache"] + f"{idx}.pkl"
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        self.FRAME_IDX = frame_idx
+
+    def run_stage(self, stage) -> bool:
+        """
+        Run one stage of a composite `play_once` with checkpoint / retry.
+        - stage: callable without arguments, `self.stage_attempt` holds the attempt index (0 for the first try).
+
+        When planning fails the scene is restored to the checkpoint taken before the stage, the numpy RNG is
+        re-seeded per attempt and the stage is retried, up to `stage_retries` times (task config). The motion
+        planners are randomized, so a retry explores other paths even for deterministic stages.
+        The successful attempt is recorded (`stage_attempts`) so that the collection pass replays it.
+        """
+        if not self.plan_success:
+            return False
+        stage_idx = self.stage_cnt
+        self.stage_cnt += 1
+
+        if not self.need_plan:  # replay the attempt that succeeded while planning
+            attempt = self.stage_attempts[stage_idx] if stage_idx < len(self.stage_attempts) else 0
+            if attempt > 0:
+                # go through the same restore as the planning pass did
+                self.restore_state(self.snapshot_state())
+                np.random.seed((self.seed * 7919 + stage_idx * 131 + attempt) % 2**32)
+            self.stage_attempt = attempt
+            stage()
+            return self.plan_success
+
+        checkpoint = self.snapshot_state()
+        for attempt in range(self.stage_retries + 1):
+            if attempt > 0:
+                print(f"\033[93mstage {stage_idx} failed, retry {attempt} / {self.stage_retries}\033[0m")
+                self.restore_state(checkpoint)
+                np.random.seed((self.seed * 7919 + stage_idx * 131 + attempt) % 2**32)
+            self.stage_attempt = attempt
+            stage()
+            if self.plan_success:
+                break
+        self.stage_attempts.append(self.stage_attempt)
+        return self.plan_success
 
     def save_camera_rgb(self, save_path, camera_name='head_camera'):
         self._update_render()
         self.cameras.update_picture()
-        rgb = self.cameras.get_rgb()
+        rgb = self.cameras.get_rgb(store_full=True)
         save_img(save_path, rgb[camera_name]['rgb'])
 
+    @profiled()
     def _take_picture(self):  # save data
+        if self.record_state:
+            self._record_state()
         if not self.save_data:
             return
 
@@ -519,17 +823,41 @@ class Base_Task(gym.Env):
                     file_list = os.listdir(directory)
                     for file in file_list:
                         os.remove(directory + file)
+            self.proprio_values = {}
 
-        pkl_dic = self.get_obs()
-        save_pkl(self.folder_path["cache"] + f"{self.FRAME_IDX}.pkl", pkl_dic)  # use cache
+        self._save_frame(self.get_obs(), self.FRAME_IDX)
         self.FRAME_IDX += 1
 
+    def _save_frame(self, pkl_dic: dict, frame_idx: int):
+        """Per-frame bookkeeping shared by `_take_picture` and `replay_state`, then write the frame."""
+        if self.collect_norm_stats:
+            for key, value in get_proprio_vectors(pkl_dic).items():
+                self.proprio_values.setdefault(key, []).append(value)
+        if self.camera_params == "episode" and self.cameras is not None:
+            # static camera parameters are written once per episode by `merge_pkl_to_hdf5_video`
+            for camera_name, config in self.cameras.get_static_config().items():
+                for key in config.keys():
+                    pkl_dic["observation"][camera_name].pop(key, None)
+        with profile_span("save_frame"):
+            if self.frame_buffer is not None:
+                self.frame_buffer.append(pkl_dic)
+            else:
+                save_pkl(self.folder_path["cache"] + f"{frame_idx}.pkl", pkl_dic)  # use cache
+
     def save_traj_data(self, idx):
         file_path = os.path.join(self.save_dir, "_traj_data", f"episode{idx}.pkl")
         traj_data = {
             "left_joint_path": deepcopy(self.left_joint_path),
             "right_joint_path": deepcopy(self.right_joint_path),
+            "stage_attempts": deepcopy(self.stage_attempts),
         }
+        if self.record_state:
+            traj_data["sim_state"] = {
+                "names": self.get_sim_state_names(),
+                "poses": np.stack(self.state_frames),
+                "proprio": self.proprio_frames,
+                "info": deepcopy(self.info),
+            }
         save_pkl(file_path, traj_data)
 
     def load_tran_data(self, idx):
@@ -539,6 +867,7 @@ class Base_Task(gym.Env):
             traj_data = pickle.load(f)
         return traj_data
 
+    @profiled()
     def merge_pkl_to_hdf5_video(self):
         if not self.save_data:
             return
@@ -548,9 +877,26 @@ class Base_Task(gym.Env):
         # print('Merging pkl to hdf5: ', cache_path, ' -> ', target_file_path)
 
         os.makedirs(f"{self.save_dir}/data", exist_ok=True)
-        process_folder_to_hdf5_video(cache_path, target_file_path, target_video_path)
+        static_camera = None
+        if self.camera_params == "episode" and self.cameras is not None:
+            static_camera = self.cameras.get_static_config()
+        norm_stats = None
+        if self.collect_norm_stats:
+            norm_stats = {
+                key: RunningStats.from_values(np.stack(values))
+                for key, values in self.proprio_values.items()
+            }
+        if self.frame_buffer is not None:
+            frames_to_hdf5_and_video(self.frame_buffer, target_file_path, target_video_path, self.data_encoding,
+                                     static_camera, norm_stats)
+        else:
+            process_folder_to_hdf5_video(cache_path, target_file_path, target_video_path, self.data_encoding,
+                                         static_camera, norm_stats)
 
     def remove_data_cache(self):
+        if self.frame_buffer is not None:
+            self.frame_buffer.clear()  # also removes spilled frames
+            return
         folder_path = self.folder_path["cache"]
         GREEN = "\033[92m"
         RED = "\033[91m"
@@ -571,6 +917,7 @@ class Base_Task(gym.Env):
         self.need_plan = args.get("need_plan", True)
         self.left_joint_path = args.get("left_joint_path", [])
         self.right_joint_path = args.get("right_joint_path", [])
+        self.stage_attempts = args.get("stage_attempts", [])
 
     def _set_eval_video_ffmpeg(self, ffmpeg):
         self.eval_video_ffmpeg = ffmpeg
@@ -868,7 +1215,7 @@ class Base_Task(gym.Env):
                 )
                 now_right_id += 1
 
-            self.scene.step()
+            self.step_scene()
             if self.render_freq and i % self.render_freq == 0:
                 self._update_render()
                 self.viewer.render()
@@ -967,31 +1314,26 @@ class Base_Task(gym.Env):
 
         return True
 
-    def get_gripper_actor_contact_position(self, actor_name):
-        contacts = self.scene.get_contacts()
-        position_lst = []
-        for contact in contacts:
-            if (contact.bodies[0].entity.name == actor_name or contact.bodies[1].entity.name == actor_name):
-                contact_object = (contact.bodies[1].entity.name
-                                  if contact.bodies[0].entity.name == actor_name else contact.bodies[0].entity.name)
-                if contact_object in self.robot.gripper_name:
-                    for point in contact.points:
-                        position_lst.append(point.position)
-        return position_lst
+    def get_gripper_actor_contact_position(self, actor):
+        """
+        Positions of the contact points between an actor and the robot grippers.
+        - actor: Actor (or entity name).
+        """
+        return self.get_contact_index().get_contact_positions(actor, self.robot.gripper_name)
 
     def check_actors_contact(self, actor1, actor2):
         """
         Check if two actors are in contact.
-        - actor1: The first actor.
-        - actor2: The second actor.
+        - actor1: The first actor (Actor, entity or entity name).
+        - actor2: The second actor (Actor, entity or entity name).
         """
-        contacts = self.scene.get_contacts()
-        for contact in contacts:
-            if (contact.bodies[0].entity.name == actor1
-                    and contact.bodies[1].entity.name == actor2) or (contact.bodies[0].entity.name == actor2
-                                                                     and contact.bodies[1].entity.name == actor1):
-                return True
-        return False
+        return self.get_contact_index().in_contact(actor1, actor2)
+
+    def get_actors_contact(self, actor1, actor2) -> dict[str, np.ndarray]:
+        """
+        Contact points and impulses between two actors, as {"points": (n, 3), "impulses": (n, 3)}.
+        """
+        return self.get_contact_index().get_contact(actor1, actor2)
 
     def get_scene_contact(self):
         contacts = self.scene.get_contacts()
@@ -1461,7 +1803,7 @@ class Base_Task(gym.Env):
                     right_gripper["per_step"],
                 )  # TODO
 
-            self.scene.step()
+            self.step_scene()
 
             if self.render_freq and control_idx % self.render_freq == 0:
                 self._update_render()
@@ -1540,9 +1882,9 @@ class Base_Task(gym.Env):
             topp_left_flag, topp_right_flag = True, True
 
             try:
-                times, left_pos, left_vel, acc, duration = (self.robot.left_mplib_planner.TOPP(left_path,
-                                                                                            1 / 250,
-                                                                                            verbose=True))
+                with profile_span("TOPP"):
+                    times, left_pos, left_vel, acc, duration = (self.robot.left_mplib_planner.TOPP(
+                        left_path, 1 / 250, verbose=True))
                 left_result = dict()
                 left_result["position"], left_result["velocity"] = left_pos, left_vel
                 left_n_step = left_result["position"].shape[0]
@@ -1556,9 +1898,9 @@ class Base_Task(gym.Env):
                 left_n_step = 50  # fixed
 
             try:
-                times, right_pos, right_vel, acc, duration = (self.robot.right_mplib_planner.TOPP(right_path,
-                                                                                                1 / 250,
-                                                                                                verbose=True))
+                with profile_span("TOPP"):
+                    times, right_pos, right_vel, acc, duration = (self.robot.right_mplib_planner.TOPP(
+                        right_path, 1 / 250, verbose=True))
                 right_result = dict()
                 right_result["position"], right_result["velocity"] = right_pos, right_vel
                 right_n_step = right_result["position"].shape[0]
@@ -1651,7 +1993,7 @@ class Base_Task(gym.Env):
 
                 now_right_id += 1
 
-            self.scene.step()
+            self.step_scene()
             self._update_render()
                 
             if self.check_success():
@@ -84,4 +84,4 @@ class beat_block_hammer(Base_Task):
         block_pose = self.block.get_functional_point(1, "pose").p
         eps = np.array([0.02, 0.02])
         return np.all(abs(hammer_target_pose[:2] - block_pose[:2]) < eps) and self.check_actors_contact(
-            self.hammer.get_name(), self.block.get_name())
+            self.hammer, self.block)
@@ -52,12 +52,21 @@ class Camera:
         self.random_head_camera_dis = random_head_camera_dis
 
         self.static_camera_config = []
+        self._static_config = None
         self.head_camera_type = kwags["camera"].get("head_camera_type", "D435")
         self.wrist_camera_type = kwags["camera"].get("wrist_camera_type", "D435")
 
         self.collect_head_camera = kwags["camera"].get("collect_head_camera", True)
         self.collect_wrist_camera = kwags["camera"].get("collect_wrist_camera", True)
 
+        # extra policy-ready rgb outputs, stored as `rgb_{name}` next to (or instead of) the full resolution `rgb`
+        self.render_targets = kwags["camera"].get("render_targets") or {}
+        self.store_full_rgb = kwags["camera"].get("store_full_rgb", True)
+        for name, target in self.render_targets.items():
+            if target.get("mode", "render") not in ("render", "resize"):
+                raise ValueError(f"Unknown mode {target['mode']} of render target {name}, expected render or resize")
+        self.target_cameras = {}
+
         # embodiment = kwags.get('embodiment')
         # embodiment_config_path = os.path.join(CONFIGS_PATH, '_embodiment_config.yml')
         # with open(embodiment_config_path, 'r', encoding='utf-8') as f:
@@ -167,6 +176,7 @@ class Camera:
 
         # ================================= static camera =================================
         self.head_camera_id = None
+        self._static_config = None
         self.static_camera_list = []
         # self.static_sensor_camera_list = []
         self.static_camera_name = []
@@ -216,6 +226,30 @@ class Camera:
                 # self.static_sensor_camera_list.append(sensor_camera)
                 self.static_camera_config.append(camera_config)
 
+        # ================================= render targets =================================
+        def create_target_camera(source, camera_name, target_name, target):
+            camera = scene.add_camera(
+                name=f"{camera_name}_{target_name}",
+                width=target["w"],
+                height=target["h"],
+                fovy=source.fovy,
+                near=near,
+                far=far,
+            )
+            # keep the field of view of the source in both directions, i.e. the image a resize would give
+            camera.set_fovx(source.fovx, compute_y=False)
+            camera.entity.set_pose(source.entity.get_pose())
+            return camera
+
+        self.target_cameras = {}
+        for target_name, target in self.render_targets.items():
+            if target.get("mode", "render") != "render":
+                continue
+            self.target_cameras[target_name] = {
+                camera_name: create_target_camera(camera, camera_name, target_name, target)
+                for camera_name, camera in self.get_collected_cameras()
+            }
+
         # observer camera
         self.observer_camera = scene.add_camera(
             name="observer_camera",
@@ -270,14 +304,52 @@ class Camera:
         world_cam_mat44[:3, 3] = world_cam_pos
         self.world_camera2.entity.set_pose(sapien.Pose(world_cam_mat44))
 
-    def update_picture(self):
-        # camera
+    def consume_random_state(self):
+        """
+        Draw the same random numbers as `load_camera` without creating any camera,
+        so that physics-only runs reproduce the scenes of rendered runs.
+        """
+        for camera_info in self.static_camera_info_list:
+            if camera_info["name"] == "head_camera":
+                if self.collect_head_camera:
+                    np.random.randn(3)
+                    np.random.uniform(low=0, high=self.random_head_camera_dis)
+            else:
+                np.random.randn(3)
+                np.random.uniform(low=0, high=0)
+
+    def get_collected_cameras(self) -> list:
+        """(name, camera) of the wrist and static cameras whose observations are collected."""
+        cameras = []
         if self.collect_wrist_camera:
-            self.left_camera.take_picture()
-            self.right_camera.take_picture()
+            cameras += [("left_camera", self.left_camera), ("right_camera", self.right_camera)]
+        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
+            if camera_name == "head_camera" and not self.collect_head_camera:
+                continue
+            cameras.append((camera_name, camera))
+        return cameras
 
-        for camera in self.static_camera_list:
-            camera.take_picture()
+    def needs_full_picture(self) -> bool:
+        """Whether `get_rgb` reads the full resolution cameras (full rgb stored, or a resize target)."""
+        return self.store_full_rgb or any(
+            target.get("mode", "render") == "resize" for target in self.render_targets.values())
+
+    def update_picture(self, full=True):
+        """
+        - full: render the full resolution cameras, can be skipped when only `render` targets are read.
+        """
+        # camera
+        if full:
+            if self.collect_wrist_camera:
+                self.left_camera.take_picture()
+                self.right_camera.take_picture()
+
+            for camera in self.static_camera_list:
+                camera.take_picture()
+
+        for cameras in self.target_cameras.values():
+            for camera in cameras.values():
+                camera.take_picture()
 
         # ================================= sensor camera =================================
         # self.head_sensor.take_picture()
@@ -291,8 +363,16 @@ class Camera:
         if self.collect_wrist_camera:
             self.left_camera.entity.set_pose(left_pose)
             self.right_camera.entity.set_pose(right_pose)
+            for cameras in self.target_cameras.values():
+                cameras["left_camera"].entity.set_pose(left_pose)
+                cameras["right_camera"].entity.set_pose(right_pose)
 
-    def get_config(self) -> dict:
+    def get_config(self, include_static=True) -> dict:
+        """
+        Camera parameters per camera name.
+        - include_static: also return the static cameras, which never move within an episode
+          (see `get_static_config`), otherwise only the wrist cameras.
+        """
         res = {}
 
         def _get_config(camera):
@@ -309,23 +389,52 @@ class Camera:
             res["left_camera"] = _get_config(self.left_camera)
             res["right_camera"] = _get_config(self.right_camera)
 
-        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
-            if camera_name == "head_camera":
-                if self.collect_head_camera:
-                    res[camera_name] = _get_config(camera)
-            else:
-                res[camera_name] = _get_config(camera)
+        if include_static:
+            for camera_name, config in self.get_static_config().items():
+                res[camera_name] = {key: value.copy() for key, value in config.items()}
         # ================================= sensor camera =================================
         # res['head_sensor'] = res['head_camera']
         # print(res)
         return res
 
-    def get_rgb(self) -> dict:
-        rgba = self.get_rgba()
+    def get_static_config(self) -> dict:
+        """Parameters of the static cameras, computed once: their pose is fixed after `load_camera`."""
+        if self._static_config is None:
+            self._static_config = {}
+            for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
+                if camera_name == "head_camera" and not self.collect_head_camera:
+                    continue
+                self._static_config[camera_name] = {
+                    "intrinsic_cv": camera.get_intrinsic_matrix(),
+                    "extrinsic_cv": camera.get_extrinsic_matrix(),
+                    "cam2world_gl": camera.get_model_matrix(),
+                }
+        return self._static_config
+
+    def get_rgb(self, store_full=None) -> dict:
+        """
+        `rgb` (full resolution) and `rgb_{name}` of every render target per camera.
+        - store_full: return the full resolution `rgb`, default `store_full_rgb` of the camera config.
+        """
+        store_full = self.store_full_rgb if store_full is None else store_full
+        resize_targets = {
+            name: target
+            for name, target in self.render_targets.items() if target.get("mode", "render") == "resize"
+        }
+        rgba = self.get_rgba() if store_full or len(resize_targets) > 0 else {}
         rgb = {}
         for camera_name, camera_data in rgba.items():
             rgb[camera_name] = {}
-            rgb[camera_name]["rgb"] = camera_data["rgba"][:, :, :3]  # Exclude alpha channel
+            full_rgb = camera_data["rgba"][:, :, :3]  # Exclude alpha channel
+            if store_full:
+                rgb[camera_name]["rgb"] = full_rgb
+            for name, target in resize_targets.items():
+                rgb[camera_name][f"rgb_{name}"] = cv2.resize(full_rgb, (target["w"], target["h"]),
+                                                             interpolation=cv2.INTER_AREA)
+        for name, cameras in self.target_cameras.items():
+            for camera_name, camera in cameras.items():
+                target_rgba = (camera.get_picture("Color") * 255).clip(0, 255).astype("uint8")
+                rgb.setdefault(camera_name, {})[f"rgb_{name}"] = target_rgba[:, :, :3]
         return rgb
     
     # Get Camera RGBA
@@ -83,7 +83,7 @@ class click_alarmclock(Base_Task):
         if not self.check_arm_function():
             return False
         alarm_pose = self.alarm.get_contact_point(0)[:3]
-        positions = self.get_gripper_actor_contact_position("046_alarm-clock")
+        positions = self.get_gripper_actor_contact_position(self.alarm)
         eps = [0.03, 0.03]
         for position in positions:
             if (np.all(np.abs(position[:2] - alarm_pose[:2]) < eps) and abs(position[2] - alarm_pose[2]) < 0.03):
@@ -74,7 +74,7 @@ class click_bell(Base_Task):
         if not self.check_arm_function():
             return False
         bell_pose = self.bell.get_contact_point(0)[:3]
-        positions = self.get_gripper_actor_contact_position("050_bell")
+        positions = self.get_gripper_actor_contact_position(self.bell)
         eps = [0.025, 0.025]
         for position in positions:
             if (np.all(np.abs(position[:2] - bell_pose[:2]) < eps) and abs(position[2] - bell_pose[2]) < 0.03):
@@ -98,7 +98,7 @@ class handover_mic(Base_Task):
 
     def check_success(self):
         microphone_pose = self.microphone.get_functional_point(0)
-        contact = self.get_gripper_actor_contact_position("018_microphone")
+        contact = self.get_gripper_actor_contact_position(self.microphone)
         if len(contact) == 0:
             return False
         close_gripper_func = self.is_left_gripper_close if self.handover_arm_tag == "left" else self.is_right_gripper_close
@@ -142,8 +142,8 @@ class place_can_basket(Base_Task):
         can_p = self.can.get_pose().p
         basket_p = self.basket.get_pose().p
         basket_axis = (self.basket.get_pose().to_transformation_matrix()[:3, :3] @ np.array([[0, 1, 0]]).T)
-        can_contact_table = not self.check_actors_contact("071_can", "table")
-        can_contact_basket = self.check_actors_contact("071_can", "110_basket")
+        can_contact_table = not self.check_actors_contact(self.can, self.table)
+        can_contact_basket = self.check_actors_contact(self.can, self.basket)
         return (basket_p[2] - self.start_height > 0.02 and \
                 can_p[2] - self.object_start_height > 0.02 and \
                 np.dot(basket_axis.reshape(3), [0, 0, 1]) > 0.5 and \
@@ -142,8 +142,8 @@ class place_object_basket(Base_Task):
         toy_p = self.object.get_pose().p
         basket_p = self.basket.get_pose().p
         basket_axis = (self.basket.get_pose().to_transformation_matrix()[:3, :3] @ np.array([[0, 1, 0]]).T)
-        obj_contact_table = not self.check_actors_contact(self.object_name, "table")
-        obj_contact_basket = self.check_actors_contact(self.object_name, self.basket_name)
+        obj_contact_table = not self.check_actors_contact(self.object, self.table)
+        obj_contact_basket = self.check_actors_contact(self.object, self.basket)
         return (basket_p[2] - self.start_height > 0.02 and \
                 toy_p[2] - self.object_start_height > 0.02 and \
                 np.dot(basket_axis.reshape(3), [0, 0, 1]) > 0.5 and \
@@ -46,7 +46,7 @@ class press_stapler(Base_Task):
         if self.stage_success_tag:
             return True
         stapler_pose = self.stapler.get_contact_point(2)[:3]
-        positions = self.get_gripper_actor_contact_position("048_stapler")
+        positions = self.get_gripper_actor_contact_position(self.stapler)
         eps = [0.03, 0.03]
         for position in positions:
             if (np.all(np.abs(position[:2] - stapler_pose[:2]) < eps) and abs(position[2] - stapler_pose[2]) < 0.03):
@@ -162,13 +162,13 @@ class put_bottles_dustbin_stack_blocks_three_open_microwave(Base_Task):
         self.prohibited_area.append([-0.25, -0.25, 0.25, 0.1])
 
     def play_once(self):
-        """依次执行所有子任务"""
-        # self.info["info"] = {{}}
-        
-        # ========== 执行子任务 1: put_bottles_dustbin_stack_blocks_three ==========
-        """依次执行所有子任务"""
-        # self.info["info"] = {{}}
+        """依次执行所有子任务, 子任务规划失败时从该子任务开始前的检查点重试"""
+        self.run_stage(self.put_bottles_dustbin_stage)
+        self.run_stage(self.stack_blocks_three_stage)
+        self.run_stage(self.open_microwave_stage)
+        return self.info
 
+    def put_bottles_dustbin_stage(self):
         # ========== 执行子任务 1: put_bottles_dustbin ==========
         # Sort bottles based on their x and y coordinates
         bottle_lst = sorted(self.bottles, key=lambda x: [x.get_pose().p[0] > 0, x.get_pose().p[1]])
@@ -228,8 +228,8 @@ class put_bottles_dustbin_stack_blocks_three_open_microwave(Base_Task):
             "{C}": f"114_bottle/base{self.bottle_id[2]}",
             "{D}": f"011_dustbin/base0",
         }
-        # # return self.info
 
+    def stack_blocks_three_stage(self):
         # ========== 执行子任务 2: stack_blocks_three ==========
         # Initialize tracking variables for last used gripper and actor
         self.last_gripper = None
@@ -251,8 +251,8 @@ class put_bottles_dustbin_stack_blocks_three_open_microwave(Base_Task):
             "{b}": str(arm_tag2),
             "{c}": str(arm_tag3),
         }
-        # return self.info
 
+    def open_microwave_stage(self):
         # ========== 执行子任务 2: open_microwave ==========
         arm_tag = ArmTag("left")
 
@@ -322,8 +322,6 @@ class put_bottles_dustbin_stack_blocks_three_open_microwave(Base_Task):
             "{A}": f"{self.model_name}/base{self.model_id}",
             "{a}": str(arm_tag),
         }
-        return self.info
-
 
     def pick_and_place_block(self, block: Actor):
         block_pose = block.get_pose().p
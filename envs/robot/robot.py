@@ -12,6 +12,7 @@ from copy import deepcopy
 import sapien.core as sapien
 import envs._GLOBAL_CONFIGS as CONFIGS
 from envs.utils import transforms
+from envs.utils.profiler import profiled
 from .planner import CuroboPlanner
 import torch.multiprocessing as mp
 
@@ -352,6 +353,7 @@ class Robot:
         else:
             return self.right_planner.plan_grippers(now_val, target_val)
 
+    @profiled()
     def left_plan_multi_path(
         self,
         target_lst,
@@ -387,6 +389,7 @@ class Robot:
                 arms_tag="left",
             )
 
+    @profiled()
     def right_plan_multi_path(
         self,
         target_lst,
@@ -422,6 +425,7 @@ class Robot:
                 arms_tag="right",
             )
 
+    @profiled()
     def left_plan_path(
         self,
         target_pose,
@@ -456,6 +460,7 @@ class Robot:
                 arms_tag="left",
             )
 
+    @profiled()
     def right_plan_path(
         self,
         target_pose,
@@ -8,3 +8,9 @@ from .actor_utils import *
 from .transforms import *
 from .pkl2hdf5 import *
 from .images_to_video import *
+from .frame_buffer import *
+from .asset_cache import *
+from .contact_index import *
+from .profiler import *
+from .manifest import *
+from .norm_stats import *
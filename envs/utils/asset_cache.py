@@ -0,0 +1,168 @@
+"""
+Asset cache: a consolidated metadata index for `assets/objects` (parsed model_data and resolved collision /
+visual files) and an in-process json cache.
+
+Build it once with `python script/build_asset_cache.py`. Every model entry keeps a signature of its directory
+(file count and latest mtime), a model whose files changed since is resolved from the file system again.
+Without an index every lookup falls back to the file system, so the cache is always optional. Collision
+shapes are untouched: SAPIEN still builds them from the original files.
+"""
+
+import json
+import os
+import re
+from copy import deepcopy
+from functools import lru_cache
+from pathlib import Path
+
+OBJECTS_DIR = "assets/objects"
+ASSET_INDEX_FILE = os.path.join(OBJECTS_DIR, "_asset_index.json")
+ASSET_INDEX_VERSION = 2
+
+
+def _model_key(model_id) -> str:
+    return "default" if model_id is None else str(model_id)
+
+
+def _glb_or_obj_file(modeldir: Path, model_id) -> Path:
+    file = modeldir / ("base.glb" if model_id is None else f"base{model_id}.glb")
+    if not file.exists():
+        file = modeldir / ("textured.obj" if model_id is None else f"textured{model_id}.obj")
+    return file
+
+
+def resolve_actor_files(modeldir, model_id) -> tuple[Path, Path] | None:
+    """Collision and visual files of a model, preferring the `collision/` and `visual/` sub-directories."""
+    modeldir = Path(modeldir)
+    collision_file = None
+    visual_file = None
+    if (modeldir / "collision").exists():
+        collision_file = _glb_or_obj_file(modeldir / "collision", model_id)
+    if collision_file is None or not collision_file.exists():
+        collision_file = _glb_or_obj_file(modeldir, model_id)
+
+    if (modeldir / "visual").exists():
+        visual_file = _glb_or_obj_file(modeldir / "visual", model_id)
+    if visual_file is None or not visual_file.exists():
+        visual_file = _glb_or_obj_file(modeldir, model_id)
+
+    if not collision_file.exists() or not visual_file.exists():
+        return None
+    return collision_file, visual_file
+
+
+@lru_cache(maxsize=4096)
+def _load_json(json_file_path: str):
+    try:
+        with open(json_file_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def load_json_cached(json_file_path) -> dict | None:
+    """Parsed json file (None if missing or invalid), read from disk once per process. Returns a copy."""
+    data = _load_json(str(json_file_path))
+    return deepcopy(data)
+
+
+@lru_cache(maxsize=1)
+def get_asset_index() -> dict:
+    if not os.path.exists(ASSET_INDEX_FILE):
+        return {}
+    with open(ASSET_INDEX_FILE, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != ASSET_INDEX_VERSION:
+        print(f"\033[93mAsset index {ASSET_INDEX_FILE} is outdated, please rebuild it\033[0m")
+        return {}
+    return index.get("models", {})
+
+
+def get_model_dir_signature(model_dir) -> dict:
+    """Count and latest mtime of the files of a model directory and its `collision/` and `visual/` sub-directories."""
+    num_files, max_mtime = 0, 0.0
+    for directory in [Path(model_dir), Path(model_dir) / "collision", Path(model_dir) / "visual"]:
+        if not directory.is_dir():
+            continue
+        max_mtime = max(max_mtime, directory.stat().st_mtime)
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    num_files += 1
+                    max_mtime = max(max_mtime, entry.stat().st_mtime)
+    return {"num_files": num_files, "max_mtime": max_mtime}
+
+
+@lru_cache(maxsize=1024)
+def _get_model_records(modelname: str):
+    model = get_asset_index().get(modelname)
+    if model is None:
+        return None
+    if model["signature"] != get_model_dir_signature(os.path.join(OBJECTS_DIR, modelname)):
+        print(f"\033[93mAsset index entry of {modelname} is outdated, please rebuild the index\033[0m")
+        return None
+    return model["variants"]
+
+
+@lru_cache(maxsize=1024)
+def _get_model_record(modelname: str, model_key: str):
+    return (_get_model_records(modelname) or {}).get(model_key)
+
+
+def get_model_record(modelname: str, model_id) -> dict | None:
+    """
+    Index entry of a model: `model_data` and the resolved `collision` and `visual` files.
+    None if the model is not indexed or its files changed after the index was built.
+    """
+    record = _get_model_record(modelname, _model_key(model_id))
+    return deepcopy(record)
+
+
+def clear_asset_cache():
+    _load_json.cache_clear()
+    get_asset_index.cache_clear()
+    _get_model_records.cache_clear()
+    _get_model_record.cache_clear()
+
+
+# =========================================================== Build ===========================================================
+
+
+def _index_model_dir(model_dir: Path) -> dict:
+    records = {}
+    model_ids = [None]
+    for file in model_dir.iterdir():
+        match = re.search(r"^model_data(\d+)\.json$", file.name)
+        if match:
+            model_ids.append(int(match.group(1)))
+
+    for model_id in model_ids:
+        json_file = model_dir / ("model_data.json" if model_id is None else f"model_data{model_id}.json")
+        files = resolve_actor_files(model_dir, model_id)
+        if files is None and not json_file.exists():
+            continue
+        record = {"model_data": _load_json(str(json_file)) if json_file.exists() else None}
+        if files is not None:
+            record["collision"], record["visual"] = str(files[0]), str(files[1])
+        records[_model_key(model_id)] = record
+    return records
+
+
+def build_asset_index(objects_dir=OBJECTS_DIR) -> dict:
+    """Scan `assets/objects` and write the consolidated index."""
+    models = {}
+    for model_dir in sorted(Path(objects_dir).iterdir()):
+        if not model_dir.is_dir() or model_dir.name.startswith("_"):
+            continue
+        signature = get_model_dir_signature(model_dir)
+        records = _index_model_dir(model_dir)
+        if len(records) > 0:
+            models[model_dir.name] = {"signature": signature, "variants": records}
+
+    # several collection workers may rebuild at once, write atomically
+    tmp_file = f"{ASSET_INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"version": ASSET_INDEX_VERSION, "models": models}, f)
+    os.replace(tmp_file, ASSET_INDEX_FILE)
+    clear_asset_cache()
+    return models
@@ -0,0 +1,72 @@
+import numpy as np
+from sapien.physx import PhysxArticulation
+
+from .actor_utils import Actor
+
+
+def get_entity_ids(actor) -> set[int]:
+    """Per-scene ids of the entities of an actor (every link for articulations)."""
+    if isinstance(actor, Actor):
+        actor = actor.actor
+    if isinstance(actor, PhysxArticulation):
+        return {link.entity.per_scene_id for link in actor.get_links()}
+    return {actor.per_scene_id}
+
+
+class ContactIndex:
+    """
+    All contacts of one physics step, indexed by the unordered pair of entity ids in contact.
+    Each pair maps to the positions and impulses of all its contact points.
+    """
+
+    def __init__(self, contacts):
+        self.pairs: dict[tuple[int, int], dict[str, list]] = {}
+        self.neighbors: dict[int, set[int]] = {}
+        self.names: dict[int, str] = {}
+        for contact in contacts:
+            entity0, entity1 = contact.bodies[0].entity, contact.bodies[1].entity
+            id0, id1 = entity0.per_scene_id, entity1.per_scene_id
+            self.names[id0], self.names[id1] = entity0.name, entity1.name
+            self.neighbors.setdefault(id0, set()).add(id1)
+            self.neighbors.setdefault(id1, set()).add(id0)
+
+            pair = self.pairs.setdefault(self.key(id0, id1), {"points": [], "impulses": []})
+            for point in contact.points:
+                pair["points"].append(point.position)
+                pair["impulses"].append(point.impulse)
+
+    @staticmethod
+    def key(id0: int, id1: int) -> tuple[int, int]:
+        return (id0, id1) if id0 <= id1 else (id1, id0)
+
+    def get_ids(self, actor) -> set[int]:
+        """Entity ids of an actor, or of every entity in contact with the given name."""
+        if isinstance(actor, str):
+            return {entity_id for entity_id, name in self.names.items() if name == actor}
+        return get_entity_ids(actor)
+
+    def in_contact(self, actor1, actor2) -> bool:
+        ids1, ids2 = self.get_ids(actor1), self.get_ids(actor2)
+        return any(len(self.neighbors.get(entity_id, set()) & ids2) > 0 for entity_id in ids1)
+
+    def get_contact(self, actor1, actor2) -> dict[str, np.ndarray]:
+        """Contact points and impulses between two actors, shape (n, 3) each."""
+        points, impulses = [], []
+        for id1 in self.get_ids(actor1):
+            for id2 in self.neighbors.get(id1, set()) & self.get_ids(actor2):
+                pair = self.pairs[self.key(id1, id2)]
+                points += pair["points"]
+                impulses += pair["impulses"]
+        return {
+            "points": np.array(points, dtype=np.float32).reshape(-1, 3),
+            "impulses": np.array(impulses, dtype=np.float32).reshape(-1, 3),
+        }
+
+    def get_contact_positions(self, actor, other_names) -> list:
+        """Contact positions between an actor and every entity whose name is in `other_names`."""
+        position_lst = []
+        for entity_id in self.get_ids(actor):
+            for other_id in self.neighbors.get(entity_id, set()):
+                if self.names[other_id] in other_names:
+                    position_lst += self.pairs[self.key(entity_id, other_id)]["points"]
+        return position_lst
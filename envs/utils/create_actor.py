@@ -3,10 +3,11 @@ import numpy as np
 from pathlib import Path
 import transforms3d as t3d
 import sapien.physx as sapienp
-import json
 import os, re
+from functools import lru_cache
 
 from .actor_utils import Actor, ArticulationActor
+from .asset_cache import get_model_record, load_json_cached, resolve_actor_files
 
 
 class UnStableError(Exception):
@@ -410,12 +411,9 @@ def create_obj(
         file_name = modeldir / f"textured{model_id}.obj"
         json_file_path = modeldir / f"model_data{model_id}.json"
 
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
+    model_data = load_json_cached(json_file_path)
+    if model_data is not None:
         scale = model_data["scale"]
-    except:
-        model_data = None
 
     builder = scene.create_actor_builder()
     if is_static:
@@ -456,12 +454,9 @@ def create_glb(
         file_name = modeldir / f"base{model_id}.glb"
         json_file_path = modeldir / f"model_data{model_id}.json"
 
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
+    model_data = load_json_cached(json_file_path)
+    if model_data is not None:
         scale = model_data["scale"]
-    except:
-        model_data = None
 
     builder = scene.create_actor_builder()
     if is_static:
@@ -515,28 +510,21 @@ def create_actor(
     else:
         json_file_path = modeldir / f"model_data{model_id}.json"
 
-    collision_file = ""
-    visual_file = ""
-    if (modeldir / "collision").exists():
-        collision_file = get_glb_or_obj_file(modeldir / "collision", model_id)
-    if collision_file == "" or not collision_file.exists():
-        collision_file = get_glb_or_obj_file(modeldir, model_id)
-
-    if (modeldir / "visual").exists():
-        visual_file = get_glb_or_obj_file(modeldir / "visual", model_id)
-    if visual_file == "" or not visual_file.exists():
-        visual_file = get_glb_or_obj_file(modeldir, model_id)
-
-    if not collision_file.exists() or not visual_file.exists():
-        print(modelname, "is not exist model file!")
-        return None
-
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
+    # prefer the asset index (one directory stat per model and process), fall back to resolving the files on disk
+    record = get_model_record(modelname, model_id)
+    if record is not None and "collision" in record:
+        collision_file, visual_file = record["collision"], record["visual"]
+        model_data = record["model_data"]
+    else:
+        files = resolve_actor_files(modeldir, model_id)
+        if files is None:
+            print(modelname, "is not exist model file!")
+            return None
+        collision_file, visual_file = files
+        model_data = load_json_cached(json_file_path)
+
+    if model_data is not None:
         scale = model_data["scale"]
-    except:
-        model_data = None
 
     builder = scene.create_actor_builder()
     if is_static:
@@ -568,12 +556,9 @@ def create_urdf_obj(scene, pose: sapien.Pose, modelname: str, scale=1.0, fix_roo
     loader: sapien.URDFLoader = scene.create_urdf_loader()
     loader.scale = scale
 
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
+    model_data = load_json_cached(json_file_path)
+    if model_data is not None:
         loader.scale = model_data["scale"][0]
-    except:
-        model_data = None
 
     loader.fix_root_link = fix_root_link
     loader.load_multiple_collisions_from_file = True
@@ -584,6 +569,28 @@ def create_urdf_obj(scene, pose: sapien.Pose, modelname: str, scale=1.0, fix_roo
     return ArticulationActor(object, model_data)
 
 
+@lru_cache(maxsize=1024)
+def get_sapien_urdf_dir(modelname: str, modelid: int = None) -> Path:
+    """Directory of the `modelid`-th variant of a SAPIEN urdf model (resolved once per process)."""
+    modeldir = Path("assets") / "objects" / modelname
+    if modelid is None:
+        return modeldir
+    model_list = [model for model in modeldir.iterdir() if model.is_dir() and model.name != "visual"]
+
+    def extract_number(filename):
+        match = re.search(r"\d+", filename.name)
+        return int(match.group()) if match else 0
+
+    model_list = sorted(model_list, key=extract_number)
+
+    if modelid >= len(model_list):
+        for model in model_list:
+            if modelid == int(model.name):
+                return model
+        raise ValueError(f"modelid {modelid} is out of range for {modelname}.")
+    return model_list[modelid]
+
+
 def create_sapien_urdf_obj(
     scene,
     pose: sapien.Pose,
@@ -594,32 +601,11 @@ def create_sapien_urdf_obj(
 ) -> ArticulationActor:
     scene, pose = preprocess(scene, pose)
 
-    modeldir = Path("assets") / "objects" / modelname
-    if modelid is not None:
-        model_list = [model for model in modeldir.iterdir() if model.is_dir() and model.name != "visual"]
-
-        def extract_number(filename):
-            match = re.search(r"\d+", filename.name)
-            return int(match.group()) if match else 0
-
-        model_list = sorted(model_list, key=extract_number)
-
-        if modelid >= len(model_list):
-            is_find = False
-            for model in model_list:
-                if modelid == int(model.name):
-                    modeldir = model
-                    is_find = True
-                    break
-            if not is_find:
-                raise ValueError(f"modelid {modelid} is out of range for {modelname}.")
-        else:
-            modeldir = model_list[modelid]
+    modeldir = get_sapien_urdf_dir(modelname, modelid)
     json_file = modeldir / "model_data.json"
 
-    if json_file.exists():
-        with open(json_file, "r") as file:
-            model_data = json.load(file)
+    model_data = load_json_cached(json_file)
+    if model_data is not None:
         scale = model_data["scale"]
         trans_mat = np.array(model_data.get("transform_matrix", np.eye(4)))
     else:
@@ -646,9 +632,8 @@ def create_sapien_urdf_obj(
             for link in object.get_links():
                 link.set_mass(model_data["mass"].get(link.get_name(), 0.1))
 
-        bounding_box_file = modeldir / "bounding_box.json"
-        if bounding_box_file.exists():
-            bounding_box = json.load(open(bounding_box_file, "r", encoding="utf-8"))
+        bounding_box = load_json_cached(modeldir / "bounding_box.json")
+        if bounding_box is not None:
             model_data["extents"] = (np.array(bounding_box["max"]) - np.array(bounding_box["min"])).tolist()
     object.set_name(modelname)
     return ArticulationActor(object, model_data)
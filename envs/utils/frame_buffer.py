@@ -0,0 +1,68 @@
+import os
+import shutil
+import pickle
+import numpy as np
+
+from .save_file import save_pkl
+
+
+def get_nbytes(data):
+    """Approximate memory size of a (nested) observation dict, counting numpy arrays only."""
+    if isinstance(data, dict):
+        return sum(get_nbytes(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(get_nbytes(value) for value in data)
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    return 0
+
+
+class FrameBuffer:
+    """
+    Scratch buffer for the observation frames of one episode.
+    Frames are kept in memory up to `max_bytes`, later frames are spilled to `spill_dir` as `{idx}.pkl`
+    (the same layout as the pkl cache, so `process_folder_to_hdf5_video` can read a fully spilled buffer).
+    """
+
+    def __init__(self, spill_dir: str, max_bytes: int):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.memory_frames = []
+        self.memory_bytes = 0
+        self.num_spilled = 0
+
+    def __len__(self):
+        return len(self.memory_frames) + self.num_spilled
+
+    def append(self, frame: dict):
+        nbytes = get_nbytes(frame)
+        # once spilling starts every later frame goes to disk, so memory frames are always a prefix
+        if self.num_spilled == 0 and self.memory_bytes + nbytes <= self.max_bytes:
+            self.memory_frames.append(frame)
+            self.memory_bytes += nbytes
+        else:
+            save_pkl(os.path.join(self.spill_dir, f"{len(self)}.pkl"), frame)
+            self.num_spilled += 1
+
+    def __iter__(self):
+        yield from self.memory_frames
+        for idx in range(len(self.memory_frames), len(self)):
+            with open(os.path.join(self.spill_dir, f"{idx}.pkl"), "rb") as f:
+                yield pickle.load(f)
+
+    def truncate(self, num_frames: int):
+        """Keep only the first `num_frames` frames."""
+        num_memory = min(num_frames, len(self.memory_frames))
+        for idx in range(max(num_frames, len(self.memory_frames)), len(self)):
+            os.remove(os.path.join(self.spill_dir, f"{idx}.pkl"))
+        self.num_spilled = max(0, min(self.num_spilled, num_frames - len(self.memory_frames)))
+        self.memory_frames = self.memory_frames[:num_memory]
+        self.memory_bytes = sum(get_nbytes(frame) for frame in self.memory_frames)
+
+    def clear(self):
+        """Discard all frames, including the spilled ones."""
+        self.memory_frames = []
+        self.memory_bytes = 0
+        if self.num_spilled > 0 and os.path.exists(self.spill_dir):
+            shutil.rmtree(self.spill_dir)
+        self.num_spilled = 0
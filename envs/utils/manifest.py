@@ -0,0 +1,253 @@
+"""
+Append-only episode manifest of a collection run, `<save_path>/manifest.jsonl`.
+
+Every seed attempt and every collected episode is one json line, appended under an exclusive file lock,
+so several workers can share a manifest and a crash never leaves a half-rewritten file. Workers sharing a
+save path take seeds (`claim_seed`) and episode indices (`claim_episode`) under the same lock. The current state
+(episode index -> seed, scene info, files) is obtained by replaying the records:
+
+    {"type": "attempt", "seed": 12, "status": "success", "episode": 3, "time_s": 4.1, ...}
+    {"type": "attempt", "seed": 13, "status": "fail", "reason": "check_success", ...}
+    {"type": "collected", "episode": 3, "seed": 12, "info": {...}, "files": {...}, ...}
+    {"type": "move", "from": 9, "to": 3}    # episode 9 takes the place of episode 3
+    {"type": "drop", "episode": 9}
+    {"type": "claim", "seed": 14}           # seed taken by a worker, no other worker tries it
+    {"type": "reserve", "episode": 4, "phase": "plan", "host": "node1", "pid": 123}
+
+`export_legacy` writes the `seed.txt` and `scene_info.json` files that older tools read.
+"""
+
+import os
+import json
+import time
+import fcntl
+import socket
+from contextlib import contextmanager
+
+MANIFEST_FILE = "manifest.jsonl"
+
+
+def atomic_write_text(path: str, text: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _worker_alive(record: dict) -> bool:
+    """Whether the process that wrote `record` still runs, assumed for processes of another host."""
+    if record.get("host") != socket.gethostname():
+        return True
+    if record.get("pid") == os.getpid():
+        return True
+    try:
+        os.kill(record["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class EpisodeManifest:
+
+    def __init__(self, save_path: str, import_legacy=True):
+        """
+        - import_legacy: a run without manifest but with `seed.txt` / `scene_info.json` is imported first,
+          so resuming an old run keeps its seeds.
+        """
+        self.save_path = save_path
+        self.path = os.path.join(save_path, MANIFEST_FILE)
+        self.records = []
+        self._offset = 0
+        os.makedirs(save_path, exist_ok=True)
+        if import_legacy and not os.path.exists(self.path):
+            self.import_legacy()
+        self.reload()
+
+    # ------------------------------------------------------------------ io
+
+    @contextmanager
+    def locked(self):
+        """Exclusive lock of the manifest, records appended by other workers are loaded on entry."""
+        with open(self.path, "ab+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._read_new(f)
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_new(self, f):
+        f.seek(self._offset)
+        for line in f:
+            if not line.endswith(b"\n"):  # a record still being written by another worker
+                break
+            self._offset += len(line)
+            if line.strip():
+                self.records.append(json.loads(line))
+
+    def reload(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                self._read_new(f)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write(self, f, record: dict):
+        record.setdefault("time", time.strftime("%Y-%m-%d %H:%M:%S"))
+        record.setdefault("pid", os.getpid())
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        f.write(line)  # append mode, always at the end
+        f.flush()
+        os.fsync(f.fileno())
+        self._offset += len(line)
+        self.records.append(record)
+
+    def append(self, record: dict) -> dict:
+        with self.locked() as f:
+            self._write(f, record)
+        return record
+
+    # ------------------------------------------------------------------ records
+
+    def add_attempt(self, seed: int, status: str, episode: int = None, reason: str = None, **fields) -> dict:
+        """A seed search attempt, `status` is success or fail, a success is assigned to `episode`."""
+        record = {"type": "attempt", "seed": int(seed), "status": status}
+        if episode is not None:
+            record["episode"] = int(episode)
+        if reason is not None:
+            record["reason"] = reason
+        record.update(fields)
+        return self.append(record)
+
+    def add_collected(self, episode: int, seed: int, info: dict, files: dict = None, **fields) -> dict:
+        """The data of `episode` was written, `info` is the scene info returned by `play_once`."""
+        record = {"type": "collected", "episode": int(episode), "seed": int(seed), "info": info}
+        if files is not None:
+            record["files"] = files
+        record.update(fields)
+        return self.append(record)
+
+    def replace_with_last(self, episode: int) -> int:
+        """Drop `episode` and move the last episode into its place, returns the index of the moved episode."""
+        with self.locked() as f:
+            episodes = self.episodes()
+            if episode not in episodes:
+                raise KeyError(f"Episode {episode} is not in {self.path}")
+            last = max(episodes.keys())
+            if last == episode:
+                self._write(f, {"type": "drop", "episode": int(episode)})
+            else:
+                self._write(f, {"type": "move", "from": int(last), "to": int(episode)})
+        return last
+
+    def claim_seed(self) -> int:
+        """Take the next seed that no worker has tried or taken yet."""
+        with self.locked() as f:
+            seed = self.next_seed()
+            self._write(f, {"type": "claim", "seed": seed})
+        return seed
+
+    def claim_episode(self, episode_num: int, phase: str = "plan") -> int | None:
+        """
+        Reserve the lowest episode index below `episode_num` that still needs `phase` (plan: no successful
+        seed yet, collect: planned but not collected) and is not reserved by another running worker.
+        None when every episode is done or reserved.
+        """
+        with self.locked() as f:
+            episodes = self.episodes()
+            reserved = self.reserved_episodes(phase)
+            for idx in range(episode_num):
+                status = episodes.get(idx, {}).get("status")
+                needed = status is None if phase == "plan" else status == "planned"
+                if needed and idx not in reserved:
+                    self._write(f, {"type": "reserve", "episode": idx, "phase": phase, "host": socket.gethostname()})
+                    return idx
+        return None
+
+    def reserved_episodes(self, phase: str) -> set[int]:
+        """Episodes reserved for `phase` by workers that are still running (or run on another host)."""
+        return {
+            record["episode"]
+            for record in self.records
+            if record["type"] == "reserve" and record["phase"] == phase and _worker_alive(record)
+        }
+
+    # ------------------------------------------------------------------ state
+
+    def episodes(self) -> dict:
+        """Episode index -> {"seed", "status" (planned / collected), "info", "files", ...}."""
+        episodes = {}
+        for record in self.records:
+            record_type = record["type"]
+            if record_type == "attempt" and record["status"] == "success" and "episode" in record:
+                episodes[record["episode"]] = {"seed": record["seed"], "status": "planned"}
+            elif record_type == "collected":
+                episode = episodes.setdefault(record["episode"], {"seed": record["seed"]})
+                episode.update({
+                    "status": "collected",
+                    "info": record["info"],
+                    "files": record.get("files", {}),
+                })
+            elif record_type == "move":
+                if record["from"] in episodes:
+                    episodes[record["to"]] = episodes.pop(record["from"])
+            elif record_type == "drop":
+                episodes.pop(record["episode"], None)
+        return dict(sorted(episodes.items()))
+
+    def seed_list(self) -> list[int]:
+        """Seeds of the episodes 0..n-1, the content of the legacy `seed.txt`."""
+        episodes = self.episodes()
+        seed_list = []
+        while len(seed_list) in episodes:
+            seed_list.append(episodes[len(seed_list)]["seed"])
+        return seed_list
+
+    def next_seed(self) -> int:
+        """First seed after every attempted or claimed one, so known failures are not retried."""
+        seeds = [record["seed"] for record in self.records if record["type"] in ("attempt", "claim")]
+        return max(seeds) + 1 if len(seeds) > 0 else 0
+
+    def scene_info(self) -> dict:
+        """The content of the legacy `scene_info.json`."""
+        return {
+            f"episode_{idx}": episode["info"]
+            for idx, episode in self.episodes().items() if episode.get("status") == "collected"
+        }
+
+    # ------------------------------------------------------------------ legacy files
+
+    def export_legacy(self):
+        """Write `seed.txt` and `scene_info.json` from the manifest (atomic replace)."""
+        self.reload()
+        atomic_write_text(os.path.join(self.save_path, "seed.txt"), " ".join(map(str, self.seed_list())))
+        atomic_write_text(
+            os.path.join(self.save_path, "scene_info.json"),
+            json.dumps(self.scene_info(), ensure_ascii=False, indent=4),
+        )
+
+    def import_legacy(self):
+        seed_path = os.path.join(self.save_path, "seed.txt")
+        info_path = os.path.join(self.save_path, "scene_info.json")
+        if not os.path.exists(seed_path):
+            return
+        with open(seed_path, "r", encoding="utf-8") as f:
+            seed_list = [int(seed) for seed in f.read().split()]
+        scene_info = {}
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                scene_info = json.load(f)
+        with self.locked() as f:
+            if len(self.records) > 0:  # imported by another worker meanwhile
+                return
+            for idx, seed in enumerate(seed_list):
+                self._write(f, {"type": "attempt", "seed": seed, "status": "success", "episode": idx,
+                                "source": "seed.txt"})
+                if f"episode_{idx}" in scene_info:
+                    self._write(f, {"type": "collected", "episode": idx, "seed": seed,
+                                    "info": scene_info[f"episode_{idx}"], "source": "scene_info.json"})
@@ -0,0 +1,179 @@
+"""
+Mergeable normalization statistics of the proprioception, computed while an episode is collected and stored
+in the episode file as `/norm_stats/{joint_action, endpose}/{count, mean, m2, min, max, hist, hist_lo, hist_hi}`.
+
+Merging the statistics of any number of episodes (`merge_norm_stats`) only touches these small groups, so
+dataset-wide mean / std / quantiles are available without reading the trajectories again
+(see `script/merge_norm_stats.py`). DP fits its normalizer from them when every episode has them
+(`to_meta_arrays`, stored in the zarr `meta` by `policy/DP/process_data.py`). Only numpy and h5py are needed here.
+"""
+
+import h5py
+import numpy as np
+
+NUM_QUANTILE_BINS = 512
+STAT_FIELDS = ["count", "mean", "m2", "min", "max", "hist", "hist_lo", "hist_hi"]
+META_FIELDS = ["min", "max", "mean", "std"]
+
+
+def get_proprio_vectors(obs: dict) -> dict:
+    """The vectors of one observation that statistics are kept for, {name: (D, )}."""
+    vectors = {}
+    joint_action = obs.get("joint_action", {})
+    if "vector" in joint_action:
+        vectors["joint_action"] = np.asarray(joint_action["vector"], dtype=np.float64)
+    endpose = obs.get("endpose", {})
+    if "left_endpose" in endpose:
+        vectors["endpose"] = np.concatenate([
+            endpose["left_endpose"],
+            [endpose["left_gripper"]],
+            endpose["right_endpose"],
+            [endpose["right_gripper"]],
+        ]).astype(np.float64)
+    return vectors
+
+
+class RunningStats:
+    """
+    Count, mean, M2 (sum of squared deviations), min, max and a per-dimension histogram of equal-width bins
+    over [hist_lo, hist_hi] for the quantiles. Two stats merge exactly except the histograms, which are
+    re-binned onto the union range (error below one bin width).
+    """
+
+    def __init__(self, num_bins=NUM_QUANTILE_BINS):
+        self.num_bins = num_bins
+        self.count = 0
+        self.mean = self.m2 = self.min = self.max = None
+        self.hist = self.hist_lo = self.hist_hi = None
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, num_bins=NUM_QUANTILE_BINS):
+        """Statistics of `values` (N, D)."""
+        values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+        stats = cls(num_bins)
+        stats.count = len(values)
+        stats.mean = values.mean(axis=0)
+        stats.m2 = ((values - stats.mean)**2).sum(axis=0)
+        stats.min = values.min(axis=0)
+        stats.max = values.max(axis=0)
+        stats.hist_lo = stats.min.copy()
+        stats.hist_hi = np.maximum(stats.max, stats.min + 1e-9)  # constant dimensions (e.g. an unused gripper)
+        dim = values.shape[1]
+        bins = ((values - stats.hist_lo) / (stats.hist_hi - stats.hist_lo) * num_bins).astype(np.int64)
+        bins = np.clip(bins, 0, num_bins - 1) + np.arange(dim) * num_bins
+        stats.hist = np.bincount(bins.ravel(), minlength=dim * num_bins).reshape(dim, num_bins).astype(np.float64)
+        return stats
+
+    def _rebin(self, lo, hi):
+        """The histogram re-binned onto [lo, hi], assuming counts are uniform within a bin."""
+        hist = np.zeros_like(self.hist)
+        for d in range(len(self.hist)):
+            edges = np.linspace(self.hist_lo[d], self.hist_hi[d], self.num_bins + 1)
+            cdf = np.concatenate([[0.0], np.cumsum(self.hist[d])])
+            new_edges = np.linspace(lo[d], hi[d], self.num_bins + 1)
+            hist[d] = np.diff(np.interp(new_edges, edges, cdf))
+        return hist
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Add the statistics of `other` (Chan et al. parallel update), returns self."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            for field in STAT_FIELDS:
+                value = getattr(other, field)
+                setattr(self, field, value.copy() if isinstance(value, np.ndarray) else value)
+            self.num_bins = other.num_bins
+            return self
+        if other.num_bins != self.num_bins:
+            raise ValueError(f"Cannot merge statistics of {self.num_bins} and {other.num_bins} bins")
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+        self.mean = self.mean + delta * other.count / count
+        self.count = count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+        hist_lo = np.minimum(self.hist_lo, other.hist_lo)
+        hist_hi = np.maximum(self.hist_hi, other.hist_hi)
+        self.hist = self._rebin(hist_lo, hist_hi) + other._rebin(hist_lo, hist_hi)
+        self.hist_lo, self.hist_hi = hist_lo, hist_hi
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / max(self.count, 1))
+
+    def quantile(self, q: float) -> np.ndarray:
+        quantiles = np.zeros(len(self.hist))
+        for d in range(len(self.hist)):
+            edges = np.linspace(self.hist_lo[d], self.hist_hi[d], self.num_bins + 1)
+            cdf = np.concatenate([[0.0], np.cumsum(self.hist[d])])
+            quantiles[d] = np.interp(q * cdf[-1], cdf, edges)
+        return np.clip(quantiles, self.min, self.max)
+
+    def summary(self) -> dict:
+        return {
+            "count": int(self.count),
+            "mean": self.mean.tolist(),
+            "std": self.std.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+            "q01": self.quantile(0.01).tolist(),
+            "q99": self.quantile(0.99).tolist(),
+        }
+
+    def save(self, group):
+        for field in STAT_FIELDS:
+            group.create_dataset(field, data=getattr(self, field))
+
+    @classmethod
+    def load(cls, group):
+        stats = cls(group["hist"].shape[1])
+        for field in STAT_FIELDS:
+            setattr(stats, field, group[field][()])
+        stats.count = int(stats.count)
+        return stats
+
+
+def save_norm_stats(hdf5_file, norm_stats: dict):
+    group = hdf5_file.create_group("norm_stats")
+    for key, stats in norm_stats.items():
+        stats.save(group.create_group(key))
+
+
+def load_norm_stats(hdf5_path: str) -> dict:
+    """{name: RunningStats} of an episode file, empty if it was collected without statistics."""
+    with h5py.File(hdf5_path, "r") as f:
+        if "norm_stats" not in f:
+            return {}
+        return {key: RunningStats.load(group) for key, group in f["norm_stats"].items()}
+
+
+def merge_norm_stats(norm_stats_list) -> dict:
+    """Merge an iterable of {name: RunningStats}, names missing in some episodes are merged where present."""
+    merged = {}
+    for norm_stats in norm_stats_list:
+        for key, stats in norm_stats.items():
+            merged.setdefault(key, RunningStats(stats.num_bins)).merge(stats)
+    return merged
+
+
+def merge_complete_norm_stats(norm_stats_list) -> dict:
+    """`merge_norm_stats`, but empty if any episode was collected without statistics (a rescan is needed then)."""
+    complete = []
+    for norm_stats in norm_stats_list:
+        if len(norm_stats) == 0:
+            return {}
+        complete.append(norm_stats)
+    return merge_norm_stats(complete)
+
+
+def to_meta_arrays(norm_stats: dict, prefix="norm_stats") -> dict:
+    """Flat {f"{prefix}_{name}_{field}": (D, ) float32} of min / max / mean / std, as stored in a zarr `meta` group."""
+    arrays = {}
+    for name, stats in norm_stats.items():
+        for field in META_FIELDS:
+            arrays[f"{prefix}_{name}_{field}"] = np.asarray(getattr(stats, field), dtype=np.float32)
+    return arrays
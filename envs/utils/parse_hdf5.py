@@ -1,5 +1,30 @@
 import h5py, cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# decode-time downscaling of the encoded images, `cv2.IMREAD_REDUCED_*`
+IMREAD_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# groups holding episode-level data (not indexed by frame): static camera parameters, proprio statistics
+EPISODE_GROUPS = ("static_camera", "norm_stats")
+
+
+def decode_image(buf, flags=cv2.IMREAD_COLOR):
+    # buf 可能是 bytes，也可能是 np.ndarray(dtype=uint8)
+    if isinstance(buf, (bytes, bytearray)):
+        arr = np.frombuffer(buf, dtype=np.uint8)
+    elif isinstance(buf, np.ndarray) and buf.dtype == np.uint8:
+        arr = buf
+    else:
+        raise TypeError(f"Unsupported buffer type: {type(buf)}")
+    img = cv2.imdecode(arr, flags)
+    if img is None:
+        raise ValueError("cv2.imdecode 返回 None，说明字节流可能不是有效的图片格式")
+    return img
 
 
 def parse_img_array(data):
@@ -11,48 +36,229 @@ def parse_img_array(data):
     Returns:
         imgs: np.ndarray of shape (N, H, W, C), dtype=uint8
     """
-    # 确保 data 是可迭代的一维数组
-    flat = data.ravel()
+    # 解码成 BGR 图像, 将 list 转成形如 (N, H, W, C) 的 ndarray
+    return np.stack([decode_image(buf) for buf in data.ravel()], axis=0)
+
+
+def parse_depth_array(data, encoding: str, scale: float):
+    """
+    Decode an encoded depth dataset back to float64 millimetres (N, H, W), 0 where invalid.
+    - encoding: `encoding` attribute of the dataset, uint16 or png16.
+    - scale: `scale` attribute of the dataset, mm per stored unit.
+    """
+    if encoding == "png16":
+        data = np.stack(
+            [cv2.imdecode(np.frombuffer(buf, dtype=np.uint8), cv2.IMREAD_UNCHANGED) for buf in data.ravel()])
+    elif encoding != "uint16":
+        raise ValueError(f"Unknown depth encoding {encoding}")
+    return data.astype(np.float64) * scale
+
+
+def parse_pointcloud_group(group, frames=slice(None)):
+    """
+    Decode a `pointcloud` group (float32 / int16 encoding) to float32 (T, N, 6), xyz in m and rgb in [0, 1],
+    the same layout as the legacy float64 dataset.
+    - frames: index / slice of the frames to read, only the chunks of those frames are decompressed.
+    """
+    encoding = group.attrs["encoding"]
+    xyz = group["xyz"][frames]
+    if encoding == "int16":
+        xyz = xyz.astype(np.float32) * group.attrs["xyz_scale"].astype(np.float32) + group.attrs[
+            "xyz_offset"].astype(np.float32)
+    elif encoding != "float32":
+        raise ValueError(f"Unknown pointcloud encoding {encoding}")
+    rgb = group["rgb"][frames].astype(np.float32) / 255.0
+    return np.concatenate([xyz, rgb], axis=-1)
+
 
-    imgs = []
-    for buf in flat:
-        # buf 可能是 bytes，也可能是 np.ndarray(dtype=uint8)
-        if isinstance(buf, (bytes, bytearray)):
-            arr = np.frombuffer(buf, dtype=np.uint8)
-        elif isinstance(buf, np.ndarray) and buf.dtype == np.uint8:
-            arr = buf
+def read_pointcloud(node, frames=slice(None)):
+    """`pointcloud` of an episode file as (T, N, 6), float32 for the compact encodings, whatever the encoding."""
+    item = node["pointcloud"]
+    if isinstance(item, h5py.Group):
+        return parse_pointcloud_group(item, frames)
+    return item[frames]
+
+
+def read_rows(dataset, frames=slice(None)):
+    """`dataset[frames]`, `frames` may also be an unsorted list / array of indices (h5py wants increasing ones)."""
+    if isinstance(frames, (slice, int, np.integer)):
+        return dataset[frames]
+    frames = np.asarray(frames)
+    unique, inverse = np.unique(frames, return_inverse=True)
+    return dataset[unique][inverse]
+
+
+class EpisodeReader:
+    """
+    Lazy random access to an episode file: nothing is read until a key is requested, and then only the
+    requested frames. Keys are dataset paths such as `observation/head_camera/rgb` or `joint_action/vector`.
+
+        with EpisodeReader(path, reduce=2) as reader:
+            rgb = reader.read("observation/head_camera/rgb", frames=slice(0, None, 10))  # (T/10, H/2, W/2, 3)
+
+    - num_threads: threads decoding images (cv2 releases the GIL), 1 decodes inline.
+    - reduce: default decode-time downscaling of rgb images, 1, 2, 4 or 8 (`cv2.IMREAD_REDUCED_COLOR_*`).
+    """
+
+    def __init__(self, file_or_node, num_threads=8, reduce=1):
+        if isinstance(file_or_node, (h5py.File, h5py.Group)):
+            self.root = file_or_node
+            self._own_file = False
         else:
-            raise TypeError(f"Unsupported buffer type: {type(buf)}")
+            self.root = h5py.File(file_or_node, "r")
+            self._own_file = True
+        self.num_threads = num_threads
+        self.reduce = reduce
+        self._executor = None
 
-        # 解码成 BGR 图像
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("cv2.imdecode 返回 None，说明字节流可能不是有效的图片格式")
-        imgs.append(img)
+    def __enter__(self):
+        return self
 
-    # 将 list 转成形如 (N, H, W, C) 的 ndarray
-    return np.stack(imgs, axis=0)
+    def __exit__(self, *exc):
+        self.close()
 
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._own_file:
+            self.root.close()
 
-def h5_to_dict(node):
-    result = {}
-    for name, item in node.items():
-        if isinstance(item, h5py.Dataset):
-            data = item[()]
-            if "rgb" in name:
-                result[name] = parse_img_array(data)
+    def __contains__(self, key):
+        return key in self.root
+
+    def keys(self, group=None) -> list[str]:
+        """Paths of every readable key under `group`, compact point clouds count as one key."""
+        node = self.root if group is None else self.root[group]
+        keys = []
+
+        def visit(name, item):
+            if isinstance(item, h5py.Group) and "encoding" in item.attrs:  # compact pointcloud
+                keys.append(name)
+            elif isinstance(item, h5py.Dataset) and not any(name.startswith(key + "/") for key in keys):
+                keys.append(name)
+
+        node.visititems(visit)
+        prefix = "" if group is None else group.strip("/") + "/"
+        return [prefix + key for key in keys]
+
+    @property
+    def num_frames(self) -> int:
+        for key in self.keys():
+            if key.split("/")[0] not in EPISODE_GROUPS and self.get_shape(key):
+                return self.get_shape(key)[0]
+        return 0
+
+    def get_shape(self, key) -> tuple:
+        item = self.root[key]
+        return item["xyz"].shape if isinstance(item, h5py.Group) else item.shape
+
+    def read(self, key, frames=slice(None), reduce=None):
+        """Decoded frames `frames` (index, slice or index list) of `key`, see `h5_to_dict` for the decoding."""
+        item = self.root[key]
+        name = key.rstrip("/").split("/")[-1]
+        if isinstance(item, h5py.Group):
+            if name == "pointcloud" and "encoding" in item.attrs:
+                if not isinstance(frames, (slice, int, np.integer)):
+                    frames = np.asarray(frames)
+                    unique, inverse = np.unique(frames, return_inverse=True)
+                    return parse_pointcloud_group(item, unique)[inverse]
+                return parse_pointcloud_group(item, frames)
+            raise KeyError(f"{key} is a group, read one of {self.keys(key)}")
+        if item.ndim == 0:
+            return item[()]
+        if "rgb" in name and item.dtype.kind in ("S", "O"):  # encoded images
+            return self.read_images(key, frames, reduce)
+        data = read_rows(item, frames)
+        if name == "depth" and "encoding" in item.attrs:
+            return parse_depth_array(np.asarray(data), item.attrs["encoding"], item.attrs["scale"])
+        return data
+
+    def read_images(self, key, frames=slice(None), reduce=None):
+        """Encoded images of `key` decoded on the thread pool, (N, H, W, C) or (H, W, C) for a single frame."""
+        reduce = self.reduce if reduce is None else reduce
+        if reduce not in IMREAD_REDUCED_FLAGS:
+            raise ValueError(f"reduce must be one of {list(IMREAD_REDUCED_FLAGS.keys())}")
+        flags = IMREAD_REDUCED_FLAGS[reduce]
+        data = read_rows(self.root[key], frames)
+        if isinstance(frames, (int, np.integer)):
+            return decode_image(data, flags)
+        bufs = np.asarray(data).ravel()
+        if self.num_threads <= 1 or len(bufs) <= 1:
+            imgs = [decode_image(buf, flags) for buf in bufs]
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.num_threads)
+            imgs = list(self._executor.map(lambda buf: decode_image(buf, flags), bufs))
+        return np.stack(imgs, axis=0)
+
+    def read_dict(self, group=None, frames=slice(None)):
+        """Nested dict of `group` (default the whole file) as `h5_to_dict` builds it, restricted to `frames`."""
+        node = self.root if group is None else self.root[group]
+        result = {}
+        for name, item in node.items():
+            key = f"{node.name.rstrip('/')}/{name}"
+            if isinstance(item, h5py.Dataset):
+                if item.ndim == 0 or name in ("left_arm_dim", "right_arm_dim") or key.split("/")[1] in EPISODE_GROUPS:
+                    result[name] = item[()]  # not per frame
+                else:
+                    result[name] = self.read(key, frames)
+            elif name == "pointcloud" and "encoding" in item.attrs:
+                result[name] = self.read(key, frames)
             else:
-                result[name] = data
-        elif isinstance(item, h5py.Group):
-            # 递归处理子 group
-            result[name] = h5_to_dict(item)
-    # 如果你还想把 attributes 一并读进来，可以：
-    if hasattr(node, "attrs") and len(node.attrs) > 0:
-        result["_attrs"] = dict(node.attrs)
-    return result
-
-
-def read_hdf5(file_path):
-    with h5py.File(file_path, "r") as f:
-        data_dict = h5_to_dict(f)
+                # 递归处理子 group
+                result[name] = self.read_dict(key, frames)
+        if len(node.attrs) > 0:
+            result["_attrs"] = dict(node.attrs)
+        return result
+
+
+def h5_to_dict(node):
+    with EpisodeReader(node) as reader:
+        return reader.read_dict()
+
+
+def get_num_frames(data_dict) -> int | None:
+    """Length of the first per-frame array found in a `read_hdf5` dict."""
+    for name, value in data_dict.items():
+        if name in EPISODE_GROUPS or name == "_attrs":
+            continue
+        if isinstance(value, dict):
+            num_frames = get_num_frames(value)
+            if num_frames is not None:
+                return num_frames
+        elif isinstance(value, np.ndarray) and value.ndim > 0:
+            return len(value)
+    return None
+
+
+def expand_static_camera(data_dict, num_frames: int = None):
+    """
+    Present episode-level static camera parameters (`camera_params: episode`) in the legacy per-frame layout,
+    `observation/{camera}/{intrinsic_cv, extrinsic_cv, cam2world_gl}` of shape (T, ...).
+    The arrays are read-only broadcast views, no memory is spent on the repeated frames.
+    """
+    static_camera = data_dict.get("static_camera")
+    if static_camera is None:
+        return data_dict
+    if num_frames is None:
+        num_frames = get_num_frames(data_dict)
+    observation = data_dict.setdefault("observation", {})
+    for camera_name, config in static_camera.items():
+        camera_obs = observation.setdefault(camera_name, {})
+        for key, value in config.items():
+            camera_obs[key] = np.broadcast_to(value, (num_frames, *value.shape))
+    return data_dict
+
+
+def read_hdf5(file_path, per_frame_camera=False):
+    """
+    The whole episode as a nested dict, use `EpisodeReader` to read only some keys / frames.
+    - per_frame_camera: expand episode-level static camera parameters to the legacy per-frame view,
+      see `expand_static_camera`.
+    """
+    with EpisodeReader(file_path) as reader:
+        data_dict = reader.read_dict()
+    if per_frame_camera:
+        expand_static_camera(data_dict)
     return data_dict
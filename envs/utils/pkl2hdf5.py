@@ -5,6 +5,44 @@ import cv2
 from collections.abc import Mapping, Sequence
 import shutil
 from .images_to_video import images_to_video
+from .norm_stats import save_norm_stats
+
+# how observations are stored in the episode hdf5, overridden by `data_encoding` in the task config
+DEFAULT_DATA_ENCODING = {
+    "depth": "float64",  # float64 (raw mm), uint16 (mm / depth_scale), png16 (uint16 png per frame)
+    "depth_scale": 1.0,  # mm per uint16 unit
+    "depth_clip": [0, 65535],  # mm, depth outside the range is stored as 0 (invalid)
+    "pointcloud": "float64",  # float64 (raw (T, N, 6)), float32 / int16 (xyz as float32 / int16 + rgb as uint8)
+    "pointcloud_xyz_scale": 1e-4,  # m per int16 unit (smallest step), grown per episode if the points need it
+    "compression": "none",  # none, gzip, lzf, blosc (needs hdf5plugin)
+    "compression_level": 4,
+}
+
+
+def get_data_encoding(data_encoding: dict = None) -> dict:
+    encoding = dict(DEFAULT_DATA_ENCODING)
+    if data_encoding is not None:
+        encoding.update(data_encoding)
+    return encoding
+
+
+def get_compression_kwargs(encoding: dict) -> dict:
+    """`create_dataset` keyword arguments of the configured compression filter."""
+    compression = encoding["compression"]
+    if compression in (None, "none"):
+        return {}
+    if compression == "gzip":
+        return {"compression": "gzip", "compression_opts": encoding["compression_level"]}
+    if compression == "lzf":
+        return {"compression": "lzf"}
+    if compression == "blosc":
+        try:
+            import hdf5plugin
+        except ImportError:
+            raise ImportError("blosc compression needs hdf5plugin, please `pip install hdf5plugin`")
+        return dict(hdf5plugin.Blosc(cname="zstd", clevel=encoding["compression_level"],
+                                     shuffle=hdf5plugin.Blosc.SHUFFLE))
+    raise ValueError(f"Unknown compression {compression}, expected none, gzip, lzf or blosc")
 
 
 def images_encoding(imgs):
@@ -22,6 +60,74 @@ def images_encoding(imgs):
     return encode_data, max_len
 
 
+def depth_encoding(depths: np.ndarray, encoding: dict) -> np.ndarray:
+    """Depth in mm (T, H, W) -> uint16 in units of `depth_scale` mm, 0 outside `depth_clip`."""
+    clip_min, clip_max = encoding["depth_clip"]
+    scale = encoding["depth_scale"]
+    clip_max = min(clip_max, 65535 * scale)
+    valid = (depths >= clip_min) & (depths <= clip_max)
+    return np.where(valid, np.round(depths / scale), 0).astype(np.uint16)
+
+
+def create_depth_dataset(hdf5_group, key, value: np.ndarray, encoding: dict):
+    if encoding["depth"] == "float64":
+        hdf5_group.create_dataset(key, data=value)
+        return
+    depths = depth_encoding(value, encoding)
+    if encoding["depth"] == "uint16":
+        dataset = hdf5_group.create_dataset(key, data=depths, chunks=(1, *depths.shape[1:]),
+                                            **get_compression_kwargs(encoding))
+    elif encoding["depth"] == "png16":
+        encode_data = [cv2.imencode(".png", depth)[1].tobytes() for depth in depths]
+        max_len = max(len(data) for data in encode_data)
+        dataset = hdf5_group.create_dataset(key, data=encode_data, dtype=f"S{max_len}")
+    else:
+        raise ValueError(f"Unknown depth encoding {encoding['depth']}, expected float64, uint16 or png16")
+    dataset.attrs["encoding"] = encoding["depth"]
+    dataset.attrs["scale"] = encoding["depth_scale"]  # mm per unit
+    dataset.attrs["clip"] = encoding["depth_clip"]
+
+
+def pointcloud_encoding(pointclouds: np.ndarray, encoding: dict):
+    """
+    Point clouds (T, N, 6) with xyz in m and rgb in [0, 1] -> (xyz, rgb uint8, attrs).
+    int16 stores xyz as round((xyz - offset) / scale), offset is the centre of the episode bounding box.
+    """
+    xyz, rgb = pointclouds[..., :3], pointclouds[..., 3:6]
+    rgb = np.round(np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+    attrs = {"encoding": encoding["pointcloud"]}
+    if encoding["pointcloud"] == "float32":
+        return xyz.astype(np.float32), rgb, attrs
+    if xyz.size == 0:
+        offset, scale = np.zeros(3), np.full(3, float(encoding["pointcloud_xyz_scale"]))
+    else:
+        xyz_min, xyz_max = xyz.reshape(-1, 3).min(axis=0), xyz.reshape(-1, 3).max(axis=0)
+        offset = (xyz_min + xyz_max) / 2
+        scale = np.maximum(float(encoding["pointcloud_xyz_scale"]), (xyz_max - xyz_min) / 65534)
+    attrs["xyz_offset"] = offset
+    attrs["xyz_scale"] = scale
+    return np.round((xyz - offset) / scale).astype(np.int16), rgb, attrs
+
+
+def create_pointcloud_dataset(hdf5_group, key, value: np.ndarray, encoding: dict):
+    """float64 keeps the legacy (T, N, 6) dataset, otherwise `key` is a group of `xyz` and `rgb`, one chunk per frame."""
+    if encoding["pointcloud"] == "float64" or value.size == 0:  # empty when pointcloud is not collected
+        hdf5_group.create_dataset(key, data=value)
+        return
+    if encoding["pointcloud"] not in ("float32", "int16"):
+        raise ValueError(f"Unknown pointcloud encoding {encoding['pointcloud']}, expected float64, float32 or int16")
+    if value.ndim != 3 or value.shape[-1] < 6:
+        raise ValueError(f"Expected point clouds of shape (T, N, 6) for the {encoding['pointcloud']} encoding, "
+                         f"got {value.shape}, is pcd_down_sample_num set?")
+    xyz, rgb, attrs = pointcloud_encoding(value, encoding)
+    group = hdf5_group.create_group(key)
+    compression_kwargs = get_compression_kwargs(encoding)
+    group.create_dataset("xyz", data=xyz, chunks=(1, *xyz.shape[1:]), **compression_kwargs)
+    group.create_dataset("rgb", data=rgb, chunks=(1, *rgb.shape[1:]), **compression_kwargs)
+    for name, attr in attrs.items():
+        group.attrs[name] = attr
+
+
 def parse_dict_structure(data):
     if isinstance(data, dict):
         parsed = {}
@@ -54,16 +160,21 @@ def load_pkl_file(pkl_path):
     return data
 
 
-def create_hdf5_from_dict(hdf5_group, data_dict):
+def create_hdf5_from_dict(hdf5_group, data_dict, encoding: dict = None):
+    encoding = get_data_encoding(encoding)
     for key, value in data_dict.items():
         if isinstance(value, dict):
             subgroup = hdf5_group.create_group(key)
-            create_hdf5_from_dict(subgroup, value)
+            create_hdf5_from_dict(subgroup, value, encoding)
         elif isinstance(value, list):
             value = np.array(value)
             if "rgb" in key:
                 encode_data, max_len = images_encoding(value)
                 hdf5_group.create_dataset(key, data=encode_data, dtype=f"S{max_len}")
+            elif key == "depth":
+                create_depth_dataset(hdf5_group, key, value, encoding)
+            elif key == "pointcloud":
+                create_pointcloud_dataset(hdf5_group, key, value, encoding)
             else:
                 hdf5_group.create_dataset(key, data=value)
         else:
@@ -75,19 +186,57 @@ def create_hdf5_from_dict(hdf5_group, data_dict):
                 print(f"Error storing value for key '{key}': {e}")
 
 
-def pkl_files_to_hdf5_and_video(pkl_files, hdf5_path, video_path):
-    data_list = parse_dict_structure(load_pkl_file(pkl_files[0]))
-    for pkl_file_path in pkl_files:
-        pkl_file = load_pkl_file(pkl_file_path)
-        append_data_to_structure(data_list, pkl_file)
+def create_static_camera_group(hdf5_file, static_camera: dict):
+    """
+    Episode-level parameters of the static cameras: `/static_camera/{camera}/{intrinsic_cv, extrinsic_cv,
+    cam2world_gl}`, the per-frame `observation/{camera}` groups then only hold images.
+    """
+    group = hdf5_file.create_group("static_camera")
+    for camera_name, config in static_camera.items():
+        camera_group = group.create_group(camera_name)
+        for key, value in config.items():
+            camera_group.create_dataset(key, data=value)
+    hdf5_file.attrs["camera_params"] = "episode"
 
-    images_to_video(np.array(data_list["observation"]["head_camera"]["rgb"]), out_path=video_path)
+
+def frames_to_hdf5_and_video(frames, hdf5_path, video_path, encoding: dict = None, static_camera: dict = None,
+                             norm_stats: dict = None):
+    """
+    Write an iterable of observation dicts (one per frame, in order) to hdf5 and video.
+    - encoding: overrides of `DEFAULT_DATA_ENCODING`.
+    - static_camera: parameters of the static cameras (`Camera.get_static_config`), stored once per episode.
+    - norm_stats: {name: RunningStats} of the episode, stored as `/norm_stats` (see `norm_stats.py`).
+    """
+    data_list = None
+    for frame in frames:
+        if data_list is None:
+            data_list = parse_dict_structure(frame)
+        append_data_to_structure(data_list, frame)
+
+    if data_list is None:
+        raise ValueError(f"No frames to save to {hdf5_path}")
+
+    # full resolution head camera, or its first render target when only those are stored
+    head_camera = data_list["observation"]["head_camera"]
+    video_key = "rgb" if "rgb" in head_camera else sorted(key for key in head_camera if key.startswith("rgb"))[0]
+    images_to_video(np.array(head_camera[video_key]), out_path=video_path)
 
     with h5py.File(hdf5_path, "w") as f:
-        create_hdf5_from_dict(f, data_list)
+        create_hdf5_from_dict(f, data_list, encoding)
+        if static_camera is not None:
+            create_static_camera_group(f, static_camera)
+        if norm_stats:
+            save_norm_stats(f, norm_stats)
+
+
+def pkl_files_to_hdf5_and_video(pkl_files, hdf5_path, video_path, encoding: dict = None, static_camera: dict = None,
+                                norm_stats: dict = None):
+    frames_to_hdf5_and_video((load_pkl_file(pkl_file_path) for pkl_file_path in pkl_files), hdf5_path, video_path,
+                             encoding, static_camera, norm_stats)
 
 
-def process_folder_to_hdf5_video(folder_path, hdf5_path, video_path):
+def process_folder_to_hdf5_video(folder_path, hdf5_path, video_path, encoding: dict = None,
+                                 static_camera: dict = None, norm_stats: dict = None):
     pkl_files = []
     for fname in os.listdir(folder_path):
         if fname.endswith(".pkl") and fname[:-4].isdigit():
@@ -106,4 +255,4 @@ def process_folder_to_hdf5_video(folder_path, hdf5_path, video_path):
             raise ValueError(f"Missing file {expected}.pkl")
         expected += 1
 
-    pkl_files_to_hdf5_and_video(pkl_files, hdf5_path, video_path)
+    pkl_files_to_hdf5_and_video(pkl_files, hdf5_path, video_path, encoding, static_camera, norm_stats)
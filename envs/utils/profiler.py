@@ -0,0 +1,228 @@
+"""
+Nested-span profiler for data collection.
+
+    with profile_span("load_actors"):
+        ...
+
+    @profiled("get_obs")
+    def get_obs(self): ...
+
+Spans are no-ops (a single flag check) unless the profiler is enabled, e.g. by `profile: true`
+in the task config. Each episode produces a json summary (total / self time per span path) and a
+Chrome trace (open in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import os
+import json
+import time
+import threading
+from functools import wraps
+
+
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+
+    def __init__(self, profiler: "Profiler", name: str, args: dict = None):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._pop(self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.save_dir = None
+        self.episode_name = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self.events = []
+        self._batch = None
+
+    # ------------------------------------------------------------------ control
+
+    def enable(self, save_dir: str):
+        self.enabled = True
+        self.save_dir = save_dir
+        os.makedirs(save_dir, exist_ok=True)
+
+    def disable(self):
+        self.flush_batch()
+        self.enabled = False
+
+    def start_episode(self, episode_name: str):
+        self.episode_name = episode_name
+        self.events = []
+        self._batch = None
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+
+    def end_episode(self, extra_info: dict = None) -> dict | None:
+        """Write `{episode}.json` (summary) and `{episode}.trace.json` (Chrome trace), then reset."""
+        if not self.enabled or self.episode_name is None:
+            return None
+        self.flush_batch()
+        summary = self.summary()
+        if extra_info is not None:
+            summary["info"] = extra_info
+        with open(os.path.join(self.save_dir, f"{self.episode_name}.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4)
+        self.export_chrome_trace(os.path.join(self.save_dir, f"{self.episode_name}.trace.json"))
+        self.episode_name = None
+        self.events = []
+        return summary
+
+    # ------------------------------------------------------------------ recording
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _push(self, name: str):
+        self.flush_batch()
+        stack = self._stack()
+        path = f"{stack[-1][0]}/{name}" if len(stack) > 0 else name
+        stack.append([path, name, 0])  # path, name, time spent in children
+
+    def _pop(self, start: int, end: int, args: dict = None):
+        self.flush_batch()
+        stack = self._stack()
+        path, name, child_ns = stack.pop()
+        duration = end - start
+        if len(stack) > 0:
+            stack[-1][2] += duration
+        self._record(name, path, start, duration, duration - child_ns, args)
+
+    def _record(self, name, path, start, duration, self_ns, args=None, count=1):
+        with self._lock:
+            self.events.append({
+                "name": name,
+                "path": path,
+                "start": start - self._origin,
+                "duration": duration,
+                "self": self_ns,
+                "tid": threading.get_ident(),
+                "args": args,
+                "count": count,
+            })
+
+    def add_batched(self, name: str, start: int, end: int):
+        """
+        Record a very frequent, short operation (e.g. one physics step). Consecutive calls are merged
+        into a single span that ends as soon as any other span starts or ends.
+        """
+        batch = self._batch
+        if batch is not None and batch["name"] == name:
+            batch["end"] = end
+            batch["busy"] += end - start
+            batch["count"] += 1
+            return
+        self.flush_batch()
+        stack = self._stack()
+        self._batch = {
+            "name": name,
+            "path": f"{stack[-1][0]}/{name}" if len(stack) > 0 else name,
+            "start": start,
+            "end": end,
+            "busy": end - start,
+            "count": 1,
+        }
+
+    def flush_batch(self):
+        batch = self._batch
+        if batch is None:
+            return
+        self._batch = None
+        stack = self._stack()
+        if len(stack) > 0:
+            stack[-1][2] += batch["busy"]
+        # the span covers first to last call, its self time is only the time spent inside the calls
+        self._record(batch["name"], batch["path"], batch["start"], batch["end"] - batch["start"], batch["busy"],
+                     {"count": batch["count"]}, count=batch["count"])
+
+    # ------------------------------------------------------------------ export
+
+    def summary(self) -> dict:
+        spans = {}
+        for event in self.events:
+            item = spans.setdefault(event["path"], {"count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0})
+            item["count"] += event["count"]
+            # batched spans have no children, their busy (self) time is the time that was measured
+            item["total_s"] += (event["self"] if event["count"] > 1 else event["duration"]) / 1e9
+            item["self_s"] += event["self"] / 1e9
+            item["max_s"] = max(item["max_s"], event["duration"] / 1e9)
+        wall = max((event["start"] + event["duration"] for event in self.events), default=0) / 1e9
+        return {
+            "episode": self.episode_name,
+            "wall_s": wall,
+            "spans": dict(sorted(spans.items(), key=lambda x: -x[1]["total_s"])),
+        }
+
+    def export_chrome_trace(self, path: str):
+        pid = os.getpid()
+        trace_events = []
+        for event in self.events:
+            trace_event = {
+                "name": event["name"],
+                "ph": "X",
+                "ts": event["start"] / 1e3,
+                "dur": event["duration"] / 1e3,
+                "pid": pid,
+                "tid": event["tid"],
+            }
+            if event["args"]:
+                trace_event["args"] = event["args"]
+            trace_events.append(trace_event)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+profiler = Profiler()
+
+
+def profile_span(name: str, **args):
+    """Context manager timing the enclosed block as a nested span."""
+    if not profiler.enabled:
+        return _NULL_SPAN
+    return _Span(profiler, name, args or None)
+
+
+def profiled(name: str = None):
+    """Decorator timing every call of a function as a span (default name: the function name)."""
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def decorated(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with _Span(profiler, span_name):
+                return func(*args, **kwargs)
+
+        return decorated
+
+    return decorator
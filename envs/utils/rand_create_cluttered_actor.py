@@ -4,10 +4,37 @@ import transforms3d as t3d
 import sapien.physx as sapienp
 from .create_actor import *
 
+import os
 import re
 import json
+from functools import lru_cache
 from pathlib import Path
 
+CLUTTERED_INDEX_FILE = "./assets/objects/_cluttered_index.json"
+CLUTTERED_INDEX_VERSION = 1
+
+
+def get_cluttered_assets_signature():
+    """Count and latest mtime of every file the catalogue is built from, without parsing any of them."""
+    files = [Path("./assets/objects/objaverse/list.json"), Path("./assets/objects/same.json")]
+    num_files, max_mtime = 0, 0.0
+    for file in files:
+        if file.exists():
+            num_files += 1
+            max_mtime = max(max_mtime, file.stat().st_mtime)
+    with os.scandir("./assets/objects") as model_dirs:
+        for model_dir in model_dirs:
+            if not model_dir.is_dir() or re.search(r"^(\d+)_(.*)", model_dir.name) is None:
+                continue
+            num_files += 1
+            max_mtime = max(max_mtime, model_dir.stat().st_mtime)
+            with os.scandir(model_dir.path) as model_cfgs:
+                for model_cfg in model_cfgs:
+                    if model_cfg.name.startswith("model_data") and model_cfg.name.endswith(".json"):
+                        num_files += 1
+                        max_mtime = max(max_mtime, model_cfg.stat().st_mtime)
+    return {"num_files": num_files, "max_mtime": max_mtime}
+
 
 def get_all_cluttered_objects():
     cluttered_objects_info = {}
@@ -87,11 +114,64 @@ def get_all_cluttered_objects():
     return cluttered_objects_info, cluttered_objects_name, same_obj
 
 
-cluttered_objects_info, cluttered_objects_list, same_obj = get_all_cluttered_objects()
+def load_cluttered_objects_index():
+    """
+    Catalogue from the prebuilt index, rebuilding the index when any asset it was built from
+    has been added, removed or modified since.
+    """
+    signature = get_cluttered_assets_signature()
+    if os.path.exists(CLUTTERED_INDEX_FILE):
+        try:
+            with open(CLUTTERED_INDEX_FILE, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == CLUTTERED_INDEX_VERSION and index.get("signature") == signature:
+                cluttered_objects_info = index["info"]
+                # json turns the (possibly int) model ids used as params keys into strings
+                for info in cluttered_objects_info.values():
+                    info["params"] = {model_id: info["params"][str(model_id)] for model_id in info["ids"]}
+                return cluttered_objects_info, index["list"], index["same_obj"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    cluttered_objects_info, cluttered_objects_list, same_obj = get_all_cluttered_objects()
+    index = {
+        "version": CLUTTERED_INDEX_VERSION,
+        "signature": signature,
+        "info": cluttered_objects_info,
+        "list": cluttered_objects_list,
+        "same_obj": same_obj,
+    }
+    # several collection workers may rebuild at once, write atomically
+    tmp_file = f"{CLUTTERED_INDEX_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_file, CLUTTERED_INDEX_FILE)
+    except OSError as e:
+        print(f"Error writing cluttered objects index {CLUTTERED_INDEX_FILE}: {e}")
+    return cluttered_objects_info, cluttered_objects_list, same_obj
+
+
+@lru_cache(maxsize=1)
+def get_cluttered_objects():
+    """(cluttered_objects_info, cluttered_objects_list, same_obj), loaded on first use."""
+    return load_cluttered_objects_index()
+
+
+def __getattr__(name):
+    # the catalogue used to be built at import time, keep the module attributes available lazily
+    if name in ("cluttered_objects_info", "cluttered_objects_list", "same_obj"):
+        cluttered_objects_info, cluttered_objects_list, same_obj = get_cluttered_objects()
+        return {
+            "cluttered_objects_info": cluttered_objects_info,
+            "cluttered_objects_list": cluttered_objects_list,
+            "same_obj": same_obj,
+        }[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_available_cluttered_objects(entity_on_scene: list):
-    global cluttered_objects_info, cluttered_objects_list, same_obj
+    cluttered_objects_info, cluttered_objects_list, same_obj = get_cluttered_objects()
 
     model_in_use = []
     for entity_name in entity_on_scene:
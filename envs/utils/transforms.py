@@ -16,7 +16,7 @@ def pause(task, till_close=False, show_point=False):
         while not task.viewer.closed:
             for point in Point.points:
                 point.update()
-            task.scene.step()
+            task.step_scene()
             task.scene.update_render()
             task.viewer.render()
 
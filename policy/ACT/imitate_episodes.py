@@ -121,7 +121,8 @@ def main(args):
         exit()
 
     train_dataloader, val_dataloader, stats, _ = load_data(dataset_dir, num_episodes, camera_names, batch_size_train,
-                                                           batch_size_val)
+                                                           batch_size_val, args["samples_per_epoch"],
+                                                           episode_uniform=not args["step_uniform"])
 
     # save dataset stats
     if not os.path.isdir(ckpt_dir):
@@ -487,5 +488,18 @@ if __name__ == "__main__":
         required=False,
     )
     parser.add_argument("--temporal_agg", action="store_true")
+    parser.add_argument(
+        "--samples_per_epoch",
+        action="store",
+        type=int,
+        help="training samples per epoch, default one per training episode, 0 for every step",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--step_uniform",
+        action="store_true",
+        help="draw steps uniformly (long episodes more often) instead of an episode then a step within it",
+    )
 
     main(vars(parser.parse_args()))
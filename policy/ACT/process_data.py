@@ -11,6 +11,8 @@ import argparse
 import pdb
 import json
 
+from utils import EpisodeWriter, CONSOLIDATED_FILE
+
 
 def load_hdf5(dataset_path):
     if not os.path.isfile(dataset_path):
@@ -56,6 +58,11 @@ def data_transform(path, episode_num, save_path):
     if not os.path.exists(save_path):
         os.makedirs(save_path)
 
+    # all episodes go into one chunked file, the normalization stats are computed on the way
+    writer = EpisodeWriter(
+        os.path.join(save_path, CONSOLIDATED_FILE),
+        ["cam_high", "cam_right_wrist", "cam_left_wrist"],
+    )
     for i in range(episode_num):
         left_gripper_all, left_arm_all, right_gripper_all, right_arm_all, image_dict = (load_hdf5(
             os.path.join(path, f"episode{i}.hdf5")))
@@ -104,25 +111,22 @@ def data_transform(path, episode_num, save_path):
                 left_arm_dim.append(left_arm.shape[0])
                 right_arm_dim.append(right_arm.shape[0])
 
-        hdf5path = os.path.join(save_path, f"episode_{i}.hdf5")
-
-        with h5py.File(hdf5path, "w") as f:
-            f.create_dataset("action", data=np.array(actions))
-            obs = f.create_group("observations")
-            obs.create_dataset("qpos", data=np.array(qpos))
-            obs.create_dataset("left_arm_dim", data=np.array(left_arm_dim))
-            obs.create_dataset("right_arm_dim", data=np.array(right_arm_dim))
-            image = obs.create_group("images")
-            # cam_high_enc, len_high = images_encoding(cam_high)
-            # cam_right_wrist_enc, len_right = images_encoding(cam_right_wrist)
-            # cam_left_wrist_enc, len_left = images_encoding(cam_left_wrist)
-            image.create_dataset("cam_high", data=np.stack(cam_high), dtype=np.uint8)
-            image.create_dataset("cam_right_wrist", data=np.stack(cam_right_wrist), dtype=np.uint8)
-            image.create_dataset("cam_left_wrist", data=np.stack(cam_left_wrist), dtype=np.uint8)
+        writer.add_episode(
+            np.array(qpos),
+            np.array(actions),
+            {
+                "cam_high": np.stack(cam_high),
+                "cam_right_wrist": np.stack(cam_right_wrist),
+                "cam_left_wrist": np.stack(cam_left_wrist),
+            },
+            left_arm_dim=np.array(left_arm_dim),
+            right_arm_dim=np.array(right_arm_dim),
+        )
 
         begin += 1
         print(f"proccess {i} success!")
 
+    writer.close()
     return begin
 
 
@@ -2,53 +2,207 @@ import numpy as np
 import torch
 import os
 import h5py
-from torch.utils.data import TensorDataset, DataLoader
+from torch.utils.data import TensorDataset, DataLoader, RandomSampler, WeightedRandomSampler
 
 import IPython
 
 e = IPython.embed
 
 
+CONSOLIDATED_FILE = "episodes.hdf5"
+
+
+def get_stat_part(value):
+    """Per-episode sums (length, sum, sum of squares, last step) the normalization stats are built from."""
+    value = value.astype(np.float64)
+    return len(value), value.sum(axis=0), (value**2).sum(axis=0), value[-1]
+
+
+def compute_norm_stats(stat_parts, last_qpos):
+    """
+    Same stats as padding every episode to the longest one with its last step (as the per-file
+    `get_norm_stats` did), computed from per-episode sums instead of the padded arrays.
+    """
+    max_len = max(length for length, _, _, _ in stat_parts["action"])
+    stats = {}
+    for key in ["action", "qpos"]:
+        count = max_len * len(stat_parts[key])
+        total = sum(s + (max_len - length) * last for length, s, _, last in stat_parts[key])
+        total_sq = sum(sq + (max_len - length) * last**2 for length, _, sq, last in stat_parts[key])
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq - count * mean**2, 0) / max(count - 1, 1))
+        stats[f"{key}_mean"] = mean.astype(np.float32)
+        stats[f"{key}_std"] = np.clip(std, 1e-2, np.inf).astype(np.float32)
+    pad = np.repeat(last_qpos[-1:], max_len - len(last_qpos), axis=0)
+    stats["example_qpos"] = np.concatenate([last_qpos, pad], axis=0)
+    return stats, max_len
+
+
+class EpisodeWriter:
+    """
+    Writes the episodes of a dataset into one chunked HDF5 file (`CONSOLIDATED_FILE`):
+
+        /action                      (N, D) float32, the steps of all episodes concatenated
+        /observations/qpos           (N, D) float32
+        /observations/images/{cam}   (N, H, W, 3) uint8, one lzf-compressed chunk per frame
+        /meta/episode_ends           (E, ) int64
+        /norm_stats/{key}            computed while writing, see `close`
+    """
+
+    def __init__(self, path, camera_names):
+        self.path = path
+        self.camera_names = camera_names
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.root = h5py.File(self.tmp_path, "w")
+        self.num_steps = 0
+        self.episode_ends = []
+        # per-episode sums for the normalization stats
+        self.stat_parts = {"qpos": [], "action": []}
+        self.last_qpos = None
+
+    def _append(self, name, data, **kwargs):
+        if name not in self.root:
+            self.root.create_dataset(name, shape=(0, ) + data.shape[1:], maxshape=(None, ) + data.shape[1:],
+                                     dtype=data.dtype, **kwargs)
+        dataset = self.root[name]
+        dataset.resize(self.num_steps + len(data), axis=0)
+        dataset[self.num_steps:] = data
+
+    def add_episode(self, qpos, action, image_dict, **low_dim):
+        """`low_dim`: further per-step arrays, stored as `/observations/{key}`."""
+        qpos = np.asarray(qpos, dtype=np.float32)
+        action = np.asarray(action, dtype=np.float32)
+        assert len(qpos) == len(action), "qpos and action must have one row per step"
+        self._append("action", action, chunks=(1024, action.shape[1]))
+        self._append("observations/qpos", qpos, chunks=(1024, qpos.shape[1]))
+        for cam_name in self.camera_names:
+            images = np.asarray(image_dict[cam_name], dtype=np.uint8)
+            self._append(f"observations/images/{cam_name}", images, chunks=(1, ) + images.shape[1:],
+                         compression="lzf")
+        for key, value in low_dim.items():
+            self._append(f"observations/{key}", np.asarray(value))
+        self.num_steps += len(action)
+        self.episode_ends.append(self.num_steps)
+        for key, value in [("qpos", qpos), ("action", action)]:
+            self.stat_parts[key].append(get_stat_part(value))
+        self.last_qpos = qpos
+
+    def get_norm_stats(self):
+        return compute_norm_stats(self.stat_parts, self.last_qpos)
+
+    def close(self):
+        self.root.create_dataset("meta/episode_ends", data=np.array(self.episode_ends, dtype=np.int64))
+        stats, max_action_len = self.get_norm_stats()
+        for key, value in stats.items():
+            self.root.create_dataset(f"norm_stats/{key}", data=value)
+        self.root["norm_stats"].attrs["max_action_len"] = max_action_len
+        self.root.attrs["camera_names"] = self.camera_names
+        self.root.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def consolidate_episodes(dataset_dir, num_episodes, camera_names):
+    """Build `CONSOLIDATED_FILE` from the per-episode `episode_{i}.hdf5` files of older datasets."""
+    writer = EpisodeWriter(os.path.join(dataset_dir, CONSOLIDATED_FILE), camera_names)
+    try:
+        for episode_idx in range(num_episodes):
+            dataset_path = os.path.join(dataset_dir, f"episode_{episode_idx}.hdf5")
+            with h5py.File(dataset_path, "r") as root:
+                image_dict = {cam_name: root[f"/observations/images/{cam_name}"][()] for cam_name in camera_names}
+                writer.add_episode(root["/observations/qpos"][()], root["/action"][()], image_dict)
+            print(f"consolidate {episode_idx + 1}/{num_episodes}", end="\r")
+    except BaseException:
+        writer.root.close()
+        os.remove(writer.tmp_path)
+        raise
+    writer.close()
+
+
+def get_num_consolidated_episodes(path):
+    with h5py.File(path, "r") as root:
+        return len(root["meta/episode_ends"])
+
+
+def get_consolidated_path(dataset_dir, num_episodes, camera_names):
+    """
+    The consolidated file of `dataset_dir`; a file with more episodes than `num_episodes` is used as is
+    (training reads its first `num_episodes`). It is only rebuilt when the per-episode files of an older
+    dataset are there to rebuild it from.
+    """
+    path = os.path.join(dataset_dir, CONSOLIDATED_FILE)
+    num_found = get_num_consolidated_episodes(path) if os.path.exists(path) else 0
+    if num_found >= num_episodes:
+        return path
+    missing = [
+        episode_idx for episode_idx in range(num_episodes)
+        if not os.path.exists(os.path.join(dataset_dir, f"episode_{episode_idx}.hdf5"))
+    ]
+    if len(missing) > 0:
+        raise FileNotFoundError(f"{dataset_dir} holds {num_found} processed episodes, {num_episodes} were requested "
+                                f"(and there are no per-episode files to rebuild {CONSOLIDATED_FILE} from); "
+                                f"run process_data.py with at least {num_episodes} episodes")
+    consolidate_episodes(dataset_dir, num_episodes, camera_names)
+    return path
+
+
 class EpisodicDataset(torch.utils.data.Dataset):
+    """One sample per step of the given episodes, read from the consolidated file."""
 
-    def __init__(self, episode_ids, dataset_dir, camera_names, norm_stats, max_action_len):
+    def __init__(self, episode_ids, dataset_path, camera_names, norm_stats, max_action_len):
         super(EpisodicDataset).__init__()
         self.episode_ids = episode_ids
-        self.dataset_dir = dataset_dir
+        self.dataset_path = dataset_path
         self.camera_names = camera_names
         self.norm_stats = norm_stats
         self.max_action_len = max_action_len
         self.is_sim = None
-        self.__getitem__(0)  # initialize self.is_sim
+
+        with h5py.File(dataset_path, "r") as root:
+            # low-dim data is small, keep it in memory
+            self.action = root["/action"][()]
+            self.qpos = root["/observations/qpos"][()]
+            episode_ends = root["/meta/episode_ends"][()]
+        episode_starts = np.concatenate([[0], episode_ends[:-1]])
+        # global step -> (episode start, episode end)
+        self.steps = np.concatenate([np.arange(episode_starts[i], episode_ends[i]) for i in episode_ids])
+        self.step_episode_ends = np.concatenate(
+            [np.full(episode_ends[i] - episode_starts[i], episode_ends[i]) for i in episode_ids])
+        self.step_episode_starts = np.concatenate(
+            [np.full(episode_ends[i] - episode_starts[i], episode_starts[i]) for i in episode_ids])
+        # opened once per dataloader worker
+        self.root = None
+        self.root_pid = None
 
     def __len__(self):
-        return len(self.episode_ids)
+        return len(self.steps)
 
-    def __getitem__(self, index):
-        sample_full_episode = False
+    def get_episode_uniform_weights(self):
+        """Per-step weights 1 / episode_len: an episode is drawn uniformly, then a step within it."""
+        return 1.0 / (self.step_episode_ends - self.step_episode_starts)
 
-        episode_id = self.episode_ids[index]
-        dataset_path = os.path.join(self.dataset_dir, f"episode_{episode_id}.hdf5")
-        with h5py.File(dataset_path, "r") as root:
-            is_sim = None
-            original_action_shape = root["/action"].shape
-            episode_len = original_action_shape[0]
-            if sample_full_episode:
-                start_ts = 0
-            else:
-                start_ts = np.random.choice(episode_len)
-            # get observation at start_ts only
-            qpos = root["/observations/qpos"][start_ts]
-            image_dict = dict()
-            for cam_name in self.camera_names:
-                image_dict[cam_name] = root[f"/observations/images/{cam_name}"][start_ts]
-            # get all actions after and including start_ts
-            if is_sim:
-                action = root["/action"][start_ts:]
-                action_len = episode_len - start_ts
-            else:
-                action = root["/action"][max(0, start_ts - 1):]  # hack, to make timesteps more aligned
-                action_len = episode_len - max(0, start_ts - 1)  # hack, to make timesteps more aligned
+    def get_root(self):
+        if self.root is None or self.root_pid != os.getpid():
+            self.root = h5py.File(self.dataset_path, "r")
+            self.root_pid = os.getpid()
+        return self.root
+
+    def __getitem__(self, index):
+        root = self.get_root()
+        is_sim = None
+        step = self.steps[index]
+        episode_start, episode_end = self.step_episode_starts[index], self.step_episode_ends[index]
+        start_ts = step - episode_start
+        # get observation at start_ts only
+        qpos = self.qpos[step]
+        image_dict = dict()
+        for cam_name in self.camera_names:
+            image_dict[cam_name] = root[f"/observations/images/{cam_name}"][step]
+        # get all actions after and including start_ts
+        if is_sim:
+            action = self.action[step:episode_end]
+        else:
+            action = self.action[episode_start + max(0, start_ts - 1):episode_end]  # hack, to make timesteps more aligned
+        action_len = len(action)
 
         self.is_sim = is_sim
         padded_action = np.zeros((self.max_action_len, action.shape[1]), dtype=np.float32)  # 根据max_action_len初始化
@@ -79,65 +233,47 @@ class EpisodicDataset(torch.utils.data.Dataset):
         return image_data, qpos_data, action_data, is_pad
 
 
-def get_norm_stats(dataset_dir, num_episodes):
-    all_qpos_data = []
-    all_action_data = []
-    for episode_idx in range(num_episodes):
-        dataset_path = os.path.join(dataset_dir, f"episode_{episode_idx}.hdf5")
-        with h5py.File(dataset_path, "r") as root:
-            qpos = root["/observations/qpos"][()]  # Assuming this is a numpy array
-            action = root["/action"][()]
-        all_qpos_data.append(torch.from_numpy(qpos))
-        all_action_data.append(torch.from_numpy(action))
-
-    # Pad all tensors to the maximum size
-    max_qpos_len = max(q.size(0) for q in all_qpos_data)
-    max_action_len = max(a.size(0) for a in all_action_data)
-
-    padded_qpos = []
-    for qpos in all_qpos_data:
-        current_len = qpos.size(0)
-        if current_len < max_qpos_len:
-            # Pad with the last element
-            pad = qpos[-1:].repeat(max_qpos_len - current_len, 1)
-            qpos = torch.cat([qpos, pad], dim=0)
-        padded_qpos.append(qpos)
-
-    padded_action = []
-    for action in all_action_data:
-        current_len = action.size(0)
-        if current_len < max_action_len:
-            pad = action[-1:].repeat(max_action_len - current_len, 1)
-            action = torch.cat([action, pad], dim=0)
-        padded_action.append(action)
-
-    all_qpos_data = torch.stack(padded_qpos)
-    all_action_data = torch.stack(padded_action)
-    all_action_data = all_action_data
-
-    # normalize action data
-    action_mean = all_action_data.mean(dim=[0, 1], keepdim=True)
-    action_std = all_action_data.std(dim=[0, 1], keepdim=True)
-    action_std = torch.clip(action_std, 1e-2, np.inf)  # clipping
-
-    # normalize qpos data
-    qpos_mean = all_qpos_data.mean(dim=[0, 1], keepdim=True)
-    qpos_std = all_qpos_data.std(dim=[0, 1], keepdim=True)
-    qpos_std = torch.clip(qpos_std, 1e-2, np.inf)  # clipping
-
-    stats = {
-        "action_mean": action_mean.numpy().squeeze(),
-        "action_std": action_std.numpy().squeeze(),
-        "qpos_mean": qpos_mean.numpy().squeeze(),
-        "qpos_std": qpos_std.numpy().squeeze(),
-        "example_qpos": qpos,
+def get_norm_stats(dataset_path, num_episodes):
+    """
+    Normalization stats cached in the consolidated file when it was written, recomputed from the
+    low-dim arrays when only the first `num_episodes` of a larger file are used.
+    """
+    with h5py.File(dataset_path, "r") as root:
+        episode_ends = root["meta/episode_ends"][()]
+        if len(episode_ends) == num_episodes:
+            stats = {key: value[()] for key, value in root["norm_stats"].items()}
+            return stats, int(root["norm_stats"].attrs["max_action_len"])
+        num_steps = episode_ends[num_episodes - 1]
+        arrays = {"qpos": root["/observations/qpos"][:num_steps], "action": root["/action"][:num_steps]}
+    episode_starts = np.concatenate([[0], episode_ends[:num_episodes - 1]])
+    stat_parts = {
+        key: [get_stat_part(value[start:end]) for start, end in zip(episode_starts, episode_ends[:num_episodes])]
+        for key, value in arrays.items()
     }
-
-    return stats, max_action_len
-
-
-def load_data(dataset_dir, num_episodes, camera_names, batch_size_train, batch_size_val):
+    return compute_norm_stats(stat_parts, arrays["qpos"][episode_starts[-1]:num_steps])
+
+
+def get_sampler(dataset, num_samples, episode_uniform):
+    if episode_uniform:
+        return WeightedRandomSampler(dataset.get_episode_uniform_weights(), num_samples=num_samples, replacement=True)
+    return RandomSampler(dataset, num_samples=num_samples)
+
+
+def load_data(dataset_dir,
+              num_episodes,
+              camera_names,
+              batch_size_train,
+              batch_size_val,
+              samples_per_epoch=None,
+              episode_uniform=True):
+    """
+    - samples_per_epoch: training samples drawn per epoch, defaults to the number of training
+      episodes (the sampling budget of an episode-indexed dataset), 0 for every step.
+    - episode_uniform: draw an episode uniformly and then a step within it, as the episode-indexed dataset
+      did. False draws steps uniformly, which samples long episodes more often.
+    """
     print(f"\nData from: {dataset_dir}\n")
+    dataset_path = get_consolidated_path(dataset_dir, num_episodes, camera_names)
     # obtain train test split
     train_ratio = 0.8
     shuffled_indices = np.random.permutation(num_episodes)
@@ -145,26 +281,30 @@ def load_data(dataset_dir, num_episodes, camera_names, batch_size_train, batch_s
     val_indices = shuffled_indices[int(train_ratio * num_episodes):]
 
     # obtain normalization stats for qpos and action
-    norm_stats, max_action_len = get_norm_stats(dataset_dir, num_episodes)
+    norm_stats, max_action_len = get_norm_stats(dataset_path, num_episodes)
 
     # construct dataset and dataloader
-    train_dataset = EpisodicDataset(train_indices, dataset_dir, camera_names, norm_stats, max_action_len)
-    val_dataset = EpisodicDataset(val_indices, dataset_dir, camera_names, norm_stats, max_action_len)
+    train_dataset = EpisodicDataset(train_indices, dataset_path, camera_names, norm_stats, max_action_len)
+    val_dataset = EpisodicDataset(val_indices, dataset_path, camera_names, norm_stats, max_action_len)
+    if samples_per_epoch is None:
+        samples_per_epoch = len(train_indices)
     train_dataloader = DataLoader(
         train_dataset,
         batch_size=batch_size_train,
-        shuffle=True,
+        sampler=get_sampler(train_dataset, samples_per_epoch or len(train_dataset), episode_uniform),
         pin_memory=True,
         num_workers=1,
         prefetch_factor=1,
+        persistent_workers=True,
     )
     val_dataloader = DataLoader(
         val_dataset,
         batch_size=batch_size_val,
-        shuffle=True,
+        sampler=get_sampler(val_dataset, len(val_indices), episode_uniform),
         pin_memory=True,
         num_workers=1,
         prefetch_factor=1,
+        persistent_workers=True,
     )
 
     return train_dataloader, val_dataloader, norm_stats, train_dataset.is_sim
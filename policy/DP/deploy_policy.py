@@ -3,9 +3,10 @@ from .dp_model import DP
 import yaml
 
 def encode_obs(observation):
-    head_cam = (np.moveaxis(observation["observation"]["head_camera"]["rgb"], -1, 0) / 255)
-    left_cam = (np.moveaxis(observation["observation"]["left_camera"]["rgb"], -1, 0) / 255)
-    right_cam = (np.moveaxis(observation["observation"]["right_camera"]["rgb"], -1, 0) / 255)
+    # images stay uint8, DPRunner scales them to [0, 1] on the policy device
+    head_cam = np.moveaxis(observation["observation"]["head_camera"]["rgb"], -1, 0)
+    left_cam = np.moveaxis(observation["observation"]["left_camera"]["rgb"], -1, 0)
+    right_cam = np.moveaxis(observation["observation"]["right_camera"]["rgb"], -1, 0)
     obs = dict(
         head_cam=head_cam,
         left_cam=left_cam,
@@ -5,6 +5,7 @@ import numbers
 import zarr
 import numcodecs
 import numpy as np
+from collections import OrderedDict
 from functools import cached_property
 
 
@@ -78,6 +79,90 @@ def get_optimal_chunks(shape, dtype, target_chunk_bytes=2e6, max_chunk_length=No
     return chunks
 
 
+class ChunkCache:
+    """LRU cache of decompressed zarr chunks, bounded by `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.chunks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            self.hits += 1
+            return chunk
+        self.misses += 1
+        chunk = loader()
+        self.chunks[key] = chunk
+        self.nbytes += chunk.nbytes
+        while self.nbytes > self.max_bytes and len(self.chunks) > 1:
+            _, evicted = self.chunks.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return chunk
+
+
+class LazyZarrArray:
+    """
+    Read-only view of an on-disk zarr array, reads along the first (time) axis go through a `ChunkCache`.
+    Anything but an int / contiguous slice on the first axis is read from zarr directly.
+    """
+
+    def __init__(self, array: zarr.Array, cache: ChunkCache):
+        self.array = array
+        self.cache = cache
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.chunks = array.chunks
+        self.ndim = len(array.shape)
+        self.chunk_length = array.chunks[0]
+        self.chunk_nbytes = int(np.prod(array.chunks)) * array.dtype.itemsize
+        self.nbytes = int(np.prod(array.shape)) * array.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        data = self.array[:]
+        return data if dtype is None else data.astype(dtype)
+
+    def _chunk(self, chunk_idx):
+        start = chunk_idx * self.chunk_length
+        return self.cache.get((self.array.path, chunk_idx), lambda: self.array[start:start + self.chunk_length])
+
+    def _read(self, start, stop):
+        if stop <= start:
+            return np.zeros((0, ) + self.shape[1:], dtype=self.dtype)
+        first_chunk, last_chunk = start // self.chunk_length, (stop - 1) // self.chunk_length
+        if first_chunk == last_chunk:
+            offset = first_chunk * self.chunk_length
+            return self._chunk(first_chunk)[start - offset:stop - offset]
+        result = np.empty((stop - start, ) + self.shape[1:], dtype=self.dtype)
+        for chunk_idx in range(first_chunk, last_chunk + 1):
+            chunk_start = chunk_idx * self.chunk_length
+            lo, hi = max(start, chunk_start), min(stop, chunk_start + self.chunk_length)
+            result[lo - start:hi - start] = self._chunk(chunk_idx)[lo - chunk_start:hi - chunk_start]
+        return result
+
+    def __getitem__(self, key):
+        first, rest = (key[0], key[1:]) if isinstance(key, tuple) and len(key) > 0 else (key, ())
+        if isinstance(first, numbers.Integral):
+            idx = int(first) + (self.shape[0] if first < 0 else 0)
+            if not 0 <= idx < self.shape[0]:
+                raise IndexError(f"index {first} is out of bounds for axis 0 with size {self.shape[0]}")
+            data = self._read(idx, idx + 1)[0]
+            return data[rest] if len(rest) > 0 else data
+        if isinstance(first, slice):
+            start, stop, step = first.indices(self.shape[0])
+            if step == 1 and (start, stop) != (0, self.shape[0]):  # full reads bypass the cache
+                data = self._read(start, stop)
+                return data[(slice(None), ) + rest] if len(rest) > 0 else data
+        return self.array[key]
+
+
 class ReplayBuffer:
     """
     Zarr-based temporal datastructure.
@@ -143,6 +228,54 @@ class ReplayBuffer:
         group = zarr.open(os.path.expanduser(zarr_path), mode)
         return cls.create_from_group(group, **kwargs)
 
+    @classmethod
+    def create_lazy_from_path(cls, zarr_path, keys=None, memory_budget=2**32, num_readers=1):
+        """
+        Open an on-disk zarr read-only without copying it (for datasets larger than memory).
+        Arrays are loaded to memory from the smallest while they take at most half of `memory_budget` bytes
+        (all of them if everything fits), the rest of the budget is a LRU cache of decompressed chunks
+        shared by the arrays left on disk.
+        - num_readers: processes reading the buffer (dataloader workers). The loaded arrays are shared by the
+          forked workers, but every worker fills its own copy of the chunk cache, which therefore gets
+          1 / num_readers of the remaining budget.
+        """
+        group = zarr.open(os.path.expanduser(zarr_path), "r")
+        meta = dict()
+        for key, value in group["meta"].items():
+            meta[key] = np.array(value) if len(value.shape) == 0 else value[:]
+        if keys is None:
+            keys = group["data"].keys()
+        arrays = sorted([(key, group["data"][key]) for key in keys],
+                        key=lambda x: int(np.prod(x[1].shape)) * x[1].dtype.itemsize)
+        total_bytes = sum(int(np.prod(arr.shape)) * arr.dtype.itemsize for _, arr in arrays)
+        memory_limit = memory_budget if total_bytes <= memory_budget else memory_budget // 2
+
+        data, loaded_bytes = dict(), 0
+        cache = None
+        for key, arr in arrays:
+            nbytes = int(np.prod(arr.shape)) * arr.dtype.itemsize
+            if cache is None and loaded_bytes + nbytes <= memory_limit:
+                data[key] = arr[:]
+                loaded_bytes += nbytes
+                continue
+            if cache is None:
+                cache = ChunkCache((memory_budget - loaded_bytes) // max(1, num_readers))
+            data[key] = LazyZarrArray(arr, cache)
+        return cls(root={"meta": meta, "data": data})
+
+    def get_sample_locality(self):
+        """
+        (chunk_length, window) for chunk-aware sampling of the lazy arrays, None when everything is in memory.
+        `window` is the number of chunks of each array the chunk cache holds at the same time.
+        """
+        lazy_arrays = [value for value in self.data.values() if isinstance(value, LazyZarrArray)]
+        if len(lazy_arrays) == 0:
+            return None
+        chunk_length = min(arr.chunk_length for arr in lazy_arrays)
+        chunk_bytes = sum(arr.chunk_nbytes for arr in lazy_arrays)
+        window = max(1, lazy_arrays[0].cache.max_bytes // (2 * chunk_bytes))
+        return chunk_length, window
+
     # ============= copy constructors ===============
     @classmethod
     def copy_from_store(
@@ -77,6 +77,18 @@ def downsample_mask(mask, max_n, seed=0):
     return train_mask
 
 
+def get_chunk_aware_permutation(indices: np.ndarray, chunk_length: int, window: int, rng: np.random.Generator):
+    """
+    Shuffled sample order with locality for chunked (lazy) storage: chunks are visited in random order
+    and samples are shuffled within groups of `window` consecutive chunks, so a group fits the chunk cache.
+    """
+    chunk_ids = indices[:, 0] // chunk_length
+    chunk_rank = np.zeros(chunk_ids.max() + 1 if len(chunk_ids) > 0 else 0, dtype=np.int64)
+    chunk_rank[rng.permutation(len(chunk_rank))] = np.arange(len(chunk_rank))
+    groups = chunk_rank[chunk_ids] // window
+    return np.lexsort((rng.random(len(indices)), groups))
+
+
 class SequenceSampler:
 
     def __init__(
@@ -124,6 +136,13 @@ class SequenceSampler:
     def __len__(self):
         return len(self.indices)
 
+    def get_permutation(self, rng: np.random.Generator) -> np.ndarray:
+        """Shuffled sample order, chunk-aware when the replay buffer reads from disk lazily."""
+        locality = self.replay_buffer.get_sample_locality()
+        if locality is None:
+            return rng.permutation(len(self.indices))
+        return get_chunk_aware_permutation(self.indices, *locality, rng)
+
     def sample_sequence(self, idx):
         buffer_start_idx, buffer_end_idx, sample_start_idx, sample_end_idx = (self.indices[idx])
         result = dict()
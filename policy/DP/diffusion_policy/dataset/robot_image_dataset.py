@@ -12,9 +12,15 @@ from diffusion_policy.common.sampler import (
 )
 from diffusion_policy.model.common.normalizer import LinearNormalizer
 from diffusion_policy.dataset.base_dataset import BaseImageDataset
-from diffusion_policy.common.normalize_util import get_image_range_normalizer
+from diffusion_policy.common.normalize_util import (
+    get_image_range_normalizer,
+    get_range_normalizer_from_stat,
+)
 import pdb
 
+# zarr `meta` keys of the joint vector statistics (`to_meta_arrays` of envs/utils/norm_stats.py)
+NORM_STATS_META = {field: f"norm_stats_joint_action_{field}" for field in ["min", "max", "mean", "std"]}
+
 
 class RobotImageDataset(BaseImageDataset):
 
@@ -28,14 +34,27 @@ class RobotImageDataset(BaseImageDataset):
         val_ratio=0.0,
         batch_size=128,
         max_train_episodes=None,
+        memory_budget=None,
+        num_workers=0,
+        val_num_workers=0,
     ):
+        """
+        - memory_budget: bytes of host memory for the dataset in total, the zarr is then read lazily through
+          a chunk cache (`ReplayBuffer.create_lazy_from_path`) split across the dataloader workers.
+          None copies the whole dataset to memory.
+        - num_workers, val_num_workers: workers of the train / val dataloaders, the chunk cache is split
+          between max(1, num_workers) + val_num_workers processes.
+        """
 
         super().__init__()
-        self.replay_buffer = ReplayBuffer.copy_from_path(
-            zarr_path,
-            # keys=['head_camera', 'front_camera', 'left_camera', 'right_camera', 'state', 'action'],
-            keys=["head_camera", "state", "action"],
-        )
+        keys = ["head_camera", "state", "action"]
+        # keys=['head_camera', 'front_camera', 'left_camera', 'right_camera', 'state', 'action'],
+        if memory_budget is None:
+            self.replay_buffer = ReplayBuffer.copy_from_path(zarr_path, keys=keys)
+        else:
+            self.replay_buffer = ReplayBuffer.create_lazy_from_path(zarr_path, keys=keys,
+                                                                    memory_budget=int(memory_budget),
+                                                                    num_readers=max(1, num_workers) + val_num_workers)
 
         val_mask = get_val_mask(n_episodes=self.replay_buffer.n_episodes, val_ratio=val_ratio, seed=seed)
         train_mask = ~val_mask
@@ -75,13 +94,30 @@ class RobotImageDataset(BaseImageDataset):
         val_set.train_mask = ~self.train_mask
         return val_set
 
+    def get_stored_stat(self):
+        """
+        min / max / mean / std of the joint vector, merged from the episodes' `/norm_stats` when the zarr was
+        written (meta keys `NORM_STATS_META`), None if some episode was collected without them.
+        """
+        meta = self.replay_buffer.meta
+        if not all(key in meta for key in NORM_STATS_META.values()):
+            return None
+        return {field: np.asarray(meta[key], dtype=np.float32) for field, key in NORM_STATS_META.items()}
+
     def get_normalizer(self, mode="limits", **kwargs):
-        data = {
-            "action": self.replay_buffer["action"],
-            "agent_pos": self.replay_buffer["state"],
-        }
         normalizer = LinearNormalizer()
-        normalizer.fit(data=data, last_n_dims=1, mode=mode, **kwargs)
+        stat = self.get_stored_stat() if mode == "limits" and len(kwargs) == 0 else None
+        if stat is None:
+            data = {
+                "action": self.replay_buffer["action"][:],
+                "agent_pos": self.replay_buffer["state"][:],
+            }
+            normalizer.fit(data=data, last_n_dims=1, mode=mode, **kwargs)
+        else:
+            # state is vector[:-1] and action vector[1:], the limits of every frame's vector bound both
+            for key in ["action", "agent_pos"]:
+                normalizer[key] = get_range_normalizer_from_stat({k: v.copy() for k, v in stat.items()},
+                                                                 range_eps=1e-4)
         normalizer["head_cam"] = get_image_range_normalizer()
         normalizer["front_cam"] = get_image_range_normalizer()
         normalizer["left_cam"] = get_image_range_normalizer()
@@ -179,6 +215,16 @@ def batch_sample_sequence(
 ):
     batch_size = len(idx)
     assert data.shape == (batch_size, sequence_length, *input_arr.shape[1:])
+    if not isinstance(input_arr, np.ndarray):
+        # lazy array: read in storage order so consecutive samples hit the same cached chunks
+        for i in np.argsort(indices[idx, 0], kind="stable"):
+            buffer_start_idx, buffer_end_idx, sample_start_idx, sample_end_idx = indices[idx[i]]
+            data[i, sample_start_idx:sample_end_idx] = input_arr[buffer_start_idx:buffer_end_idx]
+            if sample_start_idx > 0:
+                data[i, :sample_start_idx] = data[i, sample_start_idx]
+            if sample_end_idx < sequence_length:
+                data[i, sample_end_idx:] = data[i, sample_end_idx - 1]
+        return
     if batch_size >= 16 and data.nbytes // batch_size >= 2**16:
         _batch_sample_sequence_parallel(data, input_arr, indices, idx, sequence_length)
     else:
@@ -13,6 +13,78 @@ from argparse import ArgumentParser
 from diffusion_policy.common.pytorch_util import dict_apply
 from diffusion_policy.policy.base_image_policy import BaseImagePolicy
 
+OBS_KEYS = ["head_cam", "left_cam", "right_cam", "agent_pos"]  # flush unused keys, e.g. front_cam
+
+
+class ObsRingBuffer:
+    """
+    History of the last `capacity` observations, preallocated per key on the policy device.
+
+    Every appended frame is copied once into its slot (through a pinned staging slot when the device is
+    a GPU), and a window of frames is gathered with a single index on the device. uint8 arrays (images)
+    stay uint8 until they are on the device, other arrays are stored as float32.
+    """
+
+    def __init__(self, capacity, device="cpu"):
+        self.capacity = capacity
+        self.device = torch.device(device)
+        self.buffers = dict()
+        self.staging = dict()
+        self.events = [None] * capacity
+        self.count = 0  # number of frames appended since the last clear
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def clear(self):
+        self.count = 0
+
+    def to(self, device):
+        device = torch.device(device)
+        if device != self.device:
+            self.buffers = {key: buffer.to(device) for key, buffer in self.buffers.items()}
+            if device.type == "cuda":
+                self.staging = {key: staging.pin_memory() for key, staging in self.staging.items()}
+            self.device = device
+        return self
+
+    def _allocate(self, key, value: np.ndarray):
+        dtype = torch.uint8 if value.dtype == np.uint8 else torch.float32
+        shape = (self.capacity, ) + value.shape
+        self.buffers[key] = torch.empty(shape, dtype=dtype, device=self.device)
+        self.staging[key] = torch.empty(shape, dtype=dtype, pin_memory=self.device.type == "cuda")
+
+    def append(self, obs: dict):
+        slot = self.count % self.capacity
+        if self.events[slot] is not None:
+            self.events[slot].synchronize()  # the staging slot may still be read by a previous copy
+        for key, value in obs.items():
+            value = np.asarray(value)
+            if key not in self.buffers:
+                self._allocate(key, value)
+            staging = self.staging[key][slot]
+            staging.numpy()[...] = value
+            self.buffers[key][slot].copy_(staging, non_blocking=True)
+        if self.device.type == "cuda":
+            self.events[slot] = torch.cuda.Event()
+            self.events[slot].record()
+        self.count += 1
+
+    def last_frames(self, n_steps):
+        """Frame numbers of the last `n_steps` observations, the oldest one repeated if fewer were appended."""
+        assert self.count > 0, "no observation is recorded, please update obs first"
+        num_frames = min(n_steps, len(self))
+        frames = list(range(self.count - num_frames, self.count))
+        return [frames[0]] * (n_steps - num_frames) + frames
+
+    def get(self, key, frames) -> torch.Tensor:
+        """Stacked frames (N, *) of `key`, images are converted to float in [0, 1] on the device."""
+        slots = torch.tensor([frame % self.capacity for frame in frames], device=self.device)
+        result = self.buffers[key].index_select(0, slots)
+        if result.dtype == torch.uint8:
+            result = result.to(torch.float32) / 255
+        return result
+
 
 class DPRunner:
 
@@ -26,6 +98,8 @@ class DPRunner:
         crf=22,
         tqdm_interval_sec=5.0,
         task_name=None,
+        use_feature_cache=True,
+        device="cpu",
     ):
         self.task_name = task_name
         self.eval_episodes = eval_episodes
@@ -37,64 +111,57 @@ class DPRunner:
         self.tqdm_interval_sec = tqdm_interval_sec
 
         self.obs = deque(maxlen=n_obs_steps + 1)
+        self.obs_buffer = ObsRingBuffer(n_obs_steps + 1, device=device)
+        # encoder features by frame number, every frame is encoded once although it is part of
+        # up to n_obs_steps consecutive observation windows
+        self.use_feature_cache = use_feature_cache
+        self.obs_features = dict()
+        self.feature_policy = None
         self.env = None
 
-    def stack_last_n_obs(self, all_obs, n_steps):
-        assert len(all_obs) > 0
-        all_obs = list(all_obs)
-        if isinstance(all_obs[0], np.ndarray):
-            result = np.zeros((n_steps, ) + all_obs[-1].shape, dtype=all_obs[-1].dtype)
-            start_idx = -min(n_steps, len(all_obs))
-            result[start_idx:] = np.array(all_obs[start_idx:])
-            if n_steps > len(all_obs):
-                # pad
-                result[:start_idx] = result[start_idx]
-        elif isinstance(all_obs[0], torch.Tensor):
-            result = torch.zeros((n_steps, ) + all_obs[-1].shape, dtype=all_obs[-1].dtype)
-            start_idx = -min(n_steps, len(all_obs))
-            result[start_idx:] = torch.stack(all_obs[start_idx:])
-            if n_steps > len(all_obs):
-                # pad
-                result[:start_idx] = result[start_idx]
-        else:
-            raise RuntimeError(f"Unsupported obs type {type(all_obs[0])}")
-        return result
-
     def reset_obs(self):
         self.obs.clear()
+        self.obs_buffer.clear()
+        self.obs_features.clear()
 
     def update_obs(self, current_obs):
         self.obs.append(current_obs)
+        self.obs_buffer.append({key: current_obs[key] for key in OBS_KEYS})
 
     def get_n_steps_obs(self):
-        assert len(self.obs) > 0, "no observation is recorded, please update obs first"
+        """The last n_obs_steps observations on the device {key: (To, *)}."""
+        frames = self.obs_buffer.last_frames(self.n_obs_steps)
+        return {key: self.obs_buffer.get(key, frames) for key in OBS_KEYS}
 
-        result = dict()
-        for key in self.obs[0].keys():
-            result[key] = self.stack_last_n_obs([obs[key] for obs in self.obs], self.n_obs_steps)
+    def get_n_steps_features(self, policy: BaseImagePolicy):
+        """Features of the last n_obs_steps observations (To, Do), only frames not encoded yet are encoded."""
+        if self.feature_policy is not policy:  # features of another model
+            self.obs_features.clear()
+            self.feature_policy = policy
 
-        return result
+        frames = self.obs_buffer.last_frames(self.n_obs_steps)
+        self.obs_features = {frame: self.obs_features[frame] for frame in frames if frame in self.obs_features}
+        missing = sorted(set(frames) - self.obs_features.keys())
+        if len(missing) > 0:
+            obs_dict = {key: self.obs_buffer.get(key, missing) for key in OBS_KEYS}
+            features = policy.encode_obs(obs_dict)
+            self.obs_features.update(zip(missing, features))
+
+        return torch.stack([self.obs_features[frame] for frame in frames])
 
     def get_action(self, policy: BaseImagePolicy, observaton=None):
-        device, dtype = policy.device, policy.dtype
         if observaton is not None:
-            self.obs.append(observaton)  # update
-        obs = self.get_n_steps_obs()
+            self.update_obs(observaton)  # update
+        self.obs_buffer.to(policy.device)
 
-        # create obs dict
-        np_obs_dict = dict(obs)
-        # device transfer
-        obs_dict = dict_apply(np_obs_dict, lambda x: torch.from_numpy(x).to(device=device))
         # run policy
         with torch.no_grad():
-            obs_dict_input = {}  # flush unused keys
-            obs_dict_input["head_cam"] = obs_dict["head_cam"].unsqueeze(0)
-            # obs_dict_input['front_cam'] = obs_dict['front_cam'].unsqueeze(0)
-            obs_dict_input["left_cam"] = obs_dict["left_cam"].unsqueeze(0)
-            obs_dict_input["right_cam"] = obs_dict["right_cam"].unsqueeze(0)
-            obs_dict_input["agent_pos"] = obs_dict["agent_pos"].unsqueeze(0)
-
-            action_dict = policy.predict_action(obs_dict_input)
+            if self.use_feature_cache and hasattr(policy, "predict_action_from_features"):
+                nobs_features = self.get_n_steps_features(policy)
+                action_dict = policy.predict_action_from_features(nobs_features.unsqueeze(0))
+            else:
+                obs_dict_input = dict_apply(self.get_n_steps_obs(), lambda x: x.unsqueeze(0))
+                action_dict = policy.predict_action(obs_dict_input)
 
         # device_transfer
         np_action_dict = dict_apply(action_dict, lambda x: x.detach().to("cpu").numpy())
@@ -122,16 +122,37 @@ class DiffusionUnetImagePolicy(BaseImagePolicy):
 
         return trajectory
 
+    def encode_obs(self, obs_dict: Dict[str, torch.Tensor]) -> torch.Tensor:
+        """
+        obs_dict: str: N,* (single frames, no time dimension)
+        result: N,Do
+        Frames are normalized and encoded independently, so features of a frame can be reused
+        by every observation window that contains it (see DPRunner).
+        """
+        nobs = self.normalizer.normalize(obs_dict)
+        return self.obs_encoder(nobs)
+
     def predict_action(self, obs_dict: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
         """
         obs_dict: must include "obs" key
         result: must include "action" key
         """
         assert "past_action" not in obs_dict  # not implemented yet
-        # normalize input
-        nobs = self.normalizer.normalize(obs_dict)
-        value = next(iter(nobs.values()))
-        B, To = value.shape[:2]
+        value = next(iter(obs_dict.values()))
+        B = value.shape[0]
+        To = self.n_obs_steps
+
+        # encode B*To frames, reshape back to B, To, Do
+        this_obs = dict_apply(obs_dict, lambda x: x[:, :To, ...].reshape(-1, *x.shape[2:]))
+        nobs_features = self.encode_obs(this_obs).reshape(B, To, -1)
+        return self.predict_action_from_features(nobs_features)
+
+    def predict_action_from_features(self, nobs_features: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """
+        nobs_features: B,To,Do from encode_obs
+        result: must include "action" key
+        """
+        B = nobs_features.shape[0]
         T = self.horizon
         Da = self.action_dim
         Do = self.obs_feature_dim
@@ -145,20 +166,13 @@ class DiffusionUnetImagePolicy(BaseImagePolicy):
         local_cond = None
         global_cond = None
         if self.obs_as_global_cond:
-            # condition through global feature
-            this_nobs = dict_apply(nobs, lambda x: x[:, :To, ...].reshape(-1, *x.shape[2:]))
-            nobs_features = self.obs_encoder(this_nobs)
-            # reshape back to B, Do
+            # condition through global feature, B, To*Do
             global_cond = nobs_features.reshape(B, -1)
             # empty data for action
             cond_data = torch.zeros(size=(B, T, Da), device=device, dtype=dtype)
             cond_mask = torch.zeros_like(cond_data, dtype=torch.bool)
         else:
             # condition through impainting
-            this_nobs = dict_apply(nobs, lambda x: x[:, :To, ...].reshape(-1, *x.shape[2:]))
-            nobs_features = self.obs_encoder(this_nobs)
-            # reshape back to B, T, Do
-            nobs_features = nobs_features.reshape(B, To, -1)
             cond_data = torch.zeros(size=(B, T, Da + Do), device=device, dtype=dtype)
             cond_mask = torch.zeros_like(cond_data, dtype=torch.bool)
             cond_data[:, :To, Da:] = nobs_features
@@ -283,8 +283,13 @@ class BatchSampler:
         shuffle: bool = False,
         seed: int = 0,
         drop_last: bool = True,
+        permutation_fn=None,
     ):
+        """
+        - permutation_fn: rng -> shuffled sample order, e.g. `SequenceSampler.get_permutation` (chunk-aware).
+        """
         assert drop_last
+        self.permutation_fn = permutation_fn
         self.data_size = data_size
         self.batch_size = batch_size
         self.num_batch = data_size // batch_size
@@ -293,7 +298,9 @@ class BatchSampler:
         self.rng = np.random.default_rng(seed) if shuffle else None
 
     def __iter__(self):
-        if self.shuffle:
+        if self.shuffle and self.permutation_fn is not None:
+            perm = self.permutation_fn(self.rng)
+        elif self.shuffle:
             perm = self.rng.permutation(self.data_size)
         else:
             perm = np.arange(self.data_size)
@@ -317,7 +324,8 @@ def create_dataloader(
     persistent_workers: bool,
     seed: int = 0,
 ):
-    batch_sampler = BatchSampler(len(dataset), batch_size, shuffle=shuffle, seed=seed, drop_last=True)
+    batch_sampler = BatchSampler(len(dataset), batch_size, shuffle=shuffle, seed=seed, drop_last=True,
+                                 permutation_fn=dataset.sampler.get_permutation)
 
     def collate(x):
         assert len(x) == 1
@@ -8,28 +8,50 @@ import argparse
 import yaml
 import cv2
 import h5py
+import importlib.util
+import multiprocessing as mp
+from collections import deque
 
+from diffusion_policy.common.replay_buffer import ReplayBuffer
 
-def load_hdf5(dataset_path):
-    if not os.path.isfile(dataset_path):
-        print(f"Dataset does not exist at \n{dataset_path}\n")
-        exit()
+# envs/utils/norm_stats.py only needs numpy / h5py, load it without importing the `envs` package (sapien)
+_spec = importlib.util.spec_from_file_location(
+    "norm_stats", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "envs", "utils", "norm_stats.py"))
+norm_stats_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(norm_stats_module)
 
-    with h5py.File(dataset_path, "r") as root:
-        left_gripper, left_arm = (
-            root["/joint_action/left_gripper"][()],
-            root["/joint_action/left_arm"][()],
-        )
-        right_gripper, right_arm = (
-            root["/joint_action/right_gripper"][()],
-            root["/joint_action/right_arm"][()],
-        )
-        vector = root["/joint_action/vector"][()]
-        image_dict = dict()
-        for cam_name in root[f"/observation/"].keys():
-            image_dict[cam_name] = root[f"/observation/{cam_name}/rgb"][()]
 
-    return left_gripper, left_arm, right_gripper, right_arm, vector, image_dict
+def load_episode(load_path):
+    """One episode as the arrays appended to the replay buffer, decoded in a worker process."""
+    cv2.setNumThreads(1)  # the pool already uses every core
+    if not os.path.isfile(load_path):
+        raise FileNotFoundError(f"Dataset does not exist at {load_path}")
+    with h5py.File(load_path, "r") as root:
+        vector = root["/joint_action/vector"][()]
+        head_img_bits = root["/observation/head_camera/rgb"][:-1]
+
+    head_camera = np.stack([cv2.imdecode(np.frombuffer(bit, np.uint8), cv2.IMREAD_COLOR) for bit in head_img_bits])
+    return {
+        "head_camera": np.ascontiguousarray(np.moveaxis(head_camera, -1, 1)),  # NHWC -> NCHW
+        "state": vector[:-1].astype(np.float32),
+        "action": vector[1:].astype(np.float32),
+    }
+
+
+def iter_episodes(load_paths, num_workers):
+    """Episodes in order, at most `2 * num_workers` are decoded ahead so memory stays bounded."""
+    if num_workers <= 1:
+        for load_path in load_paths:
+            yield load_episode(load_path)
+        return
+    with mp.get_context("spawn").Pool(num_workers) as pool:
+        pending = deque()
+        for load_path in load_paths:
+            pending.append(pool.apply_async(load_episode, (load_path, )))
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().get()
+        while len(pending) > 0:
+            yield pending.popleft().get()
 
 
 def main():
@@ -45,6 +67,8 @@ def main():
         type=int,
         help="Number of episodes to process (e.g., 50)",
     )
+    parser.add_argument("--num_workers", type=int, default=min(8, os.cpu_count() or 1),
+                        help="Processes decoding episodes")
     args = parser.parse_args()
 
     task_name = args.task_name
@@ -53,105 +77,38 @@ def main():
 
     load_dir = "../../data/" + str(task_name) + "/" + str(task_config)
 
-    total_count = 0
-
     save_dir = f"./data/{task_name}-{task_config}-{num}.zarr"
 
     if os.path.exists(save_dir):
         shutil.rmtree(save_dir)
 
-    current_ep = 0
-
     zarr_root = zarr.group(save_dir)
-    zarr_data = zarr_root.create_group("data")
+    zarr_root.create_group("data")
     zarr_meta = zarr_root.create_group("meta")
 
-    head_camera_arrays, front_camera_arrays, left_camera_arrays, right_camera_arrays = (
-        [],
-        [],
-        [],
-        [],
-    )
-    episode_ends_arrays, action_arrays, state_arrays, joint_action_arrays = (
-        [],
-        [],
-        [],
-        [],
-    )
+    compressor = zarr.Blosc(cname="zstd", clevel=3, shuffle=1)
+    zarr_meta.zeros("episode_ends", shape=(0, ), dtype="int64", compressor=compressor)
+    replay_buffer = ReplayBuffer.create_from_group(zarr_root)
 
-    while current_ep < num:
+    load_paths = [os.path.join(load_dir, f"data/episode{current_ep}.hdf5") for current_ep in range(num)]
+    episode_norm_stats = []
+    for current_ep, episode in enumerate(iter_episodes(load_paths, args.num_workers)):
         print(f"processing episode: {current_ep + 1} / {num}", end="\r")
-
-        load_path = os.path.join(load_dir, f"data/episode{current_ep}.hdf5")
-        (
-            left_gripper_all,
-            left_arm_all,
-            right_gripper_all,
-            right_arm_all,
-            vector_all,
-            image_dict_all,
-        ) = load_hdf5(load_path)
-
-        for j in range(0, left_gripper_all.shape[0]):
-
-            head_img_bit = image_dict_all["head_camera"][j]
-            joint_state = vector_all[j]
-
-            if j != left_gripper_all.shape[0] - 1:
-                head_img = cv2.imdecode(np.frombuffer(head_img_bit, np.uint8), cv2.IMREAD_COLOR)
-                head_camera_arrays.append(head_img)
-                state_arrays.append(joint_state)
-            if j != 0:
-                joint_action_arrays.append(joint_state)
-
-        current_ep += 1
-        total_count += left_gripper_all.shape[0] - 1
-        episode_ends_arrays.append(total_count)
-
+        # each episode is appended (and compressed) as soon as it is decoded
+        replay_buffer.add_episode(
+            episode,
+            chunks={key: (100, *value.shape[1:]) for key, value in episode.items()},
+            compressors={key: compressor for key in episode.keys()},
+        )
+        episode_norm_stats.append(norm_stats_module.load_norm_stats(load_paths[current_ep]))
     print()
-    episode_ends_arrays = np.array(episode_ends_arrays)
-    # action_arrays = np.array(action_arrays)
-    state_arrays = np.array(state_arrays)
-    head_camera_arrays = np.array(head_camera_arrays)
-    joint_action_arrays = np.array(joint_action_arrays)
-
-    head_camera_arrays = np.moveaxis(head_camera_arrays, -1, 1)  # NHWC -> NCHW
 
-    compressor = zarr.Blosc(cname="zstd", clevel=3, shuffle=1)
-    # action_chunk_size = (100, action_arrays.shape[1])
-    state_chunk_size = (100, state_arrays.shape[1])
-    joint_chunk_size = (100, joint_action_arrays.shape[1])
-    head_camera_chunk_size = (100, *head_camera_arrays.shape[1:])
-    zarr_data.create_dataset(
-        "head_camera",
-        data=head_camera_arrays,
-        chunks=head_camera_chunk_size,
-        overwrite=True,
-        compressor=compressor,
-    )
-    zarr_data.create_dataset(
-        "state",
-        data=state_arrays,
-        chunks=state_chunk_size,
-        dtype="float32",
-        overwrite=True,
-        compressor=compressor,
-    )
-    zarr_data.create_dataset(
-        "action",
-        data=joint_action_arrays,
-        chunks=joint_chunk_size,
-        dtype="float32",
-        overwrite=True,
-        compressor=compressor,
-    )
-    zarr_meta.create_dataset(
-        "episode_ends",
-        data=episode_ends_arrays,
-        dtype="int64",
-        overwrite=True,
-        compressor=compressor,
-    )
+    # statistics stored at collection time, the dataset fits its normalizer from them instead of the actions
+    merged = norm_stats_module.merge_complete_norm_stats(episode_norm_stats)
+    if len(merged) > 0:
+        replay_buffer.update_meta(norm_stats_module.to_meta_arrays(merged))
+    else:
+        print("Some episodes were collected without `norm_stats`, the normalizer is fit from the actions")
 
 
 if __name__ == "__main__":
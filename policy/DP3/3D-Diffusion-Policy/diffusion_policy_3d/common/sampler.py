@@ -76,6 +76,18 @@ def downsample_mask(mask, max_n, seed=0):
     return train_mask
 
 
+def get_chunk_aware_permutation(indices: np.ndarray, chunk_length: int, window: int, rng: np.random.Generator):
+    """
+    Shuffled sample order with locality for chunked (lazy) storage: chunks are visited in random order
+    and samples are shuffled within groups of `window` consecutive chunks, so a group fits the chunk cache.
+    """
+    chunk_ids = indices[:, 0] // chunk_length
+    chunk_rank = np.zeros(chunk_ids.max() + 1 if len(chunk_ids) > 0 else 0, dtype=np.int64)
+    chunk_rank[rng.permutation(len(chunk_rank))] = np.arange(len(chunk_rank))
+    groups = chunk_rank[chunk_ids] // window
+    return np.lexsort((rng.random(len(indices)), groups))
+
+
 class SequenceSampler:
 
     def __init__(
@@ -123,6 +135,13 @@ class SequenceSampler:
     def __len__(self):
         return len(self.indices)
 
+    def get_permutation(self, rng: np.random.Generator) -> np.ndarray:
+        """Shuffled sample order, chunk-aware when the replay buffer reads from disk lazily."""
+        locality = self.replay_buffer.get_sample_locality()
+        if locality is None:
+            return rng.permutation(len(self.indices))
+        return get_chunk_aware_permutation(self.indices, *locality, rng)
+
     def sample_sequence(self, idx):
         buffer_start_idx, buffer_end_idx, sample_start_idx, sample_end_idx = (self.indices[idx])
         result = dict()
@@ -161,3 +180,17 @@ class SequenceSampler:
                 data[sample_start_idx:sample_end_idx] = sample
             result[key] = data
         return result
+
+
+class ChunkAwareShuffle:
+    """DataLoader sampler yielding `SequenceSampler.get_permutation` orders, a new one per epoch."""
+
+    def __init__(self, sampler: SequenceSampler, seed: int = 0):
+        self.sampler = sampler
+        self.rng = np.random.default_rng(seed)
+
+    def __iter__(self):
+        return iter(self.sampler.get_permutation(self.rng).tolist())
+
+    def __len__(self):
+        return len(self.sampler)
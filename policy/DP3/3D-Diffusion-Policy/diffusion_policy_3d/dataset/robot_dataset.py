@@ -36,13 +36,29 @@ class RobotDataset(BaseDataset):
         val_ratio=0.0,
         max_train_episodes=None,
         task_name=None,
+        memory_budget=None,
+        num_workers=0,
+        val_num_workers=0,
     ):
+        """
+        - memory_budget: bytes of host memory for the dataset in total, the zarr is then read lazily through
+          a chunk cache (`ReplayBuffer.create_lazy_from_path`) split across the dataloader workers.
+          None copies the whole dataset to memory.
+        - num_workers, val_num_workers: workers of the train / val dataloaders, the chunk cache is split
+          between max(1, num_workers) + val_num_workers processes.
+        """
         super().__init__()
         self.task_name = task_name
         current_file_path = os.path.abspath(__file__)
         parent_directory = os.path.dirname(current_file_path)
         zarr_path = os.path.join(parent_directory, zarr_path)
-        self.replay_buffer = ReplayBuffer.copy_from_path(zarr_path, keys=["state", "action", "point_cloud"])  # 'img'
+        keys = ["state", "action", "point_cloud"]  # 'img'
+        if memory_budget is None:
+            self.replay_buffer = ReplayBuffer.copy_from_path(zarr_path, keys=keys)
+        else:
+            self.replay_buffer = ReplayBuffer.create_lazy_from_path(zarr_path, keys=keys,
+                                                                    memory_budget=int(memory_budget),
+                                                                    num_readers=max(1, num_workers) + val_num_workers)
         val_mask = get_val_mask(n_episodes=self.replay_buffer.n_episodes, val_ratio=val_ratio, seed=seed)
         train_mask = ~val_mask
         train_mask = downsample_mask(mask=train_mask, max_n=max_train_episodes, seed=seed)
@@ -72,9 +88,9 @@ class RobotDataset(BaseDataset):
 
     def get_normalizer(self, mode="limits", **kwargs):
         data = {
-            "action": self.replay_buffer["action"],
+            "action": self.replay_buffer["action"][:],
             "agent_pos": self.replay_buffer["state"][..., :],
-            "point_cloud": self.replay_buffer["point_cloud"],
+            "point_cloud": self.replay_buffer["point_cloud"][:],
         }
         normalizer = LinearNormalizer()
         normalizer.fit(data=data, last_n_dims=1, mode=mode, **kwargs)
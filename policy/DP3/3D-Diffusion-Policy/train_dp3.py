@@ -40,6 +40,7 @@ from diffusion_policy_3d.env_runner.base_runner import BaseRunner
 from diffusion_policy_3d.env_runner.robot_runner import RobotRunner
 from diffusion_policy_3d.common.checkpoint_util import TopKCheckpointManager
 from diffusion_policy_3d.common.pytorch_util import dict_apply, optimizer_to
+from diffusion_policy_3d.common.sampler import ChunkAwareShuffle
 from diffusion_policy_3d.model.diffusion.ema_model import EMAModel
 from diffusion_policy_3d.model.common.lr_scheduler import get_scheduler
 
@@ -116,7 +117,13 @@ class TrainDP3Workspace:
         dataset = hydra.utils.instantiate(cfg.task.dataset)
 
         assert isinstance(dataset, BaseDataset), print(f"dataset must be BaseDataset, got {type(dataset)}")
-        train_dataloader = DataLoader(dataset, **cfg.dataloader)
+        if cfg.dataloader.shuffle and dataset.replay_buffer.get_sample_locality() is not None:
+            # lazy dataset: shuffle at chunk granularity so the chunk cache is reused
+            dataloader_cfg = {key: value for key, value in cfg.dataloader.items() if key != "shuffle"}
+            train_dataloader = DataLoader(dataset, sampler=ChunkAwareShuffle(dataset.sampler, seed=cfg.training.seed),
+                                          **dataloader_cfg)
+        else:
+            train_dataloader = DataLoader(dataset, **cfg.dataloader)
         normalizer = dataset.get_normalizer()
 
         # configure validation dataset
@@ -10,6 +10,22 @@ import cv2
 import h5py
 
 
+def load_pointcloud(root):
+    """
+    (T, N, 6) point clouds of an episode. The compact encodings (`data_encoding.pointcloud` float32 / int16) are
+    a group of xyz + uint8 rgb and are decoded straight to float32, the legacy float64 dataset is read as is.
+    """
+    item = root["/pointcloud"]
+    if not isinstance(item, h5py.Group):
+        return item[()]
+    xyz = item["xyz"][()]
+    if item.attrs["encoding"] == "int16":
+        xyz = xyz.astype(np.float32) * item.attrs["xyz_scale"].astype(np.float32) + item.attrs["xyz_offset"].astype(
+            np.float32)
+    rgb = item["rgb"][()].astype(np.float32) / 255.0
+    return np.concatenate([xyz, rgb], axis=-1)
+
+
 def load_hdf5(dataset_path):
     if not os.path.isfile(dataset_path):
         print(f"Dataset does not exist at \n{dataset_path}\n")
@@ -25,7 +41,7 @@ def load_hdf5(dataset_path):
             root["/joint_action/right_arm"][()],
         )
         vector = root["/joint_action/vector"][()]
-        pointcloud = root["/pointcloud"][()]
+        pointcloud = load_pointcloud(root)
 
     return left_gripper, left_arm, right_gripper, right_arm, vector, pointcloud
 
@@ -104,7 +120,7 @@ def main():
     try:
         episode_ends_arrays = np.array(episode_ends_arrays)
         state_arrays = np.array(state_arrays)
-        point_cloud_arrays = np.array(point_cloud_arrays)
+        point_cloud_arrays = np.array(point_cloud_arrays, dtype=np.float32)
         joint_action_arrays = np.array(joint_action_arrays)
     
         compressor = zarr.Blosc(cname="zstd", clevel=3, shuffle=1)
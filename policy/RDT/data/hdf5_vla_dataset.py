@@ -1,6 +1,8 @@
 import os
 import fnmatch
 import json
+import pickle
+from collections import OrderedDict
 
 import h5py
 import yaml
@@ -9,6 +11,62 @@ import numpy as np
 
 from configs.state_vec import STATE_VEC_IDX_MAPPING
 
+EPISODE_INDEX_FILE = "_episode_index.pkl"
+EPISODE_INDEX_VERSION = 1
+
+
+class HDF5HandlePool:
+    """LRU of open read-only HDF5 files, per process (handles are not shared with forked dataloader workers)."""
+
+    def __init__(self, max_open=32):
+        self.max_open = max_open
+        self.pid = os.getpid()
+        self.files = OrderedDict()
+
+    def get(self, file_path):
+        if os.getpid() != self.pid:  # forked: the inherited handles belong to the parent
+            self.files = OrderedDict()
+            self.pid = os.getpid()
+        f = self.files.get(file_path)
+        if f is not None:
+            self.files.move_to_end(file_path)
+            return f
+        f = h5py.File(file_path, "r")
+        self.files[file_path] = f
+        while len(self.files) > self.max_open:
+            _, evicted = self.files.popitem(last=False)
+            evicted.close()
+        return f
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = OrderedDict()
+
+
+class DecodedFrameCache:
+    """LRU of decoded images keyed by (file, camera, frame), bounded by `max_bytes`."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.frames = OrderedDict()
+
+    def get(self, key, decoder):
+        img = self.frames.get(key)
+        if img is not None:
+            self.frames.move_to_end(key)
+            return img
+        img = decoder()
+        if self.max_bytes <= 0:
+            return img
+        self.frames[key] = img
+        self.nbytes += img.nbytes
+        while self.nbytes > self.max_bytes and len(self.frames) > 0:
+            _, evicted = self.frames.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return img
+
 
 class HDF5VLADataset:
     """
@@ -37,17 +95,100 @@ class HDF5VLADataset:
         self.IMG_HISORY_SIZE = config["common"]["img_history_size"]
         self.STATE_DIM = config["common"]["state_dim"]
 
+        # Open files, decoded frames and per-episode metadata are cached, see `get_episode_meta`
+        self.handle_pool = HDF5HandlePool(model_config.get("hdf5_max_open_files", 32))
+        self.frame_cache = DecodedFrameCache(model_config.get("hdf5_frame_cache_mb", 256) * 2**20)
+        self.instruction_cache = {}
+        self.index_path = os.path.join(HDF5_DIR, EPISODE_INDEX_FILE)
+        self.episode_index = self.load_episode_index()
+
         # Get each episode's len
-        episode_lens = []
-        for file_path in self.file_paths:
-            valid, res = self.parse_hdf5_file_state_only(file_path)
-            _len = res["state"].shape[0] if valid else 0
-            episode_lens.append(_len)
+        episode_lens = [self.get_episode_meta(file_path)["state_len"] for file_path in self.file_paths]
+        self.save_episode_index()
         self.episode_sample_weights = np.array(episode_lens) / np.sum(episode_lens)
 
     def __len__(self):
         return len(self.file_paths)
 
+    # ------------------------------------------------------------------ episode index
+
+    def load_episode_index(self):
+        """Sidecar index of the episode metadata, {file name: meta}, entries are checked against mtime / size."""
+        try:
+            with open(self.index_path, "rb") as f:
+                index = pickle.load(f)
+            if index.get("version") == EPISODE_INDEX_VERSION:
+                self._index_dirty = False
+                return index["episodes"]
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        self._index_dirty = True
+        return {}
+
+    def save_episode_index(self):
+        if not self._index_dirty:
+            return
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"version": EPISODE_INDEX_VERSION, "episodes": self.episode_index}, f)
+            os.replace(tmp_path, self.index_path)
+            self._index_dirty = False
+        except OSError as e:  # e.g. a read-only dataset, the index is only an optimization
+            print(f"Could not save the episode index {self.index_path}: {e}")
+
+    def get_episode_meta(self, file_path):
+        """
+        Per-episode metadata needed for sampling: #steps, first moving step, arm dims, state statistics
+        and the length of the state trajectory (sampling weight).
+        """
+        key = os.path.relpath(file_path, os.path.dirname(self.index_path))
+        stat = os.stat(file_path)
+        meta = self.episode_index.get(key)
+        if meta is not None and meta["mtime"] == stat.st_mtime and meta["size"] == stat.st_size:
+            return meta
+
+        f = self.handle_pool.get(file_path)
+        qpos = f["observations"]["qpos"][:]
+        left_arm_dim = f["observations"]["left_arm_dim"][:]
+        right_arm_dim = f["observations"]["right_arm_dim"][:]
+        # [Optional] We skip the first few still steps
+        EPS = 1e-2
+        # Get the idx of the first qpos whose delta exceeds the threshold
+        qpos_delta = np.abs(qpos - qpos[0:1])
+        indices = np.where(np.any(qpos_delta > EPS, axis=1))[0]
+        if len(indices) > 0:
+            first_idx = indices[0]
+        else:
+            raise ValueError("Found no qpos that exceeds the threshold.")
+        meta = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "num_steps": qpos.shape[0],
+            "first_idx": int(first_idx),
+            "left_arm_dim": left_arm_dim,
+            "right_arm_dim": right_arm_dim,
+            "state_std": np.std(qpos, axis=0),
+            "state_mean": np.mean(qpos, axis=0),
+            "state_norm": np.sqrt(np.mean(qpos**2, axis=0)),
+            "state_len": qpos[first_idx - 1:].shape[0],
+        }
+        self.episode_index[key] = meta
+        self._index_dirty = True
+        return meta
+
+    def get_instructions(self, dir_path):
+        instructions_names = self.instruction_cache.get(dir_path)
+        if instructions_names is None:
+            instructions_path = os.path.join(dir_path, "instructions")
+            instructions_names = []
+            for filename in sorted(os.listdir(instructions_path)):
+                # 检查文件名是否以.pt结尾
+                if filename.endswith(".pt"):
+                    instructions_names.append(os.path.join(instructions_path, filename))
+            self.instruction_cache[dir_path] = instructions_names
+        return instructions_names
+
     def get_dataset_name(self):
         return self.DATASET_NAME
 
@@ -115,157 +256,147 @@ class HDF5VLADataset:
                     "cam_right_wrist_mask": ndarray
                 } or None if the episode is invalid.
         """
-        with h5py.File(file_path, "r") as f:
-            qpos = f["observations"]["qpos"][:]
-            left_arm_dim = f["observations"]["left_arm_dim"][:]
-            right_arm_dim = f["observations"]["right_arm_dim"][:]
-            num_steps = qpos.shape[0]
-            action_dim = qpos
-            # [Optional] We drop too-short episode
-            # if num_steps < 128:
-            #     return False, None
-
-            # [Optional] We skip the first few still steps
-            EPS = 1e-2
-            # Get the idx of the first qpos whose delta exceeds the threshold
-            qpos_delta = np.abs(qpos - qpos[0:1])
-            indices = np.where(np.any(qpos_delta > EPS, axis=1))[0]
-            if len(indices) > 0:
-                first_idx = indices[0]
-            else:
-                raise ValueError("Found no qpos that exceeds the threshold.")
-
-            # We randomly sample a timestep
-            step_id = np.random.randint(first_idx - 1, num_steps)
-
-            # Load the instruction
-            dir_path = os.path.dirname(file_path)
-
-            # with open(os.path.join(dir_path, 'instruction.json'), 'r') as f_instr:
-            #     instruction_dict = json.load(f_instr)
-            # # We have 1/3 prob to use original instruction,
-            # # 1/3 to use simplified instruction,
-            # # and 1/3 to use expanded instruction.
-            # instruction_type = np.random.choice([
-            #     'instruction', 'expanded_instruction'])
-            # instruction = instruction_dict[instruction_type]
-            # if isinstance(instruction, list):
-            #    instruction = np.random.choice(instruction)
-
-            # You can also use precomputed language embeddings (recommended)
-            # instruction = "path/to/lang_embed.pt"
-            instructions_path = os.path.join(dir_path, "instructions")
-            instructions_names = []
-
-            for filename in os.listdir(instructions_path):
-                # 检查文件名是否以.pt结尾
-                if filename.endswith(".pt"):
-                    instructions_names.append(os.path.join(instructions_path, filename))
-            instruction = np.random.choice(instructions_names)
-            # print(f"choose {instruction} file as instruction.")
-            # Assemble the meta
-            meta = {
-                "dataset_name": self.DATASET_NAME,
-                "#steps": num_steps,
-                "step_id": step_id,
-                "instruction": instruction,
-            }
-
-            # Rescale gripper to [0, 1]
-            qpos = qpos / np.array([[1 for i in range(left_arm_dim[0] + 1 + right_arm_dim[0] + 1)]])
-            target_qpos = f["action"][step_id:step_id + self.CHUNK_SIZE] / np.array(
-                [[1 for i in range(left_arm_dim[0] + 1 + right_arm_dim[0] + 1)]])
-
-            # Parse the state and action
-            state = qpos[step_id:step_id + 1]
-            state_std = np.std(qpos, axis=0)
-            state_mean = np.mean(qpos, axis=0)
-            state_norm = np.sqrt(np.mean(qpos**2, axis=0))
-            actions = target_qpos
-            if actions.shape[0] < self.CHUNK_SIZE:
-                # Pad the actions using the last action
-                actions = np.concatenate(
+        f = self.handle_pool.get(file_path)
+        episode_meta = self.get_episode_meta(file_path)
+        left_arm_dim = episode_meta["left_arm_dim"]
+        right_arm_dim = episode_meta["right_arm_dim"]
+        num_steps = episode_meta["num_steps"]
+        # [Optional] We drop too-short episode
+        # if num_steps < 128:
+        #     return False, None
+
+        # [Optional] We skip the first few still steps, see `get_episode_meta`
+        first_idx = episode_meta["first_idx"]
+
+        # We randomly sample a timestep
+        step_id = np.random.randint(first_idx - 1, num_steps)
+
+        # Load the instruction
+        dir_path = os.path.dirname(file_path)
+
+        # with open(os.path.join(dir_path, 'instruction.json'), 'r') as f_instr:
+        #     instruction_dict = json.load(f_instr)
+        # # We have 1/3 prob to use original instruction,
+        # # 1/3 to use simplified instruction,
+        # # and 1/3 to use expanded instruction.
+        # instruction_type = np.random.choice([
+        #     'instruction', 'expanded_instruction'])
+        # instruction = instruction_dict[instruction_type]
+        # if isinstance(instruction, list):
+        #    instruction = np.random.choice(instruction)
+
+        # You can also use precomputed language embeddings (recommended)
+        # instruction = "path/to/lang_embed.pt"
+        instruction = np.random.choice(self.get_instructions(dir_path))
+        # print(f"choose {instruction} file as instruction.")
+        # Assemble the meta
+        meta = {
+            "dataset_name": self.DATASET_NAME,
+            "#steps": num_steps,
+            "step_id": step_id,
+            "instruction": instruction,
+        }
+
+        # Rescale gripper to [0, 1]
+        scale = np.array([[1 for i in range(left_arm_dim[0] + 1 + right_arm_dim[0] + 1)]])
+        # only the sampled rows are read, the statistics of the whole episode come from the index
+        state = f["observations"]["qpos"][step_id:step_id + 1] / scale
+        target_qpos = f["action"][step_id:step_id + self.CHUNK_SIZE] / scale
+
+        # Parse the state and action
+        state_std = episode_meta["state_std"] / scale[0]
+        state_mean = episode_meta["state_mean"] / scale[0]
+        state_norm = episode_meta["state_norm"] / scale[0]
+        actions = target_qpos
+        if actions.shape[0] < self.CHUNK_SIZE:
+            # Pad the actions using the last action
+            actions = np.concatenate(
+                [
+                    actions,
+                    np.tile(actions[-1:], (self.CHUNK_SIZE - actions.shape[0], 1)),
+                ],
+                axis=0,
+            )
+
+        # Fill the state/action into the unified vector
+
+        def fill_in_state(values):
+            # Target indices corresponding to your state space
+            # In this example: 6 joints + 1 gripper for each arm
+            UNI_STATE_INDICES = (
+                [STATE_VEC_IDX_MAPPING[f"left_arm_joint_{i}_pos"]
+                 for i in range(left_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["left_gripper_open"]] +
+                [STATE_VEC_IDX_MAPPING[f"right_arm_joint_{i}_pos"]
+                 for i in range(right_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["right_gripper_open"]])
+            uni_vec = np.zeros(values.shape[:-1] + (self.STATE_DIM, ))
+            uni_vec[..., UNI_STATE_INDICES] = values
+            return uni_vec
+
+        state = fill_in_state(state)
+        state_indicator = fill_in_state(np.ones_like(state_std))
+        state_std = fill_in_state(state_std)
+        state_mean = fill_in_state(state_mean)
+        state_norm = fill_in_state(state_norm)
+        # If action's format is different from state's,
+        # you may implement fill_in_action()
+        actions = fill_in_state(actions)
+
+        # Parse the images
+        def parse_img(key):
+            images = f["observations"]["images"][key]
+
+            def decode(i):
+                return cv2.imdecode(np.frombuffer(images[i], np.uint8), cv2.IMREAD_COLOR)
+
+            # consecutive samples of an episode share most of their history frames
+            imgs = [
+                self.frame_cache.get((file_path, key, i), lambda i=i: decode(i))
+                for i in range(max(step_id - self.IMG_HISORY_SIZE + 1, 0), step_id + 1)
+            ]
+            imgs = np.stack(imgs)
+            if imgs.shape[0] < self.IMG_HISORY_SIZE:
+                # Pad the images using the first image
+                imgs = np.concatenate(
                     [
-                        actions,
-                        np.tile(actions[-1:], (self.CHUNK_SIZE - actions.shape[0], 1)),
+                        np.tile(
+                            imgs[:1],
+                            (self.IMG_HISORY_SIZE - imgs.shape[0], 1, 1, 1),
+                        ),
+                        imgs,
                     ],
                     axis=0,
                 )
-
-            # Fill the state/action into the unified vector
-
-            def fill_in_state(values):
-                # Target indices corresponding to your state space
-                # In this example: 6 joints + 1 gripper for each arm
-                UNI_STATE_INDICES = (
-                    [STATE_VEC_IDX_MAPPING[f"left_arm_joint_{i}_pos"]
-                     for i in range(left_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["left_gripper_open"]] +
-                    [STATE_VEC_IDX_MAPPING[f"right_arm_joint_{i}_pos"]
-                     for i in range(right_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["right_gripper_open"]])
-                uni_vec = np.zeros(values.shape[:-1] + (self.STATE_DIM, ))
-                uni_vec[..., UNI_STATE_INDICES] = values
-                return uni_vec
-
-            state = fill_in_state(state)
-            state_indicator = fill_in_state(np.ones_like(state_std))
-            state_std = fill_in_state(state_std)
-            state_mean = fill_in_state(state_mean)
-            state_norm = fill_in_state(state_norm)
-            # If action's format is different from state's,
-            # you may implement fill_in_action()
-            actions = fill_in_state(actions)
-
-            # Parse the images
-            def parse_img(key):
-                imgs = []
-                for i in range(max(step_id - self.IMG_HISORY_SIZE + 1, 0), step_id + 1):
-                    img_bits = f["observations"]["images"][key][i]
-                    img = cv2.imdecode(np.frombuffer(img_bits, np.uint8), cv2.IMREAD_COLOR)
-                    imgs.append(img)
-                imgs = np.stack(imgs)
-                if imgs.shape[0] < self.IMG_HISORY_SIZE:
-                    # Pad the images using the first image
-                    imgs = np.concatenate(
-                        [
-                            np.tile(
-                                imgs[:1],
-                                (self.IMG_HISORY_SIZE - imgs.shape[0], 1, 1, 1),
-                            ),
-                            imgs,
-                        ],
-                        axis=0,
-                    )
-                return imgs
-
-            # `cam_high` is the external camera image
-            cam_high = parse_img("cam_high")
-            # For step_id = first_idx - 1, the valid_len should be one
-            valid_len = min(step_id - (first_idx - 1) + 1, self.IMG_HISORY_SIZE)
-            cam_high_mask = np.array([False] * (self.IMG_HISORY_SIZE - valid_len) + [True] * valid_len)
-            cam_left_wrist = parse_img("cam_left_wrist")
-            cam_left_wrist_mask = cam_high_mask.copy()
-            cam_right_wrist = parse_img("cam_right_wrist")
-            cam_right_wrist_mask = cam_high_mask.copy()
-
-            # Return the resulting sample
-            # For unavailable images, return zero-shape arrays, i.e., (IMG_HISORY_SIZE, 0, 0, 0)
-            # E.g., return np.zeros((self.IMG_HISORY_SIZE, 0, 0, 0)) for the key "cam_left_wrist",
-            # if the left-wrist camera is unavailable on your robot
-            return True, {
-                "meta": meta,
-                "state": state,
-                "state_std": state_std,
-                "state_mean": state_mean,
-                "state_norm": state_norm,
-                "actions": actions,
-                "state_indicator": state_indicator,
-                "cam_high": cam_high,
-                "cam_high_mask": cam_high_mask,
-                "cam_left_wrist": cam_left_wrist,
-                "cam_left_wrist_mask": cam_left_wrist_mask,
-                "cam_right_wrist": cam_right_wrist,
-                "cam_right_wrist_mask": cam_right_wrist_mask,
-            }
+            return imgs
+
+        # `cam_high` is the external camera image
+        cam_high = parse_img("cam_high")
+        # For step_id = first_idx - 1, the valid_len should be one
+        valid_len = min(step_id - (first_idx - 1) + 1, self.IMG_HISORY_SIZE)
+        cam_high_mask = np.array([False] * (self.IMG_HISORY_SIZE - valid_len) + [True] * valid_len)
+        cam_left_wrist = parse_img("cam_left_wrist")
+        cam_left_wrist_mask = cam_high_mask.copy()
+        cam_right_wrist = parse_img("cam_right_wrist")
+        cam_right_wrist_mask = cam_high_mask.copy()
+
+        # Return the resulting sample
+        # For unavailable images, return zero-shape arrays, i.e., (IMG_HISORY_SIZE, 0, 0, 0)
+        # E.g., return np.zeros((self.IMG_HISORY_SIZE, 0, 0, 0)) for the key "cam_left_wrist",
+        # if the left-wrist camera is unavailable on your robot
+        return True, {
+            "meta": meta,
+            "state": state,
+            "state_std": state_std,
+            "state_mean": state_mean,
+            "state_norm": state_norm,
+            "actions": actions,
+            "state_indicator": state_indicator,
+            "cam_high": cam_high,
+            "cam_high_mask": cam_high_mask,
+            "cam_left_wrist": cam_left_wrist,
+            "cam_left_wrist_mask": cam_left_wrist_mask,
+            "cam_right_wrist": cam_right_wrist,
+            "cam_right_wrist_mask": cam_right_wrist_mask,
+        }
 
     def parse_hdf5_file_state_only(self, file_path):
         """[Modify] Parse a hdf5 file to generate a state trajectory.
@@ -282,52 +413,45 @@ class HDF5VLADataset:
                     "action": ndarray,          # action[:], (T, STATE_DIM).
                 } or None if the episode is invalid.
         """
-        with h5py.File(file_path, "r") as f:
-            qpos = f["observations"]["qpos"][:]
-            left_arm_dim = f["observations"]["left_arm_dim"][:]
-            right_arm_dim = f["observations"]["right_arm_dim"][:]
-
-            num_steps = qpos.shape[0]
-            # [Optional] We drop too-short episode
-            # if num_steps < 128:
-            # return False, None
-
-            # [Optional] We skip the first few still steps
-            EPS = 1e-2
-            # Get the idx of the first qpos whose delta exceeds the threshold
-            qpos_delta = np.abs(qpos - qpos[0:1])
-            indices = np.where(np.any(qpos_delta > EPS, axis=1))[0]
-            if len(indices) > 0:
-                first_idx = indices[0]
-            else:
-                raise ValueError("Found no qpos that exceeds the threshold.")
-
-            # Rescale gripper to [0, 1]
-            qpos = qpos / np.array([[1 for i in range(left_arm_dim[0] + right_arm_dim[0] + 2)]])
-            target_qpos = f["action"][:] / np.array([[1 for i in range(left_arm_dim[0] + right_arm_dim[0] + 2)]])
-
-            # Parse the state and action
-            state = qpos[first_idx - 1:]
-            action = target_qpos[first_idx - 1:]
-
-            # Fill the state/action into the unified vector
-            def fill_in_state(values):
-                # Target indices corresponding to your state space
-                # In this example: 6 joints + 1 gripper for each arm
-                UNI_STATE_INDICES = (
-                    [STATE_VEC_IDX_MAPPING[f"left_arm_joint_{i}_pos"]
-                     for i in range(left_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["left_gripper_open"]] +
-                    [STATE_VEC_IDX_MAPPING[f"right_arm_joint_{i}_pos"]
-                     for i in range(right_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["right_gripper_open"]])
-                uni_vec = np.zeros(values.shape[:-1] + (self.STATE_DIM, ))
-                uni_vec[..., UNI_STATE_INDICES] = values
-                return uni_vec
-
-            state = fill_in_state(state)
-            action = fill_in_state(action)
-
-            # Return the resulting sample
-            return True, {"state": state, "action": action}
+        f = self.handle_pool.get(file_path)
+        qpos = f["observations"]["qpos"][:]
+        left_arm_dim = f["observations"]["left_arm_dim"][:]
+        right_arm_dim = f["observations"]["right_arm_dim"][:]
+
+        num_steps = qpos.shape[0]
+        # [Optional] We drop too-short episode
+        # if num_steps < 128:
+        # return False, None
+
+        # [Optional] We skip the first few still steps, see `get_episode_meta`
+        first_idx = self.get_episode_meta(file_path)["first_idx"]
+
+        # Rescale gripper to [0, 1]
+        qpos = qpos / np.array([[1 for i in range(left_arm_dim[0] + right_arm_dim[0] + 2)]])
+        target_qpos = f["action"][:] / np.array([[1 for i in range(left_arm_dim[0] + right_arm_dim[0] + 2)]])
+
+        # Parse the state and action
+        state = qpos[first_idx - 1:]
+        action = target_qpos[first_idx - 1:]
+
+        # Fill the state/action into the unified vector
+        def fill_in_state(values):
+            # Target indices corresponding to your state space
+            # In this example: 6 joints + 1 gripper for each arm
+            UNI_STATE_INDICES = (
+                [STATE_VEC_IDX_MAPPING[f"left_arm_joint_{i}_pos"]
+                 for i in range(left_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["left_gripper_open"]] +
+                [STATE_VEC_IDX_MAPPING[f"right_arm_joint_{i}_pos"]
+                 for i in range(right_arm_dim[0])] + [STATE_VEC_IDX_MAPPING["right_gripper_open"]])
+            uni_vec = np.zeros(values.shape[:-1] + (self.STATE_DIM, ))
+            uni_vec[..., UNI_STATE_INDICES] = values
+            return uni_vec
+
+        state = fill_in_state(state)
+        action = fill_in_state(action)
+
+        # Return the resulting sample
+        return True, {"state": state, "action": action}
 
 
 if __name__ == "__main__":
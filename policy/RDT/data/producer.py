@@ -14,6 +14,7 @@ import yaml
 
 from data.vla_dataset import VLADataset
 from data.filelock import FileLock
+from data.shm_buffer import ShmRingBuffer
 
 # Producer does not need GPU
 tf.config.set_visible_devices([], "GPU")
@@ -29,6 +30,33 @@ if BUF_NUM_CHUNKS < 1:
 BUF_CHUNK_SIZE = config["dataset"]["buf_chunk_size"]
 if BUF_CHUNK_SIZE < 1:
     raise ValueError("Config `buf_chunk_size` must be at least 1.")
+BUF_TRANSPORT = config["dataset"].get("buf_transport", "disk")
+if BUF_TRANSPORT not in ["disk", "shm"]:
+    raise ValueError("Config `buf_transport` must be `disk` or `shm`.")
+SHM_PATH = config["dataset"].get("shm_path", "/dev/shm/rdt_buffer")
+SHM_NUM_SLOTS = config["dataset"].get("shm_num_slots", 2048)
+SHM_SLOT_BYTES = config["dataset"].get("shm_slot_bytes", 8 * 2**20)
+
+# Order of the tensors of a sample, as consumed by `train/dataset.py`
+SAMPLE_KEYS = [
+    "step_id",
+    "state_chunk",
+    "state_chunk_time_mask",
+    "action_chunk",
+    "action_chunk_time_mask",
+    "state_vec_mask",
+    "past_frames_0",
+    "past_frames_0_time_mask",
+    "past_frames_1",
+    "past_frames_1_time_mask",
+    "past_frames_2",
+    "past_frames_2_time_mask",
+    "past_frames_3",
+    "past_frames_3_time_mask",
+    "state_std",
+    "state_mean",
+    "state_norm",
+]
 
 
 def get_dirty_item(chunk_dir):
@@ -154,6 +182,48 @@ def save_sample(step_dict, chunk_dir, chunk_item_idx):
     print("Failed to save sample.")
 
 
+def run_shm_producer(seed, num_workers, worker_id, fill_up, clean_dirty, dataset_type):
+    """
+    Run the producer on the shared-memory buffer (see `data/shm_buffer.py`).
+    Each worker owns a contiguous range of slots and rewrites the slots
+    that have been read by the consumer (or never been written).
+    """
+    vla_dataset = VLADataset(seed=seed, dataset_type=dataset_type)
+    buffer = ShmRingBuffer(SHM_PATH)
+    slot_start = worker_id * buffer.num_slots // num_workers
+    slot_end = (worker_id + 1) * buffer.num_slots // num_workers
+    if fill_up:
+        print(f"Worker {worker_id}: Start filling up the buffer...")
+    elif clean_dirty:
+        # Only refresh the consumed flags
+        buffer.consumed[slot_start:slot_end] = 0
+        print(f"Worker {worker_id}: Refreshed the consumed flags.")
+
+    fill_slot = slot_start if fill_up else slot_end
+    free_slots = []
+    time_stmp = time.time()
+    for episode_steps in vla_dataset:
+        for step in episode_steps:
+            if fill_slot < slot_end:
+                slot = fill_slot
+                fill_slot += 1
+                if fill_slot == slot_end:
+                    print(f"Worker {worker_id}: Buffer filled up. Start replacing consumed samples...")
+            else:
+                while len(free_slots) == 0:
+                    free_slots = buffer.free_slots(slot_start, slot_end).tolist()
+                    if time.time() - time_stmp > 2.0:
+                        dirty_ratio = len(free_slots) / (slot_end - slot_start)
+                        print(f"Worker {worker_id}: Dirty Ratio: {dirty_ratio:.2f}")
+                        time_stmp = time.time()
+                    if len(free_slots) == 0:
+                        time.sleep(0.01)
+                slot = free_slots.pop()
+
+            sample = (step["json_content"], tuple(step[key].numpy() for key in SAMPLE_KEYS))
+            buffer.write(slot, sample)
+
+
 def run_producer(seed, num_workers, worker_id, fill_up, clean_dirty, dataset_type):
     """
     Run the producer.
@@ -294,9 +364,14 @@ if __name__ == "__main__":
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
+    if BUF_TRANSPORT == "shm":
+        # Created once before the workers start, kept (with its samples) when the layout is unchanged
+        buffer = ShmRingBuffer.open_or_create(SHM_PATH, SHM_NUM_SLOTS, SHM_SLOT_BYTES, recreate=args.fill_up)
+        print(f"Shared-memory buffer {SHM_PATH}: {buffer.num_slots} slots of {buffer.slot_bytes} bytes")
+        del buffer
     for worker_id in range(args.n_workers):
         p = Process(
-            target=run_producer,
+            target=run_shm_producer if BUF_TRANSPORT == "shm" else run_producer,
             args=(
                 process_seeds[worker_id],
                 args.n_workers,
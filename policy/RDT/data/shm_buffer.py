@@ -0,0 +1,115 @@
+"""
+Shared-memory ring buffer between the producer workers and the training dataloader,
+an alternative to the `chunk_*` directories on disk (`buf_transport: shm` in configs/base.yaml).
+
+The buffer is a single file under /dev/shm that every process maps:
+
+    header    magic, version, num_slots, slot_bytes
+    seq       uint64[num_slots]   sequence number of the slot, odd while the slot is being written
+    length    uint64[num_slots]   size of the serialized sample in the slot
+    consumed  uint64[num_slots]   `seq` of the last sample read from the slot
+    data      num_slots * slot_bytes
+
+Every slot has exactly one writer (producer worker `w` owns a contiguous range of slots), so no lock is
+needed: the writer makes `seq` odd, writes the sample and makes `seq` even again (a seqlock), and a reader
+keeps its copy only if `seq` was the same even number before and after copying. A sample is consumed when
+`consumed == seq`: a reader that is late (the slot was rewritten meanwhile) stores an outdated `seq` and
+cannot mark the new sample as consumed.
+"""
+
+import os
+import pickle
+
+import numpy as np
+
+SHM_MAGIC = 0x52445442  # "RDTB"
+SHM_VERSION = 2
+HEADER_BYTES = 64
+PAGE_BYTES = 4096
+
+
+class ShmRingBuffer:
+
+    def __init__(self, path):
+        """Open an existing buffer, see `create`."""
+        self.path = path
+        self.mm = np.memmap(path, dtype=np.uint8, mode="r+")
+        header = self.mm[:HEADER_BYTES].view(np.uint64)
+        if header[0] != SHM_MAGIC or header[1] != SHM_VERSION:
+            raise ValueError(f"{path} is not a shared-memory sample buffer (version {SHM_VERSION}).")
+        self.num_slots = int(header[2])
+        self.slot_bytes = int(header[3])
+
+        offset = HEADER_BYTES
+        self.seq = self.mm[offset:offset + 8 * self.num_slots].view(np.uint64)
+        offset += 8 * self.num_slots
+        self.length = self.mm[offset:offset + 8 * self.num_slots].view(np.uint64)
+        offset += 8 * self.num_slots
+        self.consumed = self.mm[offset:offset + 8 * self.num_slots].view(np.uint64)
+        self.data_offset = self.get_data_offset(self.num_slots)
+
+    @staticmethod
+    def get_data_offset(num_slots):
+        offset = HEADER_BYTES + 24 * num_slots
+        return (offset + PAGE_BYTES - 1) // PAGE_BYTES * PAGE_BYTES
+
+    @classmethod
+    def create(cls, path, num_slots, slot_bytes):
+        """Create an empty buffer at `path` (replacing an existing one) and open it."""
+        total_bytes = cls.get_data_offset(num_slots) + num_slots * slot_bytes
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.truncate(total_bytes)  # sparse, pages are only allocated once they are written
+        header = np.memmap(tmp_path, dtype=np.uint64, mode="r+", shape=(4, ))
+        header[:] = [SHM_MAGIC, SHM_VERSION, num_slots, slot_bytes]
+        header.flush()
+        del header
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    @classmethod
+    def open_or_create(cls, path, num_slots, slot_bytes, recreate=False):
+        """Reuse the buffer at `path` if its layout matches, otherwise (or if `recreate`) create a new one."""
+        if not recreate and os.path.exists(path):
+            try:
+                buffer = cls(path)
+                if buffer.num_slots == num_slots and buffer.slot_bytes == slot_bytes:
+                    return buffer
+            except ValueError:
+                pass
+        return cls.create(path, num_slots, slot_bytes)
+
+    def slot_data(self, slot):
+        start = self.data_offset + slot * self.slot_bytes
+        return self.mm[start:start + self.slot_bytes]
+
+    def write(self, slot, sample):
+        """Serialize `sample` into `slot`, only the worker owning the slot may call this."""
+        payload = pickle.dumps(sample, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.slot_bytes:
+            raise ValueError(f"Sample of {len(payload)} bytes does not fit a slot of {self.slot_bytes} bytes, "
+                             "increase `shm_slot_bytes`.")
+        self.seq[slot] += 1  # odd: readers skip the slot
+        self.slot_data(slot)[:len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        self.length[slot] = len(payload)
+        self.seq[slot] += 1
+
+    def read(self, slot):
+        """The sample in `slot` and mark it consumed, None if the slot is empty or was rewritten meanwhile."""
+        seq = int(self.seq[slot])
+        if seq == 0 or seq % 2 == 1:
+            return None
+        payload = self.slot_data(slot)[:int(self.length[slot])].tobytes()
+        if int(self.seq[slot]) != seq:
+            return None
+        self.consumed[slot] = seq  # refers to the sample read, not to whatever the slot holds by now
+        return pickle.loads(payload)
+
+    def readable_slots(self):
+        """Slots holding a sample that has not been consumed yet."""
+        return np.flatnonzero((self.seq > 0) & (self.seq % 2 == 0) & (self.consumed != self.seq))
+
+    def free_slots(self, start, end):
+        """Slots in [start, end) that the producer may (re)write: consumed or never written."""
+        seq = self.seq[start:end]
+        return np.flatnonzero((self.consumed[start:end] == seq) | (seq == 0)) + start
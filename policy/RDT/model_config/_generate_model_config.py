@@ -24,6 +24,8 @@ if __name__ == "__main__":
         "checkpoints_total_limit": 40,
         "learning_rate": 1e-4,
         "dataloader_num_workers": 8,
+        "hdf5_max_open_files": 32,  # per dataloader worker
+        "hdf5_frame_cache_mb": 256,  # decoded image cache per dataloader worker, 0 to disable
         "state_noise_snr": 40,
         "gradient_accumulation_steps": 1,
     }
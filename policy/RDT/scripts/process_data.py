@@ -140,6 +140,11 @@ if __name__ == "__main__":
     parser.add_argument("task_name", type=str)
     parser.add_argument("task_config", type=str)
     parser.add_argument("expert_data_num", type=int)
+    parser.add_argument(
+        "--lang_only",
+        action="store_true",
+        help="Only encode the instructions, the episodes were converted by script/convert_data.py",
+    )
     args = parser.parse_args()
 
     task_name = args.task_name
@@ -148,12 +153,13 @@ if __name__ == "__main__":
 
     load_dir = os.path.join("../../data", str(task_name), str(task_config), "data")
 
-    print(f"read data from path: {load_dir}")
-    begin = data_transform(
-        load_dir,
-        expert_data_num,
-        f"./processed_data/{task_name}-{task_config}-{expert_data_num}",
-    )
+    if not args.lang_only:
+        print(f"read data from path: {load_dir}")
+        begin = data_transform(
+            load_dir,
+            expert_data_num,
+            f"./processed_data/{task_name}-{task_config}-{expert_data_num}",
+        )
     tokenizer, text_encoder = None, None
     for idx in range(expert_data_num):
         print(f"Processing Language: {idx}", end="\r")
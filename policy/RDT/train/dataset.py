@@ -15,6 +15,7 @@ import transformers
 
 from data.filelock import FileLock
 from data.hdf5_vla_dataset import HDF5VLADataset
+from data.shm_buffer import ShmRingBuffer
 from train.image_corrupt import image_corrupt
 
 
@@ -76,7 +77,7 @@ def read_dirty_bit(chunk_dir):
 
 class VLAConsumerDataset(Dataset):
     """A vision-languange-action Dataset for supervised training.
-    This dataset will load data from the buffer directory.
+    This dataset will load data from the buffer directory or the shared-memory buffer.
     """
 
     def __init__(
@@ -116,6 +117,11 @@ class VLAConsumerDataset(Dataset):
         self.buffer_dir = config["buf_path"]
         self.num_chunks = config["buf_num_chunks"]
         self.chunk_size = config["buf_chunk_size"]
+        self.buf_transport = config.get("buf_transport", "disk")
+        self.shm_path = config.get("shm_path", "/dev/shm/rdt_buffer")
+        self.shm_num_slots = config.get("shm_num_slots", 2048)
+        # Opened lazily in each dataloader worker
+        self.shm_buffer = None
         self.tokenizer_max_length = config["tokenizer_max_length"]
         self.image_aspect_ratio = config["image_aspect_ratio"]
         self.state_noise_snr = state_noise_snr
@@ -191,9 +197,25 @@ class VLAConsumerDataset(Dataset):
     def __len__(self) -> int:
         if self.use_hdf5:
             return len(self.hdf5_dataset)
+        elif self.buf_transport == "shm":
+            return self.shm_num_slots
         else:
             return self.num_chunks * self.chunk_size
 
+    def _safe_load_shm(self, index):
+        if self.shm_buffer is None:
+            self.shm_buffer = ShmRingBuffer(self.shm_path)
+        while True:
+            readable_slots = self.shm_buffer.readable_slots()
+            if len(readable_slots) == 0:
+                # Wait for the producer to write new samples
+                time.sleep(0.01)
+                continue
+            sample = self.shm_buffer.read(readable_slots[index % len(readable_slots)])
+            if sample is not None:  # None: the slot was being rewritten, pick another one
+                content, meta = sample
+                return (content, *meta)
+
     def _safe_load(self, index):
         read_chunk_item_indices = []
         # Start searching from a random chunk
@@ -273,7 +295,7 @@ class VLAConsumerDataset(Dataset):
                         state_std,
                         state_mean,
                         state_norm,
-                    ) = self._safe_load(index)
+                    ) = (self._safe_load_shm(index) if self.buf_transport == "shm" else self._safe_load(index))
 
                 data_dict = {}
                 data_dict["dataset_name"] = content["dataset_name"]
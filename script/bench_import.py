@@ -0,0 +1,59 @@
+"""
+Benchmark process startup: wall time of `import envs` in a fresh interpreter,
+and of the first cluttered-objects catalogue lookup (cold = index rebuilt, warm = index reused).
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+sys.path.append("./")
+
+IMPORT_CODE = "import time; t = time.perf_counter(); import envs; print(time.perf_counter() - t)"
+CATALOGUE_CODE = ("import time, envs; t = time.perf_counter(); "
+                  "from envs.utils.rand_create_cluttered_actor import get_cluttered_objects; "
+                  "get_cluttered_objects(); print(time.perf_counter() - t)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip_catalogue", action="store_true", help="only time `import envs`")
+    parser.add_argument("--output", type=str, default=None, help="write results as json")
+    return parser.parse_args()
+
+
+def time_in_subprocess(code):
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(res.stdout.strip().splitlines()[-1])
+
+
+def summarize(name, times):
+    res = {"name": name, "runs": len(times), "median_s": statistics.median(times), "min_s": min(times)}
+    print(f"\033[94m{name:>18}\033[0m: median {res['median_s'] * 1000:8.1f} ms, min {res['min_s'] * 1000:8.1f} ms")
+    return res
+
+
+def main():
+    args = parse_args()
+    results = [summarize("import envs", [time_in_subprocess(IMPORT_CODE) for _ in range(args.repeat)])]
+
+    if not args.skip_catalogue:
+        import os
+        from envs.utils.rand_create_cluttered_actor import CLUTTERED_INDEX_FILE
+
+        if os.path.exists(CLUTTERED_INDEX_FILE):
+            os.remove(CLUTTERED_INDEX_FILE)
+        results.append(summarize("catalogue (cold)", [time_in_subprocess(CATALOGUE_CODE)]))
+        results.append(
+            summarize("catalogue (warm)", [time_in_subprocess(CATALOGUE_CODE) for _ in range(args.repeat)]))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark rendering throughput (frames / sec) of every render profile.
+
+To measure on a CPU renderer, point Vulkan at a software ICD (e.g. lavapipe):
+    python script/bench_render.py --icd /usr/share/vulkan/icd.d/lvp_icd.x86_64.json
+"""
+
+import sys
+import os
+import time
+import json
+import argparse
+
+sys.path.append("./")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="+", default=None, help="render profiles to benchmark, default all")
+    parser.add_argument("--camera_type", type=str, default="D435", help="camera type in _camera_config.yml")
+    parser.add_argument("--num_cameras", type=int, default=3, help="head + 2 wrist cameras by default")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--icd", type=str, default=None, help="Vulkan ICD json, e.g. lavapipe for CPU rendering")
+    parser.add_argument("--output", type=str, default=None, help="write results as json")
+    return parser.parse_args()
+
+
+def build_scene(render_profile, camera_config, num_cameras):
+    import numpy as np
+    import sapien.core as sapien
+    from sapien.render import set_global_config
+    from envs._GLOBAL_CONFIGS import RENDER_PROFILES
+
+    profile = RENDER_PROFILES[render_profile]
+    set_global_config(max_num_materials=50000, max_num_textures=50000)
+    engine = sapien.Engine()
+    renderer = None
+    if profile is not None:
+        renderer = sapien.SapienRenderer()
+        engine.set_renderer(renderer)
+        sapien.render.set_camera_shader_dir(profile["shader_dir"])
+        if profile["shader_dir"] == "rt":
+            sapien.render.set_ray_tracing_samples_per_pixel(profile["samples_per_pixel"])
+            sapien.render.set_ray_tracing_path_depth(profile["path_depth"])
+            sapien.render.set_ray_tracing_denoiser(profile["denoiser"])
+
+    scene = engine.create_scene(sapien.SceneConfig())
+    scene.set_timestep(1 / 250)
+    scene.add_ground(0)
+    scene.set_ambient_light([0.5, 0.5, 0.5])
+    scene.add_directional_light([0, 0.5, -1], [0.5, 0.5, 0.5], shadow=True)
+    scene.add_point_light([1, 0, 1.8], [1, 1, 1], shadow=True)
+    scene.add_point_light([-1, 0, 1.8], [1, 1, 1], shadow=True)
+
+    # a table-top like scene: one static slab and a few dynamic boxes
+    builder = scene.create_actor_builder()
+    builder.add_box_collision(half_size=[0.6, 0.35, 0.025])
+    builder.add_box_visual(half_size=[0.6, 0.35, 0.025], material=[0.8, 0.8, 0.8])
+    table = builder.build_static(name="table")
+    table.set_pose(sapien.Pose([0, 0, 0.715]))
+    for i in range(8):
+        builder = scene.create_actor_builder()
+        builder.add_box_collision(half_size=[0.025] * 3)
+        builder.add_box_visual(half_size=[0.025] * 3, material=[i / 8, 0.2, 1 - i / 8])
+        box = builder.build(name=f"box_{i}")
+        box.set_pose(sapien.Pose([-0.35 + 0.1 * i, 0, 0.8]))
+
+    cameras = []
+    if profile is not None:
+        for i in range(num_cameras):
+            camera = scene.add_camera(
+                name=f"camera_{i}",
+                width=camera_config["w"],
+                height=camera_config["h"],
+                fovy=np.deg2rad(camera_config["fovy"]),
+                near=0.1,
+                far=100,
+            )
+            camera.entity.set_pose(sapien.Pose([-0.3 + 0.3 * i, -0.6, 1.3], [0.8, 0, 0.3, 0.5]))
+            cameras.append(camera)
+    return scene, cameras
+
+
+def bench_profile(render_profile, camera_config, num_cameras, frames, warmup):
+    scene, cameras = build_scene(render_profile, camera_config, num_cameras)
+
+    def step():
+        scene.step()
+        if len(cameras) == 0:
+            return
+        scene.update_render()
+        for camera in cameras:
+            camera.take_picture()
+            camera.get_picture("Color")
+
+    for _ in range(warmup):
+        step()
+    start_time = time.perf_counter()
+    for _ in range(frames):
+        step()
+    elapsed = time.perf_counter() - start_time
+    return {
+        "profile": render_profile,
+        "frames": frames,
+        "cameras": len(cameras),
+        "seconds": elapsed,
+        "fps": frames / elapsed,
+    }
+
+
+def main():
+    args = parse_args()
+    if args.icd is not None:
+        os.environ["VK_ICD_FILENAMES"] = args.icd  # must be set before sapien is imported
+
+    from envs._GLOBAL_CONFIGS import RENDER_PROFILES
+    from envs.utils.get_camera_config import get_camera_config
+
+    profiles = args.profiles if args.profiles is not None else list(RENDER_PROFILES.keys())
+    camera_config = get_camera_config(args.camera_type)
+
+    results = []
+    for render_profile in profiles:
+        if render_profile not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile {render_profile}")
+        res = bench_profile(render_profile, camera_config, args.num_cameras, args.frames, args.warmup)
+        results.append(res)
+        print(f"\033[94m{render_profile:>12}\033[0m: {res['fps']:8.2f} frames/sec "
+              f"({res['cameras']} x {camera_config['w']}x{camera_config['h']})")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Build the consolidated asset index for `assets/objects`.
+Entries of models changed after the build are ignored (file-system lookups) until it is re-run.
+"""
+
+import sys
+import time
+
+sys.path.append("./")
+
+from envs.utils.asset_cache import build_asset_index, ASSET_INDEX_FILE
+
+
+def main():
+    start_time = time.time()
+    models = build_asset_index()
+    num_records = sum(len(model["variants"]) for model in models.values())
+    print(f"\033[92mIndexed {len(models)} models ({num_records} variants) into {ASSET_INDEX_FILE} "
+          f"in {time.time() - start_time:.1f}s\033[0m")
+
+
+if __name__ == "__main__":
+    main()
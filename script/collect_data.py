@@ -9,7 +9,6 @@ import pdb
 from envs import *
 import yaml
 import importlib
-import json
 import traceback
 import os
 import time
@@ -95,6 +94,7 @@ def main(task_name=None, task_config=None):
     print("\033[94mWrist Camera Config:\033[0m " + str(args["camera"]["wrist_camera_type"]) + f", " +
           str(args["camera"]["collect_wrist_camera"]))
     print("\033[94mEmbodiment Config:\033[0m " + embodiment_name)
+    print("\033[94mRender Profile:\033[0m " + str(args.get("render_profile", DEFAULT_RENDER_PROFILE)))
     print("\n==================================")
 
     args["embodiment_name"] = embodiment_name
@@ -103,40 +103,75 @@ def main(task_name=None, task_config=None):
     run(task, args)
 
 
+def get_episode_files(episode_idx):
+    """Files of an episode, relative to the save path."""
+    return {
+        "hdf5": os.path.join("data", f"episode{episode_idx}.hdf5"),
+        "video": os.path.join("video", f"episode{episode_idx}.mp4"),
+        "traj": os.path.join("_traj_data", f"episode{episode_idx}.pkl"),
+    }
+
+
 def run(TASK_ENV, args):
-    epid, suc_num, fail_num, seed_list = 0, 0, 0, []
+    num_tries, fail_num = 0, 0
+    render_profile = args.get("render_profile", DEFAULT_RENDER_PROFILE)
+    # record observations while planning and keep them only for successful seeds
+    single_pass = args.get("single_pass", False) and args["collect_data"]
 
     print(f"Task Name: \033[34m{args['task_name']}\033[0m")
 
     # =========== Collect Seed ===========
     os.makedirs(args["save_path"], exist_ok=True)
+    # append-only record of seeds and episodes, seed.txt / scene_info.json are exported from it
+    manifest = EpisodeManifest(args["save_path"])
+    if args.get("profile", False):
+        profiler.enable(os.path.join(args["save_path"], "profile"))
 
     if not args["use_seed"]:
         print("\033[93m" + "[Start Seed and Pre Motion Data Collection]" + "\033[0m")
         args["need_plan"] = True
-
-        if os.path.exists(os.path.join(args["save_path"], "seed.txt")):
-            with open(os.path.join(args["save_path"], "seed.txt"), "r") as file:
-                seed_list = file.read().split()
-                if len(seed_list) != 0:
-                    seed_list = [int(i) for i in seed_list]
-                    suc_num = len(seed_list)
-                    epid = max(seed_list) + 1
-            print(f"Exist seed file, Start from: {epid} / {suc_num}")
-
-        while suc_num < args["episode_num"]:
+        if single_pass:
+            args["save_data"] = True
+            args["render_profile"] = render_profile
+        else:
+            # no images are saved while searching seeds: run headless (physics only) unless the viewer is on
+            args["render_profile"] = "raster" if args["render_freq"] else args.get("plan_render_profile", "none")
+            # record per-frame poses so that the collection pass can render them without physics
+            args["record_state"] = args.get("use_state_replay", False)
+
+        if len(manifest.records) > 0:
+            print(f"Exist seed manifest, Start from: {manifest.next_seed()} / {len(manifest.seed_list())}")
+
+        # episode indices and seeds are claimed in the manifest, so parallel workers can share the save path
+        suc_num = manifest.claim_episode(args["episode_num"], phase="plan")
+        while suc_num is not None:
+            epid = manifest.claim_seed()
+            num_tries += 1
+            profiler.start_episode(f"seed{epid}")
+            start_time = time.perf_counter()
+            recorded, reason = False, None
             try:
-                TASK_ENV.setup_demo(now_ep_num=suc_num, seed=epid, **args)
-                TASK_ENV.play_once()
+                with profile_span("setup_demo"):
+                    TASK_ENV.setup_demo(now_ep_num=suc_num, seed=epid, **args)
+                with profile_span("play_once"):
+                    info = TASK_ENV.play_once()
 
                 if TASK_ENV.plan_success and TASK_ENV.check_success():
                     print(f"simulate data episode {suc_num} success! (seed = {epid})")
-                    seed_list.append(epid)
+                    if single_pass:  # commit the recorded frames
+                        TASK_ENV.merge_pkl_to_hdf5_video()
+                        TASK_ENV.remove_data_cache()
                     TASK_ENV.save_traj_data(suc_num)
-                    suc_num += 1
+                    manifest.add_attempt(epid, "success", episode=suc_num, time_s=time.perf_counter() - start_time)
+                    if single_pass:
+                        manifest.add_collected(suc_num, epid, info, get_episode_files(suc_num))
+                    recorded = True
                 else:
                     print(f"simulate data episode {suc_num} fail! (seed = {epid})")
+                    reason = "plan failed" if not TASK_ENV.plan_success else "check_success failed"
                     fail_num += 1
+                    if single_pass:  # discard the recorded frames
+                        TASK_ENV.remove_data_cache()
 
                 TASK_ENV.close_env()
 
@@ -147,7 +182,10 @@ def run(TASK_ENV, args):
                 print(f"simulate data episode {suc_num} fail! (seed = {epid})")
                 print("Error: ", e)
                 print(" -------------")
+                reason = f"UnStableError: {e}"
                 fail_num += 1
+                if single_pass and getattr(TASK_ENV, "frame_buffer", None) is not None:
+                    TASK_ENV.remove_data_cache()
                 TASK_ENV.close_env()
 
                 if args["render_freq"]:
@@ -159,25 +197,26 @@ def run(TASK_ENV, args):
                 print(f"simulate data episode {suc_num} fail! (seed = {epid})")
                 print("Error: ", e)
                 print(" -------------")
+                reason = f"{type(e).__name__}: {e}"
                 fail_num += 1
+                if single_pass and getattr(TASK_ENV, "frame_buffer", None) is not None:
+                    TASK_ENV.remove_data_cache()
                 TASK_ENV.close_env()
 
                 if args["render_freq"]:
                     TASK_ENV.viewer.close()
                 time.sleep(1)
 
-            epid += 1
+            if not recorded:
+                manifest.add_attempt(epid, "fail", reason=reason, time_s=time.perf_counter() - start_time)
+            profiler.end_episode({"phase": "seed", "seed": epid})
+            if recorded:
+                suc_num = manifest.claim_episode(args["episode_num"], phase="plan")
 
-            with open(os.path.join(args["save_path"], "seed.txt"), "w") as file:
-                for sed in seed_list:
-                    file.write("%s " % sed)
-
-        print(f"\nComplete simulation, failed \033[91m{fail_num}\033[0m times / {epid} tries \n")
+        manifest.export_legacy()
+        print(f"\nComplete simulation, failed \033[91m{fail_num}\033[0m times / {num_tries} tries \n")
     else:
         print("\033[93m" + "Use Saved Seeds List".center(30, "-") + "\033[0m")
-        with open(os.path.join(args["save_path"], "seed.txt"), "r") as file:
-            seed_list = file.read().split()
-            seed_list = [int(i) for i in seed_list]
 
     # =========== Collect Data ===========
 
@@ -187,47 +226,51 @@ def run(TASK_ENV, args):
         args["need_plan"] = False
         args["render_freq"] = 0
         args["save_data"] = True
+        args["render_profile"] = render_profile
+        args["record_state"] = False
+        args["single_pass"] = False
 
         clear_cache_freq = args["clear_cache_freq"]
 
-        st_idx = 0
-
-        def exist_hdf5(idx):
-            file_path = os.path.join(args["save_path"], 'data', f'episode{idx}.hdf5')
-            return os.path.exists(file_path)
-
-        while exist_hdf5(st_idx):
-            st_idx += 1
-
-        for episode_idx in range(st_idx, args["episode_num"]):
+        # planned but not yet collected episodes, claimed one at a time (single-pass episodes are already collected)
+        episode_idx = manifest.claim_episode(args["episode_num"], phase="collect")
+        while episode_idx is not None:
+            seed = manifest.episodes()[episode_idx]["seed"]
             print(f"\033[34mTask name: {args['task_name']}\033[0m")
 
-            TASK_ENV.setup_demo(now_ep_num=episode_idx, seed=seed_list[episode_idx], **args)
+            traj_data = load_pkl_file(os.path.join(args["save_path"], "_traj_data", f"episode{episode_idx}.pkl"))
+            # fall back to physics replay for trajectories recorded without states
+            state_replay = args.get("use_state_replay", False) and "sim_state" in traj_data
+
+            profiler.start_episode(f"episode{episode_idx}")
+            with profile_span("setup_demo"):
+                TASK_ENV.setup_demo(now_ep_num=episode_idx, seed=seed, state_replay=state_replay,
+                                    **args)
 
-            traj_data = TASK_ENV.load_tran_data(episode_idx)
             args["left_joint_path"] = traj_data["left_joint_path"]
             args["right_joint_path"] = traj_data["right_joint_path"]
+            args["stage_attempts"] = traj_data.get("stage_attempts", [])
             TASK_ENV.set_path_lst(args)
 
-            info_file_path = os.path.join(args["save_path"], "scene_info.json")
-
-            if not os.path.exists(info_file_path):
-                with open(info_file_path, "w", encoding="utf-8") as file:
-                    json.dump({}, file, ensure_ascii=False)
-
-            with open(info_file_path, "r", encoding="utf-8") as file:
-                info_db = json.load(file)
-
-            info = TASK_ENV.play_once()
-            info_db[f"episode_{episode_idx}"] = info
-
-            with open(info_file_path, "w", encoding="utf-8") as file:
-                json.dump(info_db, file, ensure_ascii=False, indent=4)
+            start_time = time.perf_counter()
+            if state_replay:
+                with profile_span("replay_state"):
+                    info = TASK_ENV.replay_state(traj_data["sim_state"])
+            else:
+                with profile_span("play_once"):
+                    info = TASK_ENV.play_once()
 
             TASK_ENV.close_env(clear_cache=((episode_idx + 1) % clear_cache_freq == 0))
             TASK_ENV.merge_pkl_to_hdf5_video()
             TASK_ENV.remove_data_cache()
-            assert TASK_ENV.check_success(), "Collect Error"
+            # success was checked in the planning pass, a kinematic replay has no contacts to check
+            assert state_replay or TASK_ENV.check_success(), "Collect Error"
+            manifest.add_collected(episode_idx, seed, info, get_episode_files(episode_idx),
+                                   time_s=time.perf_counter() - start_time, state_replay=state_replay)
+            profiler.end_episode({"phase": "collect", "seed": seed})
+            episode_idx = manifest.claim_episode(args["episode_num"], phase="collect")
+
+        manifest.export_legacy()  # scene_info.json is read by the instruction generation
 
         command = f"cd description && bash gen_episode_instructions.sh {args['task_name']} {args['task_config']} {args['language_num']}"
         os.system(command)
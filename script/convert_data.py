@@ -0,0 +1,423 @@
+"""
+Convert collected episodes for several policies in one decoding pass:
+
+    python script/convert_data.py beat_block_hammer demo_clean 50 --writers dp act rdt pi0
+    python script/convert_data.py beat_block_hammer demo_clean 50 --writers lerobot --repo_id robotwin/beat_block_hammer
+
+Every episode `data/<task>/<config>/data/episode{i}.hdf5` is decoded once by a worker of a process pool.
+The decoded (and, where several writers share a format, resized / re-encoded) frames are handed to every
+selected writer. Each writer has two halves:
+
+    write_episode(idx, episode)  in the worker, per-episode output files, returns a payload
+    append(idx, payload)         in the main process, in episode order, for single-file outputs (zarr, ...)
+
+The outputs match the per-policy `process_data.py` scripts, including their quirks (the ACT script repeats
+`qpos[-1]` as the last action, the other scripts use the last state). RDT language embeddings still need a GPU pass:
+`cd policy/RDT && python scripts/process_data.py <task> <config> <num> --lang_only`.
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import importlib.util
+import multiprocessing as mp
+from collections import deque
+
+import cv2
+import h5py
+import numpy as np
+
+sys.path.append("./")
+
+# RoboTwin camera -> camera name of the ALOHA-style policy formats
+CAMERA_NAMES = {
+    "head_camera": "cam_high",
+    "right_camera": "cam_right_wrist",
+    "left_camera": "cam_left_wrist",
+}
+ALOHA_IMAGE_SIZE = (640, 480)
+
+WRITERS = {}
+
+
+def register_writer(name):
+
+    def decorator(cls):
+        cls.name = name
+        WRITERS[name] = cls
+        return cls
+
+    return decorator
+
+
+def load_module(name, path):
+    """Import a policy module by path, policies reuse module names such as `utils`."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_load_dir(args):
+    return os.path.join("./data", args.task_name, args.task_config)
+
+
+# =========================================================== Episode ===========================================================
+
+
+class RawEpisode:
+    """One collected episode, every camera decoded once. Resized frames and JPEG encodings are cached."""
+
+    def __init__(self, load_dir, idx, cameras):
+        self.idx = idx
+        self.load_dir = load_dir
+        path = os.path.join(load_dir, "data", f"episode{idx}.hdf5")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Dataset does not exist at {path}")
+        with h5py.File(path, "r") as root:
+            left_gripper = root["/joint_action/left_gripper"][()]
+            left_arm = root["/joint_action/left_arm"][()]
+            right_gripper = root["/joint_action/right_gripper"][()]
+            right_arm = root["/joint_action/right_arm"][()]
+            self.vector = root["/joint_action/vector"][()]
+            # the last frame has no following action
+            image_bits = {cam: root[f"/observation/{cam}/rgb"][:-1] for cam in cameras}
+
+        self.state = np.concatenate(
+            [left_arm, left_gripper[:, None], right_arm, right_gripper[:, None]], axis=1).astype(np.float32)
+        self.left_arm_dim = np.full(len(self.state) - 1, left_arm.shape[1])
+        self.right_arm_dim = np.full(len(self.state) - 1, right_arm.shape[1])
+        self.frames = {
+            cam: np.stack([cv2.imdecode(np.frombuffer(bits, np.uint8), cv2.IMREAD_COLOR) for bits in image_bits[cam]])
+            for cam in cameras
+        }
+        self._resized = {}
+        self._jpegs = {}
+
+    @property
+    def qpos(self):
+        return self.state[:-1]
+
+    @property
+    def action(self):
+        return self.state[1:]
+
+    @property
+    def act_action(self):
+        """Actions of `policy/ACT/process_data.py`, which does not update its state on the last frame:
+        the last action repeats `qpos[-1]` instead of being the last state."""
+        return np.concatenate([self.state[1:-1], self.state[-2:-1]])
+
+    def get_frames(self, cam, size=None):
+        """BGR frames (T, H, W, 3) of `cam`, resized to `size` = (width, height) if given."""
+        if size is None:
+            return self.frames[cam]
+        if (cam, size) not in self._resized:
+            self._resized[(cam, size)] = np.stack([cv2.resize(frame, size) for frame in self.frames[cam]])
+        return self._resized[(cam, size)]
+
+    def get_jpegs(self, cam, size=None):
+        if (cam, size) not in self._jpegs:
+            frames = self.get_frames(cam, size)
+            self._jpegs[(cam, size)] = [cv2.imencode(".jpg", frame)[1].tobytes() for frame in frames]
+        return self._jpegs[(cam, size)]
+
+    def get_instructions(self, desc_type="seen"):
+        with open(os.path.join(self.load_dir, "instructions", f"episode{self.idx}.json"), "r") as f:
+            return json.load(f)[desc_type]
+
+
+# =========================================================== Writers ===========================================================
+
+
+class OutputWriter:
+    """Base writer, `cameras` lists the RoboTwin cameras the writer reads."""
+
+    name = None
+    cameras = list(CAMERA_NAMES.keys())
+
+    def __init__(self, args):
+        self.task_name = args.task_name
+        self.task_config = args.task_config
+        self.num = args.expert_data_num
+        self.load_dir = get_load_dir(args)
+
+    def setup(self):
+        """Main process, before the first episode."""
+
+    def write_episode(self, idx, episode: RawEpisode):
+        """Worker process, returns the payload passed to `append`."""
+        return None
+
+    def append(self, idx, payload):
+        """Main process, episodes in order."""
+
+    def close(self):
+        """Main process, after the last episode."""
+
+
+def write_aloha_hdf5(hdf5path, episode: RawEpisode):
+    """The per-episode file of RDT / pi0: qpos, action and JPEG frames padded to a fixed length."""
+    with h5py.File(hdf5path, "w") as f:
+        f.create_dataset("action", data=episode.action)
+        obs = f.create_group("observations")
+        obs.create_dataset("qpos", data=episode.qpos)
+        obs.create_dataset("left_arm_dim", data=episode.left_arm_dim)
+        obs.create_dataset("right_arm_dim", data=episode.right_arm_dim)
+        image = obs.create_group("images")
+        for cam, cam_name in CAMERA_NAMES.items():
+            jpegs = episode.get_jpegs(cam, ALOHA_IMAGE_SIZE)
+            image.create_dataset(cam_name, data=jpegs, dtype=f"S{max(len(jpeg) for jpeg in jpegs)}")
+
+
+@register_writer("dp")
+class DPWriter(OutputWriter):
+    """
+    `policy/DP/data/<task>-<config>-<num>.zarr`, as `policy/DP/process_data.py`. The episodes' `/norm_stats`
+    are merged into the zarr `meta`, the DP dataset fits its normalizer from them.
+    """
+
+    cameras = ["head_camera"]
+
+    def setup(self):
+        sys.path.append("./policy/DP")
+        import zarr
+        from diffusion_policy.common.replay_buffer import ReplayBuffer
+
+        save_dir = f"./policy/DP/data/{self.task_name}-{self.task_config}-{self.num}.zarr"
+        if os.path.exists(save_dir):
+            shutil.rmtree(save_dir)
+        zarr_root = zarr.group(save_dir)
+        zarr_root.create_group("data")
+        zarr_meta = zarr_root.create_group("meta")
+        self.compressor = zarr.Blosc(cname="zstd", clevel=3, shuffle=1)
+        zarr_meta.zeros("episode_ends", shape=(0, ), dtype="int64", compressor=self.compressor)
+        self.replay_buffer = ReplayBuffer.create_from_group(zarr_root)
+        # envs/utils/norm_stats.py only needs numpy / h5py, load it without importing the `envs` package (sapien)
+        self.norm_stats = load_module("norm_stats", "./envs/utils/norm_stats.py")
+        self.episode_norm_stats = []
+
+    def write_episode(self, idx, episode):
+        return {
+            "head_camera": np.ascontiguousarray(np.moveaxis(episode.get_frames("head_camera"), -1, 1)),
+            "state": episode.vector[:-1].astype(np.float32),
+            "action": episode.vector[1:].astype(np.float32),
+        }
+
+    def append(self, idx, payload):
+        self.replay_buffer.add_episode(
+            payload,
+            chunks={key: (100, *value.shape[1:]) for key, value in payload.items()},
+            compressors={key: self.compressor for key in payload.keys()},
+        )
+        self.episode_norm_stats.append(
+            self.norm_stats.load_norm_stats(os.path.join(self.load_dir, "data", f"episode{idx}.hdf5")))
+
+    def close(self):
+        merged = self.norm_stats.merge_complete_norm_stats(self.episode_norm_stats)
+        if len(merged) > 0:
+            self.replay_buffer.update_meta(self.norm_stats.to_meta_arrays(merged))
+
+
+@register_writer("act")
+class ACTWriter(OutputWriter):
+    """`policy/ACT/processed_data/sim-<task>/<config>-<num>/episodes.hdf5`, as `policy/ACT/process_data.py`."""
+
+    def setup(self):
+        act_utils = load_module("act_utils", "./policy/ACT/utils.py")
+        self.dataset_dir = f"./processed_data/sim-{self.task_name}/{self.task_config}-{self.num}"
+        save_path = os.path.join("./policy/ACT", self.dataset_dir)
+        os.makedirs(save_path, exist_ok=True)
+        self.writer = act_utils.EpisodeWriter(os.path.join(save_path, act_utils.CONSOLIDATED_FILE),
+                                              list(CAMERA_NAMES.values()))
+
+    def write_episode(self, idx, episode):
+        return {
+            "qpos": episode.qpos,
+            "action": episode.act_action,
+            "images": {cam_name: episode.get_frames(cam, ALOHA_IMAGE_SIZE)
+                       for cam, cam_name in CAMERA_NAMES.items()},
+            "left_arm_dim": episode.left_arm_dim,
+            "right_arm_dim": episode.right_arm_dim,
+        }
+
+    def append(self, idx, payload):
+        self.writer.add_episode(
+            payload["qpos"],
+            payload["action"],
+            payload["images"],
+            left_arm_dim=payload["left_arm_dim"],
+            right_arm_dim=payload["right_arm_dim"],
+        )
+
+    def close(self):
+        self.writer.close()
+        configs_path = "./policy/ACT/SIM_TASK_CONFIGS.json"
+        try:
+            with open(configs_path, "r") as f:
+                sim_task_configs = json.load(f)
+        except Exception:
+            sim_task_configs = {}
+        sim_task_configs[f"sim-{self.task_name}-{self.task_config}-{self.num}"] = {
+            "dataset_dir": self.dataset_dir,
+            "num_episodes": self.num,
+            "episode_len": 1000,
+            "camera_names": ["cam_high", "cam_right_wrist", "cam_left_wrist"],
+        }
+        with open(configs_path, "w") as f:
+            json.dump(sim_task_configs, f, indent=4)
+
+
+@register_writer("rdt")
+class RDTWriter(OutputWriter):
+    """`policy/RDT/processed_data/<task>-<config>-<num>/episode_<i>/episode_<i>.hdf5` (without language)."""
+
+    def setup(self):
+        self.save_path = f"./policy/RDT/processed_data/{self.task_name}-{self.task_config}-{self.num}"
+        os.makedirs(self.save_path, exist_ok=True)
+
+    def write_episode(self, idx, episode):
+        episode_dir = os.path.join(self.save_path, f"episode_{idx}")
+        os.makedirs(episode_dir, exist_ok=True)
+        write_aloha_hdf5(os.path.join(episode_dir, f"episode_{idx}.hdf5"), episode)
+
+
+@register_writer("pi0")
+class Pi0Writer(OutputWriter):
+    """`policy/pi0/processed_data/<task>-<config>-<num>/episode_<i>/`, as `policy/pi0/scripts/process_data.py`."""
+
+    policy_dir = "./policy/pi0"
+
+    def setup(self):
+        self.save_path = f"{self.policy_dir}/processed_data/{self.task_name}-{self.task_config}-{self.num}"
+        os.makedirs(self.save_path, exist_ok=True)
+
+    def write_episode(self, idx, episode):
+        episode_dir = os.path.join(self.save_path, f"episode_{idx}")
+        os.makedirs(episode_dir, exist_ok=True)
+        with open(os.path.join(episode_dir, "instructions.json"), "w") as f:
+            json.dump({"instructions": episode.get_instructions()}, f, indent=2)
+        write_aloha_hdf5(os.path.join(episode_dir, f"episode_{idx}.hdf5"), episode)
+
+
+@register_writer("pi05")
+class Pi05Writer(Pi0Writer):
+    policy_dir = "./policy/pi05"
+
+
+@register_writer("lerobot")
+class LeRobotWriter(OutputWriter):
+    """
+    LeRobot dataset `--repo_id` (image mode), as `convert_aloha_data_to_lerobot_robotwin.py` of pi0 builds it
+    from the pi0 files. Needs the `lerobot` package in the running environment.
+    """
+
+    def __init__(self, args):
+        super().__init__(args)
+        if args.repo_id is None:
+            raise ValueError("The lerobot writer needs --repo_id")
+        self.repo_id = args.repo_id
+
+    def setup(self):
+        converter = load_module("convert_aloha_data_to_lerobot_robotwin",
+                                "./policy/pi0/examples/aloha_real/convert_aloha_data_to_lerobot_robotwin.py")
+        self.dataset = converter.create_empty_dataset(self.repo_id, robot_type="aloha", mode="image")
+
+    def write_episode(self, idx, episode):
+        return {
+            "state": episode.qpos,
+            "action": episode.action,
+            # LeRobot stores the frames as given, the ALOHA files hold BGR as decoded by cv2
+            "images": {cam_name: episode.get_frames(cam, ALOHA_IMAGE_SIZE)
+                       for cam, cam_name in CAMERA_NAMES.items()},
+            "instruction": str(np.random.choice(episode.get_instructions())),
+        }
+
+    def append(self, idx, payload):
+        for i in range(len(payload["state"])):
+            frame = {
+                "observation.state": payload["state"][i],
+                "action": payload["action"][i],
+                "task": payload["instruction"],
+            }
+            for cam_name, frames in payload["images"].items():
+                frame[f"observation.images.{cam_name}"] = frames[i]
+            self.dataset.add_frame(frame)
+        self.dataset.save_episode()
+
+
+# =========================================================== Engine ===========================================================
+
+_worker_writers = None
+
+
+def _init_worker(writers):
+    global _worker_writers
+    cv2.setNumThreads(1)  # the pool already uses every core
+    _worker_writers = writers
+
+
+def convert_episode(load_dir, idx, writers=None):
+    """Decode episode `idx` once and run every writer on it, returns {writer name: payload}."""
+    writers = writers if writers is not None else _worker_writers
+    cameras = sorted({cam for writer in writers for cam in writer.cameras})
+    episode = RawEpisode(load_dir, idx, cameras)
+    return {writer.name: writer.write_episode(idx, episode) for writer in writers}
+
+
+def create_pool(writers, num_workers):
+    """The workers get the writers as they are now, so call it before `setup` opens any store."""
+    if num_workers <= 1:
+        return None
+    return mp.get_context("spawn").Pool(num_workers, initializer=_init_worker, initargs=(writers, ))
+
+
+def iter_converted(pool, load_dir, num, writers, num_workers):
+    """Payloads of episodes 0..num-1 in order, at most `2 * num_workers` episodes in flight."""
+    if pool is None:
+        for idx in range(num):
+            yield convert_episode(load_dir, idx, writers)
+        return
+    pending = deque()
+    for idx in range(num):
+        pending.append(pool.apply_async(convert_episode, (load_dir, idx)))
+        if len(pending) >= 2 * num_workers:
+            yield pending.popleft().get()
+    while len(pending) > 0:
+        yield pending.popleft().get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert episodes for several policies in one decoding pass.")
+    parser.add_argument("task_name", type=str, help="The name of the task (e.g., beat_block_hammer)")
+    parser.add_argument("task_config", type=str)
+    parser.add_argument("expert_data_num", type=int, help="Number of episodes to process (e.g., 50)")
+    parser.add_argument("--writers", nargs="+", required=True, choices=sorted(WRITERS.keys()))
+    parser.add_argument("--num_workers", type=int, default=min(8, os.cpu_count() or 1),
+                        help="Processes decoding episodes")
+    parser.add_argument("--repo_id", type=str, default=None, help="LeRobot repo id of the lerobot writer")
+    args = parser.parse_args()
+
+    load_dir = get_load_dir(args)
+    writers = [WRITERS[name](args) for name in args.writers]
+    pool = create_pool(writers, args.num_workers)
+    try:
+        for writer in writers:
+            writer.setup()
+        payloads = iter_converted(pool, load_dir, args.expert_data_num, writers, args.num_workers)
+        for idx, episode_payloads in enumerate(payloads):
+            print(f"processing episode: {idx + 1} / {args.expert_data_num}", end="\r")
+            for writer in writers:
+                writer.append(idx, episode_payloads[writer.name])
+        for writer in writers:
+            writer.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+    print()
+
+
+if __name__ == "__main__":
+    main()
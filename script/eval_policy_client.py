@@ -6,6 +6,7 @@ sys.path.append("./")
 sys.path.append(f"./policy")
 sys.path.append("./description/utils")
 from envs import CONFIGS_PATH
+from envs._GLOBAL_CONFIGS import DEFAULT_RENDER_PROFILE
 from envs.utils.create_actor import UnStableError
 
 import numpy as np
@@ -383,12 +384,16 @@ def eval_policy(task_name,
     clear_cache_freq = args["clear_cache_freq"]
 
     args["eval_mode"] = True
+    # the expert check only needs plan results, the policy rollout needs cameras. The rollout renders
+    # like the training data unless `eval_render_profile` is set (e.g. rt-fast, faster but a visual shift)
+    eval_render_profile = args.get("eval_render_profile") or args.get("render_profile", DEFAULT_RENDER_PROFILE)
 
     while succ_seed < test_num:
         render_freq = args["render_freq"]
         args["render_freq"] = 0
 
         if expert_check:
+            args["render_profile"] = "none"
             try:
                 TASK_ENV.setup_demo(now_ep_num=now_id, seed=now_seed, is_test=True, **args)
                 episode_info = TASK_ENV.play_once()
@@ -421,6 +426,7 @@ def eval_policy(task_name,
             continue
 
         args["render_freq"] = render_freq
+        args["render_profile"] = eval_render_profile
 
         TASK_ENV.setup_demo(now_ep_num=now_id, seed=now_seed, is_test=True, **args)
         episode_info_list = [episode_info["info"]]
@@ -4,6 +4,15 @@ import cv2
 import numpy as np
 from pathlib import Path
 import subprocess
+import importlib.util
+
+# envs/utils/parse_hdf5.py only needs h5py / cv2, load it without importing the `envs` package (sapien)
+_spec = importlib.util.spec_from_file_location(
+    "parse_hdf5",
+    Path(__file__).resolve().parent.parent / "envs" / "utils" / "parse_hdf5.py",
+)
+parse_hdf5 = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(parse_hdf5)
 
 
 def load_hdf5(dataset_path):
@@ -24,7 +33,8 @@ def load_hdf5(dataset_path):
         for cam_name in root[f"/observation/"].keys():
             image_dict[cam_name] = root[f"/observation/{cam_name}/rgb"][()]
         third_view_rgb = root["/third_view_rgb"][()]
-        pointcloud = root["/pointcloud"][()]
+        # compact point-cloud encodings are a group (xyz + rgb), see envs/utils/parse_hdf5.read_pointcloud
+        pointcloud = root["/pointcloud"][()] if isinstance(root["/pointcloud"], h5py.Dataset) else None
 
     return left_gripper, left_arm, right_gripper, right_arm, image_dict, third_view_rgb, pointcloud
 
@@ -36,10 +46,11 @@ def byte_list_to_video(input_byte_list, output_video_path, fps=30, overwrite=Tru
     """
     # Decode JPEG bytes to numpy arrays
     images = [cv2.imdecode(np.frombuffer(image_bit, np.uint8), cv2.IMREAD_COLOR) for image_bit in input_byte_list]
-    
-    # Stack images into a single numpy array
-    images_array = np.array(images)
-    
+    image_array_to_video(np.array(images), output_video_path, fps, overwrite)
+
+
+def image_array_to_video(images_array, output_video_path, fps=30, overwrite=True):
+    """Encode decoded BGR frames (N, H, W, 3) to video using ffmpeg."""
     output_file = Path(output_video_path)
     if output_file.exists():
         if not overwrite:
@@ -98,11 +109,11 @@ if __name__ == "__main__":
         if task_dir.is_dir() and (task_dir / "test1").exists():
             dataset_path = task_dir / "test1" / "data" / "episode0.hdf5"
 
-            lgripper, larm, rgripper, rarm, image_dict, third_view_rgb, pointcloud = load_hdf5(dataset_path)
-
-            byte_list_to_video(image_dict["front_camera"], str(dataset_path.parent.joinpath("front_camera.mp4")))
-            byte_list_to_video(image_dict["head_camera"], str(dataset_path.parent.joinpath("head_camera.mp4")))
-            byte_list_to_video(image_dict["left_camera"], str(dataset_path.parent.joinpath("left_camera.mp4")))
-            byte_list_to_video(image_dict["right_camera"], str(dataset_path.parent.joinpath("right_camera.mp4")))
-            byte_list_to_video(third_view_rgb, str(dataset_path.parent.joinpath("third_view_rgb.mp4")))
+            # only the rgb streams are read, decoded on a thread pool
+            with parse_hdf5.EpisodeReader(dataset_path) as reader:
+                for camera_name in ["front_camera", "head_camera", "left_camera", "right_camera"]:
+                    image_array_to_video(reader.read(f"observation/{camera_name}/rgb"),
+                                         str(dataset_path.parent.joinpath(f"{camera_name}.mp4")))
+                image_array_to_video(reader.read("third_view_rgb"),
+                                     str(dataset_path.parent.joinpath("third_view_rgb.mp4")))
 
@@ -0,0 +1,77 @@
+"""
+Merge the per-episode normalization statistics stored at collection time (`norm_stats: true`):
+
+    python script/merge_norm_stats.py data/beat_block_hammer/demo_clean data/click_bell/demo_clean -o stats.json
+
+Inputs are episode files or collection directories (`<dir>/data/episode*.hdf5`). Only the small
+`/norm_stats` groups are read, the trajectories are never loaded.
+
+`policy/DP/process_data.py` and the `dp` writer of `script/convert_data.py` merge the same groups into the zarr
+`meta`, and the DP dataset builds its normalizer from them instead of rescanning the actions.
+
+The statistics are of the raw 14-dim joint / endpose vectors. They are not openpi's `norm_stats.json`: the
+pi0 configs normalize delta joint actions over action chunks, padded to the model action dim, so pi0 keeps
+`scripts/compute_norm_stats.py`.
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+import importlib.util
+
+# envs/utils/norm_stats.py only needs numpy / h5py, load it without importing the `envs` package (sapien)
+_spec = importlib.util.spec_from_file_location(
+    "norm_stats", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "envs", "utils", "norm_stats.py"))
+norm_stats_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(norm_stats_module)
+
+load_norm_stats = norm_stats_module.load_norm_stats
+merge_complete_norm_stats = norm_stats_module.merge_complete_norm_stats
+
+
+def get_episode_files(paths) -> list[str]:
+    episode_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = glob.glob(os.path.join(path, "data", "episode*.hdf5")) or glob.glob(os.path.join(path, "*.hdf5"))
+            episode_files += sorted(files)
+        else:
+            episode_files.append(path)
+    return episode_files
+
+
+def merge_episode_norm_stats(episode_files) -> dict:
+    """Merged {name: RunningStats}, empty if any episode has no statistics (a rescan is needed then)."""
+    return merge_complete_norm_stats(load_norm_stats(episode_file) for episode_file in episode_files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge per-episode normalization statistics.")
+    parser.add_argument("paths", nargs="+", help="episode files or collection directories")
+    parser.add_argument("-o", "--output", type=str, default=None, help="json file, printed if not given")
+    args = parser.parse_args()
+
+    episode_files = get_episode_files(args.paths)
+    if len(episode_files) == 0:
+        sys.exit("No episode files found")
+    merged = merge_episode_norm_stats(episode_files)
+    if len(merged) == 0:
+        sys.exit("Some episodes were collected without `norm_stats`, they have to be rescanned")
+
+    result = {key: stats.summary() for key, stats in merged.items()}
+    result["num_episodes"] = len(episode_files)
+
+    text = json.dumps(result, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"Merged statistics of {len(episode_files)} episodes saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
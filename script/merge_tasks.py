@@ -148,22 +148,19 @@ class {output_task_name}(Base_Task):
         
         code += '''
     def play_once(self):
-        """依次执行所有子任务"""
-        
+        """依次执行所有子任务, 子任务规划失败时从该子任务开始前的检查点重试"""
 '''
-        
-        # 合并play_once代码
-        for i, (task_name, info) in enumerate(zip(task_names, task_infos)):
-            code += f"        # ========== 执行子任务 {i+1}: {task_name} ==========\n"
-            play_once_code = info['play_once_code']
-            # 处理return语句，除了最后一个
-            if i < len(task_names) - 1:
-                play_once_code = re.sub(r'return\s+self\.info', '# return self.info', play_once_code)
-            code += self._indent_code(play_once_code, 0) + "\n\n"
-        
+        for task_name in task_names:
+            code += f"        self.run_stage(self.{task_name}_stage)\n"
         code += '''        return self.info
 
 '''
+
+        # 每个子任务的play_once代码作为一个阶段 (stage)
+        for i, (task_name, info) in enumerate(zip(task_names, task_infos)):
+            code += f"    def {task_name}_stage(self):\n"
+            code += f"        # ========== 执行子任务 {i+1}: {task_name} ==========\n"
+            code += "        " + self._indent_code(info['play_once_code'], 0) + "\n\n"
         
         # 添加辅助函数
         helper_functions_added = set()
@@ -0,0 +1,58 @@
+"""
+Training ACT on the first episodes of a larger consolidated file (`policy/ACT/utils.py`).
+Needs numpy, h5py, torch and IPython: `python -m pytest tests/test_act_utils.py`.
+"""
+
+import os
+import importlib.util
+
+import pytest
+
+np = pytest.importorskip("numpy")
+h5py = pytest.importorskip("h5py")
+pytest.importorskip("torch")
+pytest.importorskip("IPython")
+
+ACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "policy", "ACT")
+
+spec = importlib.util.spec_from_file_location("act_utils", os.path.join(ACT_DIR, "utils.py"))
+act_utils = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(act_utils)
+
+CAMERA_NAMES = ["cam_high"]
+EPISODE_LENS = [5, 8, 6, 7]
+
+
+def make_episodes(num_episodes):
+    rng = np.random.default_rng(0)
+    return [(rng.normal(size=(length, 14)), rng.normal(size=(length, 14))) for length in EPISODE_LENS[:num_episodes]]
+
+
+def write_consolidated(dataset_dir, episodes):
+    writer = act_utils.EpisodeWriter(os.path.join(dataset_dir, act_utils.CONSOLIDATED_FILE), CAMERA_NAMES)
+    for qpos, action in episodes:
+        images = np.zeros((len(qpos), 4, 4, 3), dtype=np.uint8)
+        writer.add_episode(qpos, action, {"cam_high": images})
+    writer.close()
+
+
+def test_first_episodes_of_larger_file(tmp_path):
+    write_consolidated(tmp_path, make_episodes(4))
+    path = act_utils.get_consolidated_path(str(tmp_path), 3, CAMERA_NAMES)
+    assert act_utils.get_num_consolidated_episodes(path) == 4
+
+    # stats over the first 3 episodes match a file holding only those
+    stats, max_action_len = act_utils.get_norm_stats(path, 3)
+    os.makedirs(tmp_path / "subset")
+    write_consolidated(tmp_path / "subset", make_episodes(3))
+    expected, expected_len = act_utils.get_norm_stats(os.path.join(tmp_path / "subset", act_utils.CONSOLIDATED_FILE), 3)
+    assert max_action_len == expected_len
+    for key, value in expected.items():
+        np.testing.assert_allclose(stats[key], value, rtol=1e-5, atol=1e-6)
+
+
+def test_missing_episodes_raise(tmp_path):
+    write_consolidated(tmp_path, make_episodes(2))
+    with pytest.raises(FileNotFoundError):
+        act_utils.get_consolidated_path(str(tmp_path), 3, CAMERA_NAMES)
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
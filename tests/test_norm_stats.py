@@ -0,0 +1,38 @@
+"""
+Merging collection-time statistics into the arrays the DP zarr `meta` stores (`envs/utils/norm_stats.py`).
+Only needs numpy and h5py: `python -m pytest tests/test_norm_stats.py`.
+"""
+
+import os
+import importlib.util
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("h5py")
+
+UTILS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "envs", "utils")
+
+spec = importlib.util.spec_from_file_location("norm_stats", os.path.join(UTILS_DIR, "norm_stats.py"))
+norm_stats = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(norm_stats)
+
+
+def test_meta_arrays_match_concatenated_episodes():
+    rng = np.random.default_rng(0)
+    episodes = [rng.normal(size=(length, 14)) for length in [30, 45, 12]]
+    merged = norm_stats.merge_complete_norm_stats(
+        {"joint_action": norm_stats.RunningStats.from_values(vector)} for vector in episodes)
+    arrays = norm_stats.to_meta_arrays(merged)
+
+    everything = np.concatenate(episodes)
+    np.testing.assert_allclose(arrays["norm_stats_joint_action_min"], everything.min(axis=0), rtol=1e-6)
+    np.testing.assert_allclose(arrays["norm_stats_joint_action_max"], everything.max(axis=0), rtol=1e-6)
+    np.testing.assert_allclose(arrays["norm_stats_joint_action_mean"], everything.mean(axis=0), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(arrays["norm_stats_joint_action_std"], everything.std(axis=0), rtol=1e-5)
+    assert all(value.dtype == np.float32 for value in arrays.values())
+
+
+def test_episode_without_stats_needs_rescan():
+    stats = {"joint_action": norm_stats.RunningStats.from_values(np.ones((5, 14)))}
+    assert norm_stats.merge_complete_norm_stats([stats, {}, stats]) == {}
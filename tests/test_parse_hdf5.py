@@ -0,0 +1,56 @@
+"""
+`EpisodeReader` on episode files with episode-level groups (`/norm_stats`, `/static_camera`).
+Only needs numpy, h5py and opencv: `python -m pytest tests/test_parse_hdf5.py`.
+"""
+
+import os
+import importlib.util
+
+import pytest
+
+np = pytest.importorskip("numpy")
+h5py = pytest.importorskip("h5py")
+pytest.importorskip("cv2")
+
+UTILS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "envs", "utils")
+
+
+def load_module(name):
+    # load without importing the `envs` package (sapien)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(UTILS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+parse_hdf5 = load_module("parse_hdf5")
+norm_stats = load_module("norm_stats")
+
+NUM_FRAMES = 20
+
+
+@pytest.fixture
+def episode_file(tmp_path):
+    vector = np.random.default_rng(0).normal(size=(NUM_FRAMES, 14))
+    path = tmp_path / "episode0.hdf5"
+    with h5py.File(path, "w") as f:
+        f.create_dataset("joint_action/vector", data=vector)
+        f.create_dataset("static_camera/head_camera/intrinsic_cv", data=np.eye(3))
+        norm_stats.save_norm_stats(f, {"joint_action": norm_stats.RunningStats.from_values(vector)})
+    return path, vector
+
+
+def test_read_dict_frames_keeps_norm_stats(episode_file):
+    path, vector = episode_file
+    frames = slice(5, 12)
+    with parse_hdf5.EpisodeReader(str(path)) as reader:
+        assert reader.num_frames == NUM_FRAMES
+        data = reader.read_dict(frames=frames)
+
+    np.testing.assert_array_equal(data["joint_action"]["vector"], vector[frames])
+    np.testing.assert_array_equal(data["static_camera"]["head_camera"]["intrinsic_cv"], np.eye(3))
+    stats = data["norm_stats"]["joint_action"]
+    assert stats["hist"].shape == (14, norm_stats.NUM_QUANTILE_BINS)
+    assert int(stats["count"]) == NUM_FRAMES
+    np.testing.assert_allclose(stats["mean"], vector.mean(axis=0))
+    assert parse_hdf5.get_num_frames(data) == frames.stop - frames.start